@@ -1,4 +1,4 @@
-from database import VulnerabilityDB
+from database import get_db
 from datetime import datetime, timedelta
 import random
 
@@ -163,7 +163,7 @@ def generate_comprehensive_test_data():
 def add_test_data():
     """Ajouter les données de test dans SQLite"""
     
-    db = VulnerabilityDB()
+    db = get_db()
     
     # Vérifier si des données existent déjà
     stats = db.get_total_count()
@@ -209,7 +209,8 @@ def add_test_data():
                 'affected_versions': vuln['affected_versions'],
                 'patched_version': vuln['patched_version'],
                 'source': vuln['source'],
-                'url': vuln['url']
+                'url': vuln['url'],
+                'advisory_id': vuln['cve_id']
             }
             db.insert_package_vulnerability(package_data)
     
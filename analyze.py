@@ -1,4 +1,4 @@
-from database import VulnerabilityDB
+from database import get_db
 from datetime import datetime, timedelta
 from collections import Counter
 import pandas as pd
@@ -18,12 +18,12 @@ class VulnerabilityAnalyzer:
     """Classe pour analyser les vulnérabilités avec SQLite"""
     
     def __init__(self):
-        self.db = VulnerabilityDB()
+        self.db = get_db()
     
     @staticmethod
     def get_statistics():
         """Retourner les statistiques globales simples"""
-        db = VulnerabilityDB()
+        db = get_db()
         stats = db.get_total_count()
         severity_stats = db.get_severity_stats()
         
@@ -36,66 +36,64 @@ class VulnerabilityAnalyzer:
     @staticmethod
     def get_trends(days=30):
         """Analyser les tendances des derniers jours par composant"""
-        db = VulnerabilityDB()
+        db = get_db()
         trends = db.get_trends(days=days)
         return trends
     
     @staticmethod
     def get_top_affected_components(limit=5):
         """Top N composants les plus affectés"""
-        db = VulnerabilityDB()
+        db = get_db()
         components = db.get_top_components(limit=limit)
         return components
     
+    # Colonnes affichées par la page de recherche
+    FILTER_COLUMNS = [
+        'id', 'cve_id', 'title', 'severity', 'cvss_score', 'affected_component', 'url'
+    ]
+    
     @staticmethod
     def filter_vulnerabilities(severity=None, component=None, days=None):
         """Filtrer les vulnérabilités selon les critères"""
-        db = VulnerabilityDB()
-        df = db.search_vulnerabilities(severity=severity, component=component, days=days)
-        
-        # Convertir DataFrame en liste de dictionnaires pour compatibilité avec templates
-        results = []
-        for _, row in df.iterrows():
-            results.append({
-                'cve_id': row['cve_id'],
-                'title': row['title'],
-                'description': row['description'],
-                'severity': row['severity'],
-                'cvss_score': row['cvss_score'],
-                'affected_component': row['affected_component'],
-                'url': row['url']
-            })
-        
-        return results
+        db = get_db()
+        # Les listes n'affichent pas les descriptions : on ne les lit pas.
+        # Lignes lues sur le curseur, déjà sous forme de dictionnaires.
+        return db.search_vulnerabilities(
+            severity=severity,
+            component=component,
+            days=days,
+            columns=VulnerabilityAnalyzer.FILTER_COLUMNS,
+            as_dataframe=False
+        )
+    
+    @staticmethod
+    def search_fulltext(query, severity=None, limit=50):
+        """Recherche plein texte classée (BM25) avec extraits surlignés"""
+        db = get_db()
+        return db.search_fulltext(query, severity=severity, limit=limit, columns=db.LIST_COLUMNS)
     
     @staticmethod
     def get_vulnerabilities_by_severity():
         """Compte les vulnérabilités par niveau de sévérité"""
-        db = VulnerabilityDB()
+        db = get_db()
         return db.get_severity_stats()
     
     @staticmethod
     def get_severity_distribution():
         """Distribution par sévérité avec pourcentages"""
-        db = VulnerabilityDB()
+        db = get_db()
         return db.get_severity_stats()
     
     @staticmethod
     def get_critical_vulnerabilities(limit=10):
         """Vulnérabilités critiques (CVSS >= 9.0)"""
-        db = VulnerabilityDB()
+        db = get_db()
         return db.get_critical_vulnerabilities(limit=limit)
     
     @staticmethod
     def get_recent_devsecops_trends(days=30):
         """Tendances DevSecOps dans les titres/descriptions"""
-        db = VulnerabilityDB()
-        df = db.get_all_vulnerabilities_combined()
-        
-        # Filtrer par date
-        df['published_date'] = pd.to_datetime(df['published_date'])
-        date_limit = datetime.utcnow() - timedelta(days=days)
-        recent = df[df['published_date'] >= date_limit]
+        db = get_db()
         
         keywords = []
         tech_keywords = [
@@ -104,7 +102,8 @@ class VulnerabilityAnalyzer:
             'ansible', 'helm', 'npm', 'python', 'maven', 'dependency'
         ]
         
-        for _, row in recent.iterrows():
+        # Lecture en flux, filtre de période appliqué en SQL (index sur published_ts)
+        for row in db.iter_vulnerabilities(columns=['title', 'description'], days=days):
             title = str(row['title']).lower() if row['title'] else ''
             desc = str(row['description']).lower() if row['description'] else ''
             text = f"{title} {desc}"
@@ -127,16 +126,25 @@ class VulnerabilityAnalyzer:
         except LookupError:
             nltk.download('stopwords', quiet=True)
     
+    # Colonnes du DataFrame d'analyse : les descriptions en sont exclues
+    DATAFRAME_COLUMNS = [
+        'cve_id', 'title', 'severity', 'cvss_score', 'affected_component',
+        'ecosystem', 'vulnerability_type', 'source', 'published_ts'
+    ]
+    
     @staticmethod
-    def get_vulnerabilities_dataframe(days=None):
+    def get_vulnerabilities_dataframe(days=None, columns=None):
         """Retourner un DataFrame Pandas avec les vulnérabilités"""
-        db = VulnerabilityDB()
-        df = db.get_all_vulnerabilities_combined()
+        db = get_db()
+        columns = list(columns or VulnerabilityAnalyzer.DATAFRAME_COLUMNS)
+        if 'published_ts' not in columns:
+            columns.append('published_ts')
         
-        if days:
-            df['published_date'] = pd.to_datetime(df['published_date'])
-            date_limit = datetime.utcnow() - timedelta(days=days)
-            df = df[df['published_date'] >= date_limit]
+        frames = list(db.iter_vulnerability_frames(columns=columns, days=days))
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+        
+        # Dates déjà normalisées en timestamps : pas de re-parsing des chaînes
+        df['published_date'] = pd.to_datetime(df['published_ts'], unit='s')
         
         return df
     
@@ -154,7 +162,6 @@ class VulnerabilityAnalyzer:
             }
         
         # Tendances mensuelles
-        df['published_date'] = pd.to_datetime(df['published_date'])
         df['month'] = df['published_date'].dt.to_period('M')
         monthly_trends = df.groupby('month').size().to_dict()
         
@@ -232,20 +239,13 @@ class VulnerabilityAnalyzer:
     @staticmethod
     def get_text_vectorization():
         """Créer une vectorisation TF-IDF des descriptions"""
-        df = VulnerabilityAnalyzer.get_vulnerabilities_dataframe()
-        
-        if df.empty or df['description'].isna().all():
-            return {
-                'vocabulary_size': 0,
-                'top_terms': [],
-                'vectors_shape': (0, 0)
-            }
+        db = get_db()
         
-        # Nettoyer les textes
-        texts = df['description'].fillna('').astype(str).tolist()
+        # Nettoyer les textes au fil de la lecture (pas de DataFrame intermédiaire)
         cleaned_texts = []
         
-        for text in texts:
+        for row in db.iter_vulnerabilities(columns=['description']):
+            text = str(row['description'] or '')
             # Nettoyage basique
             text = re.sub(r'[^\w\s]', '', text.lower())
             text = re.sub(r'\d+', '', text)
@@ -320,7 +320,6 @@ class VulnerabilityAnalyzer:
         
         # 2. Evolution temporelle
         if len(df) > 5:
-            df['published_date'] = pd.to_datetime(df['published_date'])
             df['date'] = df['published_date'].dt.date
             daily_counts = df.groupby('date').size()
             
@@ -368,11 +367,11 @@ class VulnerabilityAnalyzer:
     @staticmethod
     def generate_descriptions_summary():
         """Générer des résumés des descriptions longues"""
-        db = VulnerabilityDB()
-        df = db.get_all_vulnerabilities_combined()
+        db = get_db()
+        rows = db.iter_vulnerabilities(columns=['cve_id', 'affected_component', 'description'])
         
         summaries = []
-        for _, row in df.iterrows():
+        for row in rows:
             description = row['description']
             if description and len(str(description)) > 100:
                 summary = VulnerabilityAnalyzer.summarize_text_with_nltk(description)
@@ -381,5 +380,8 @@ class VulnerabilityAnalyzer:
                     'original_length': len(str(description)),
                     'summary': summary
                 })
+                if len(summaries) >= 10:  # Limiter à 10 pour la performance
+                    rows.close()
+                    break
         
-        return summaries[:10]  # Limiter à 10 pour la performance
\ No newline at end of file
+        return summaries
\ No newline at end of file
@@ -1,17 +1,22 @@
 from flask import Flask, render_template, request, jsonify, send_file
 from config import DevelopmentConfig
-from database import VulnerabilityDB
+from database import get_db
+from supply_chain import get_graph, parse_package_lock_versions
+from versions import ECOSYSTEM_ALIASES, normalize_ecosystem
 from analyze import VulnerabilityAnalyzer
 from charts import PDFReportGenerator
 from datetime import datetime
 import os
+import time
 
 # Créer l'application Flask
 app = Flask(__name__)
 app.config.from_object(DevelopmentConfig)
 
 # Initialiser la base de données
-db = VulnerabilityDB()
+db = get_db()
+db.start_checkpointer()
+graph = get_graph()
 
 # Import automation après la création de l'app
 try:
@@ -44,6 +49,7 @@ def search():
     
     if request.method == 'POST':
         # Récupérer les paramètres de recherche
+        query = request.form.get('q', '').strip()
         severity = request.form.get('severity') or None
         component = request.form.get('component') or None
         days = request.form.get('days')
@@ -51,12 +57,16 @@ def search():
         # Convertir days en entier si présent
         days = int(days) if days else None
         
-        # Filtrer les vulnérabilités
-        results = VulnerabilityAnalyzer.filter_vulnerabilities(
-            severity=severity,
-            component=component,
-            days=days
-        )
+        if query:
+            # Recherche plein texte classée par pertinence
+            results = VulnerabilityAnalyzer.search_fulltext(query, severity=severity)
+        else:
+            # Filtrer les vulnérabilités
+            results = VulnerabilityAnalyzer.filter_vulnerabilities(
+                severity=severity,
+                component=component,
+                days=days
+            )
     
     return render_template('search.html', results=results)
 
@@ -109,48 +119,192 @@ def add_test_data_route():
 
 @app.route('/api/vulnerabilities', methods=['GET'])
 def api_vulnerabilities():
-    """API pour récupérer les vulnérabilités (JSON)"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+    """
+    API pour récupérer les vulnérabilités (JSON), paginée par curseur
+    
+    Paramètres : per_page, cursor (next_cursor de la page précédente),
+    severity, ecosystem, count (cached par défaut, exact ou none),
+    fields (colonnes supplémentaires, ex. fields=description)
     
-    # Récupérer toutes les vulnérabilités
-    df = db.get_all_vulnerabilities_combined()
+    Les descriptions ne sont pas renvoyées par défaut : voir
+    /api/vulnerabilities/<id> pour le détail d'une vulnérabilité.
+    """
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 100)
+    cursor = request.args.get('cursor') or None
+    severity = request.args.get('severity') or None
+    ecosystem = request.args.get('ecosystem') or None
+    count_mode = request.args.get('count', 'cached')
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
     
-    # Pagination manuelle
-    total = len(df)
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_df = df.iloc[start:end]
+    try:
+        page = db.get_vulnerabilities_page(
+            limit=per_page,
+            cursor=cursor,
+            severity=severity,
+            ecosystem=ecosystem,
+            columns=list(db.LIST_COLUMNS) + [f for f in fields if f not in db.LIST_COLUMNS]
+        )
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     
-    # Convertir en liste de dictionnaires
     vulnerabilities = []
-    for _, row in paginated_df.iterrows():
-        vulnerabilities.append({
-            'id': int(row.name) if hasattr(row, 'name') else 0,
+    for row in page['items']:
+        item = {
+            'id': row['id'],
             'cve_id': row['cve_id'],
             'title': row['title'],
             'severity': row['severity'],
             'cvss_score': row['cvss_score'],
             'component': row['affected_component'],
+            'published_date': row['published_date'],
             'url': row['url']
-        })
+        }
+        item.update({f: row[f] for f in fields})
+        vulnerabilities.append(item)
     
     data = {
-        'total': total,
-        'pages': (total + per_page - 1) // per_page,
-        'current_page': page,
+        'per_page': per_page,
+        'next_cursor': page['next_cursor'],
         'vulnerabilities': vulnerabilities
     }
     
+    if count_mode != 'none':
+        data['total'] = db.count_vulnerabilities(
+            severity=severity,
+            ecosystem=ecosystem,
+            use_cache=(count_mode != 'exact')
+        )
+    
     return jsonify(data)
 
 
+@app.route('/api/vulnerabilities/<int(signed=True):vuln_id>', methods=['GET'])
+def api_vulnerability_detail(vuln_id):
+    """API détail d'une vulnérabilité (description comprise)"""
+    vulnerability = db.get_vulnerability(vuln_id)
+    
+    if vulnerability is None:
+        return jsonify({'status': 'error', 'message': 'Vulnerabilite introuvable'}), 404
+    
+    return jsonify(vulnerability)
+
+
+@app.route('/api/search', methods=['GET'])
+def api_search():
+    """API de recherche plein texte classée (BM25)"""
+    query = request.args.get('q', '').strip()
+    severity = request.args.get('severity') or None
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    
+    if not query:
+        return jsonify({'status': 'error', 'message': "Parametre 'q' requis"}), 400
+    
+    start = time.perf_counter()
+    results = db.search_fulltext(query, severity=severity, limit=limit, columns=db.LIST_COLUMNS)
+    
+    return jsonify({
+        'query': query,
+        'count': len(results),
+        'took_ms': round((time.perf_counter() - start) * 1000, 2),
+        'results': results
+    })
+
+
+@app.route('/api/supply-chain/<path:package>/impact', methods=['GET'])
+def api_supply_chain_impact(package):
+    """
+    API impact supply-chain : packages qui dépendent (transitivement) de `package`
+    
+    Paramètre : depth (1 = dépendants directs, Config.SUPPLY_CHAIN_MAX_DEPTH au plus)
+    """
+    depth = min(max(request.args.get('depth', graph.max_depth, type=int), 1), graph.max_depth)
+    
+    start = time.perf_counter()
+    impacted = graph.impact(package, depth=depth)
+    vulnerabilities = list(db.iter_vulnerabilities(
+        columns=['id', 'cve_id', 'title', 'severity', 'cvss_score'],
+        where={'affected_component': package}
+    ))
+    
+    return jsonify({
+        'package': package,
+        'depth': depth,
+        'count': len(impacted),
+        'took_ms': round((time.perf_counter() - start) * 1000, 2),
+        'vulnerabilities': vulnerabilities,
+        'impacted': impacted
+    })
+
+
+def unknown_ecosystem_error():
+    """Réponse 400 d'un écosystème non reconnu"""
+    known = ', '.join(sorted(set(ECOSYSTEM_ALIASES.values())))
+    return jsonify({'status': 'error', 'message': f"Ecosysteme inconnu (valeurs acceptees : {known})"}), 400
+
+
+@app.route('/api/affected', methods=['GET', 'POST'])
+def api_affected():
+    """
+    API « ma version est-elle affectée »
+    
+    GET  : ecosystem, package, version
+    POST : {"ecosystem": "npm", "packages": [{"name": ..., "version": ...}]}
+           ou {"lockfile": <package-lock.json>} pour vérifier tout un projet npm
+    
+    L'écosystème est normalisé comme dans les collecteurs ('PyPI' -> 'pip') ;
+    un écosystème inconnu renvoie 400.
+    """
+    if request.method == 'GET':
+        ecosystem = request.args.get('ecosystem', '')
+        package = request.args.get('package', '')
+        version = request.args.get('version', '')
+        if not (ecosystem and package and version):
+            return jsonify({'status': 'error', 'message': "Parametres 'ecosystem', 'package' et 'version' requis"}), 400
+        
+        ecosystem = normalize_ecosystem(ecosystem)
+        if ecosystem is None:
+            return unknown_ecosystem_error()
+        
+        advisories = db.is_affected(ecosystem, package, version)
+        return jsonify({'package': package, 'version': version,
+                        'affected': bool(advisories), 'advisories': advisories})
+    
+    payload = request.get_json(silent=True) or {}
+    if 'lockfile' in payload:
+        ecosystem = 'npm'
+        packages = parse_package_lock_versions(payload['lockfile'])
+    else:
+        ecosystem = payload.get('ecosystem', '')
+        packages = [(p.get('name'), p.get('version')) for p in payload.get('packages', []) if isinstance(p, dict)]
+    if not ecosystem:
+        return jsonify({'status': 'error', 'message': "Parametre 'ecosystem' requis"}), 400
+    
+    ecosystem = normalize_ecosystem(ecosystem)
+    if ecosystem is None:
+        return unknown_ecosystem_error()
+    
+    start = time.perf_counter()
+    results = db.check_versions(ecosystem, packages)
+    return jsonify({
+        'checked': len(packages),
+        'affected': len({(r['package'], r['version']) for r in results}),
+        'took_ms': round((time.perf_counter() - start) * 1000, 2),
+        'results': results
+    })
+
+
 @app.route('/api/statistics', methods=['GET'])
 def api_statistics():
     """API pour les statistiques"""
     return jsonify(VulnerabilityAnalyzer.get_statistics())
 
 
+@app.route('/api/database/pool', methods=['GET'])
+def api_database_pool():
+    """API pour les métriques du pool de connexions SQLite"""
+    return jsonify(db.get_pool_stats())
+
+
 @app.route('/api/subscribe-alerts', methods=['POST'])
 def subscribe_alerts():
     """API pour s'inscrire aux alertes"""
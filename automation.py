@@ -20,7 +20,7 @@ class AutomationSystem:
             from collectors.osv_github_collector import OSVGitHubCollector
             
             collector = OSVGitHubCollector()
-            stats = collector.run()
+            stats = collector.run_pipelined()
             
             print(f"✅ Collecte OSV+GitHub terminée : {stats['inserted']} nouvelles vulnérabilités")
             
@@ -47,6 +47,18 @@ class AutomationSystem:
             'osv_github': osv_stats
         }
     
+    def apply_retention(self):
+        """Archiver les lignes froides (politique Config.RETENTION_DAYS)"""
+        print(f"\n🗄️  Rétention démarrée à {datetime.now()}")
+        
+        try:
+            from database import get_db
+            return get_db().apply_retention()
+        
+        except Exception as e:
+            print(f"❌ Erreur rétention : {e}")
+            return {'error': str(e)}
+    
     def send_daily_alerts(self):
         """Vérifier et envoyer les alertes quotidiennes"""
         print(f"📧 Vérification des alertes quotidiennes à {datetime.now()}")
@@ -66,6 +78,9 @@ class AutomationSystem:
         # Collecte toutes les 6 heures
         schedule.every(6).hours.do(self.run_all_collectors)
         
+        # Archivage des lignes froides chaque nuit à 3h
+        schedule.every().day.at("03:00").do(self.apply_retention)
+        
         # Alertes quotidiennes à 9h
         schedule.every().day.at("09:00").do(self.send_daily_alerts)
         
@@ -74,6 +89,7 @@ class AutomationSystem:
         
         print("✅ Calendrier d'automatisation configuré :")
         print("  → Collecte : toutes les 6 heures")
+        print("  → Rétention: tous les jours à 3h00")
         print("  → Alertes  : tous les jours à 9h00")
         print("  → Rapport  : tous les lundis à 8h00")
     
@@ -0,0 +1,61 @@
+"""
+Sauvegarde en ligne de la base SQLite
+
+Copie la base pendant que les collecteurs écrivent (API de sauvegarde
+SQLite, par étapes de pages) ou publie le snapshot en lecture seule lu
+par les rapports.
+
+Usage : python backup.py                     (sauvegarde horodatée dans Config.DB_BACKUP_DIR)
+        python backup.py --vacuum            (copie compactée par VACUUM INTO)
+        python backup.py --snapshot          (snapshot lecture seule, Config.DB_SNAPSHOT_PATH)
+        python backup.py --dest FICHIER [--pages N] [--db FICHIER]
+
+Un job de rapport lit le snapshot sans toucher à la base de production :
+    from database import VulnerabilityDB, set_db
+    set_db(VulnerabilityDB.open_snapshot())
+"""
+
+import argparse
+import os
+from datetime import datetime
+
+from config import Config
+from database import VulnerabilityDB
+
+
+def default_backup_path():
+    """Chemin horodaté d'une nouvelle sauvegarde"""
+    name = f'vulnerabilities_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db'
+    return os.path.join(Config.DB_BACKUP_DIR, name)
+
+
+def print_progress(status, remaining, total):
+    """Afficher l'avancement de la copie page par page"""
+    if total:
+        done = total - remaining
+        print(f"   • {done}/{total} pages ({done * 100 // total}%)", end='\r' if remaining else '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sauvegarde en ligne de la base SQLite")
+    parser.add_argument('--db', default=None, help="Base source (Config.DB_PATH par défaut)")
+    parser.add_argument('--dest', default=None, help="Fichier de destination")
+    parser.add_argument('--vacuum', action='store_true', help="Copie compactée (VACUUM INTO)")
+    parser.add_argument('--snapshot', action='store_true', help="Publier le snapshot lecture seule")
+    parser.add_argument('--pages', type=int, default=None, help="Pages copiées par étape")
+    args = parser.parse_args()
+
+    db = VulnerabilityDB(args.db, init_schema=False)
+    try:
+        if args.snapshot:
+            db.snapshot(args.dest, compact=args.vacuum)
+        elif args.vacuum:
+            db.vacuum_into(args.dest or default_backup_path())
+        else:
+            db.backup(args.dest or default_backup_path(), pages=args.pages, progress=print_progress)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
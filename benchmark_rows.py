@@ -0,0 +1,107 @@
+"""
+Micro-benchmark : coût par tranche de 1000 lignes des parcours de résultats
+
+Compare l'ancien parcours DataFrame.iterrows() aux parcours actuels
+(to_dict('records'), dictionnaires lus sur le curseur, lecture en flux)
+sur une base temporaire remplie de données synthétiques.
+
+Usage : python benchmark_rows.py [--rows 5000] [--repeat 5]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from database import VulnerabilityDB
+
+SEVERITIES = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']
+ECOSYSTEMS = ['npm', 'pip', 'maven', 'docker']
+TECH_KEYWORDS = [
+    'docker', 'kubernetes', 'k8s', 'jenkins', 'gitlab', 'github',
+    'ci/cd', 'pipeline', 'container', 'terraform',
+    'ansible', 'helm', 'npm', 'python', 'maven', 'dependency'
+]
+
+
+def fill_database(db, rows):
+    """Insérer `rows` vulnérabilités de packages synthétiques"""
+    packages = [
+        {
+            'package_name': f'package-{i % 500}',
+            'ecosystem': ECOSYSTEMS[i % len(ECOSYSTEMS)],
+            'vulnerability_type': 'RCE',
+            'cvss_score': round(1 + (i % 90) / 10, 1),
+            'severity': SEVERITIES[i % len(SEVERITIES)],
+            'title': f'Synthetic docker pipeline vulnerability {i}',
+            'description': f'Synthetic description {i} affecting a github container build. ' * 8,
+            'published_date': f'2025-{1 + i % 12:02d}-{1 + i % 28:02d}',
+            'discovered_date': '2025-12-01',
+            'source': 'benchmark',
+            'advisory_id': f'BENCH-{i}'
+        }
+        for i in range(rows)
+    ]
+    db.bulk_upsert_packages(packages)
+
+
+def timed(func, repeat):
+    """Meilleur temps (en secondes) sur `repeat` exécutions"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def count_keywords(rows):
+    """Boucle de get_recent_devsecops_trends sur un itérable de lignes"""
+    found = 0
+    for row in rows:
+        text = f"{str(row['title']).lower()} {str(row['description']).lower()}"
+        found += sum(1 for kw in TECH_KEYWORDS if kw in text)
+    return found
+
+
+def run_benchmark(rows=5000, repeat=5):
+    """Exécuter les mesures et afficher le coût par 1000 lignes"""
+    workdir = tempfile.mkdtemp(prefix='vtbda-bench-')
+    db = VulnerabilityDB(os.path.join(workdir, 'bench.db'))
+
+    try:
+        fill_database(db, rows)
+        columns = ['id', 'cve_id', 'title', 'severity', 'cvss_score', 'affected_component', 'url']
+        df = db.search_vulnerabilities(columns=columns)
+        text_df = db.get_all_vulnerabilities_combined(columns=['title', 'description'])
+
+        cases = [
+            ("Liste : iterrows (avant)",
+             lambda: [{c: row[c] for c in columns} for _, row in df.iterrows()]),
+            ("Liste : to_dict('records')",
+             lambda: df.to_dict('records')),
+            ("Liste : curseur SQL (après)",
+             lambda: db.search_vulnerabilities(columns=columns, as_dataframe=False)),
+            ("Mots-clés : iterrows (avant)",
+             lambda: count_keywords(row for _, row in text_df.iterrows())),
+            ("Mots-clés : iter_vulnerabilities (après)",
+             lambda: count_keywords(db.iter_vulnerabilities(columns=['title', 'description']))),
+        ]
+
+        print(f"📊 Benchmark sur {rows} lignes (meilleur de {repeat})")
+        for label, func in cases:
+            elapsed = timed(func, repeat)
+            print(f"   • {label:<42} {elapsed * 1000 * 1000 / rows:8.3f} ms / 1k lignes")
+    finally:
+        db.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Micro-benchmark des parcours de lignes")
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(rows=args.rows, repeat=args.repeat)
@@ -1,6 +1,6 @@
 from fpdf import FPDF
 from datetime import datetime
-from database import VulnerabilityDB
+from database import get_db
 from analyze import VulnerabilityAnalyzer
 import matplotlib.pyplot as plt
 import io
@@ -26,7 +26,7 @@ class VulnerabilityCharts:
     @staticmethod
     def create_severity_pie_chart(output_path='severity_chart.png'):
         """Créer un graphique circulaire de la distribution par sévérité"""
-        db = VulnerabilityDB()
+        db = get_db()
         severity_stats = db.get_severity_stats()
         
         labels = list(severity_stats.keys())
@@ -52,7 +52,7 @@ class VulnerabilityCharts:
     @staticmethod
     def create_trends_bar_chart(output_path='trends_chart.png', days=30):
         """Créer un graphique en barres des tendances"""
-        db = VulnerabilityDB()
+        db = get_db()
         trends = db.get_trends(days=days)
         
         if not trends:
@@ -81,8 +81,6 @@ class VulnerabilityCharts:
         if df.empty:
             return None
         
-        import pandas as pd
-        df['published_date'] = pd.to_datetime(df['published_date'])
         df['date'] = df['published_date'].dt.date
         daily_counts = df.groupby('date').size()
         
@@ -104,7 +102,7 @@ class PDFReportGenerator:
     """Classe pour générer des rapports PDF"""
     
     def __init__(self):
-        self.db = VulnerabilityDB()
+        self.db = get_db()
         self.charts = VulnerabilityCharts()
     
     def generate_report(self, filename='rapport_veille.pdf'):
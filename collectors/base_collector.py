@@ -4,21 +4,58 @@ Fournit les méthodes communes d'interaction avec la BDD
 """
 
 from abc import ABC, abstractmethod
-from database import VulnerabilityDB
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from config import Config
+from database import VulnerabilityDB, get_db
+from versions import latest_fixed, normalize_ecosystem
+from .http_cache import get_http_cache
+from .rate_limiter import RETRY_EXCEPTIONS, RateLimiter, backoff_delay, get_rate_limiter, should_retry
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+import asyncio
+import requests
+import threading
 import time
 
 
 class BaseCollector(ABC):
     """Classe abstraite de base pour tous les collecteurs"""
     
-    def __init__(self, name="BaseCollector"):
+    def __init__(self, name="BaseCollector", db=None, concurrency=None, rate_limit=None, full=False,
+                 http_cache=None):
+        """
+        Args:
+            name: Nom affiché dans les logs (et source des filigranes)
+            db: Base injectée (instance partagée get_db() par défaut)
+            concurrency: Requêtes HTTP simultanées (Config.COLLECTOR_CONCURRENCY)
+            rate_limit: Requêtes/s par hôte sans quota annoncé, 0 = illimité
+                        (limiteur partagé à Config.COLLECTOR_RATE_LIMIT par défaut)
+            full: Ignorer les filigranes et tout retélécharger (resynchronisation)
+            http_cache: Cache HTTP (cache partagé get_http_cache() par défaut, False = désactivé)
+        """
         self.name = name
-        self.db = VulnerabilityDB()
+        # Instance partagée du processus, sauf base injectée (tests, autre fichier)
+        self.db = db or get_db()
+        self.concurrency = concurrency or Config.COLLECTOR_CONCURRENCY
+        self.rate_limiter = get_rate_limiter() if rate_limit is None else RateLimiter(rate_limit)
+        self.retries = Config.COLLECTOR_RETRIES
+        self._session = None
+        self._http_lock = threading.Lock()
+        self.http_cache = get_http_cache() if http_cache is None else (http_cache or None)
+        self._cache_counts = {'hits': 0, 'revalidated': 0, 'misses': 0}
+        
+        # Collecte incrémentale (table collector_state)
+        self.full = full
+        self._state = None
+        self._pending_state = {}
+        self._write_failed = False
         self.collected_count = 0
         self.inserted_count = 0
+        self.updated_count = 0
         self.duplicate_count = 0
         self.error_count = 0
+        self.retry_count = 0
         self.start_time = None
     
     @abstractmethod
@@ -33,66 +70,119 @@ class BaseCollector(ABC):
         pass
     
     def save_to_database(self, vulnerabilities):
-    
+        """
+        Sauvegarder les vulnérabilités collectées par lots
+        
+        Les enregistrements sont répartis entre packages et CVE générales puis
+        écrits via bulk_upsert_packages / bulk_upsert_cves (un executemany et
+        un commit par lot au lieu d'une transaction par ligne).
+        
+        Args:
+            vulnerabilities: Liste des vulnérabilités normalisées
+        
+        Returns:
+            Dict: Statistiques (collected, inserted, updated, duplicates, errors)
+        """
         print(f"[{self.name}] Sauvegarde de {len(vulnerabilities)} vulnérabilités...")
         
+        packages = []
+        cves = []
+        
         for vuln in vulnerabilities:
             try:
-                # Décider si c'est une CVE générale ou un package
-                if vuln.get('ecosystem') and vuln.get('package'):
-                    # C'est une vulnérabilité de package
-                    package_data = {
-                        'package_name': vuln.get('package'),
-                        'ecosystem': self._normalize_ecosystem(vuln.get('ecosystem')),
-                        'vulnerability_type': self._extract_vuln_type(vuln.get('summary', '')),
-                        'cvss_score': self._extract_cvss_score(vuln.get('severity', '')),
-                        'severity': self._normalize_severity(vuln.get('severity', '')),
-                        'title': vuln.get('summary', 'No title')[:200],
-                        'description': vuln.get('summary', 'No description'),
-                        'published_date': self._parse_date(vuln.get('published')),
-                        'discovered_date': self._parse_date(vuln.get('collected_at')),
-                        'affected_versions': vuln.get('affected_versions', '')[:255],
-                        'patched_version': self._extract_patched_version(vuln.get('affected_versions', '')),
-                        'source': vuln.get('source', self.name),
-                        'url': self._get_first_reference(vuln.get('references', []))
-                    }
-                    
-                    vuln_id = self.db.insert_package_vulnerability(package_data)
-                    
-                    if vuln_id:
-                        self.inserted_count += 1
-                    else:
-                        self.duplicate_count += 1
-                
-                else:
-                    # C'est une CVE générale
-                    cve_data = {
-                        'cve_id': vuln.get('vuln_id', ''),
-                        'title': vuln.get('summary', 'No title')[:200],
-                        'description': vuln.get('summary', 'No description'),
-                        'cvss_score': self._extract_cvss_score(vuln.get('severity', '')),
-                        'severity': self._normalize_severity(vuln.get('severity', '')),
-                        'published_date': self._parse_date(vuln.get('published')),
-                        'modified_date': self._parse_date(vuln.get('collected_at')),
-                        'url': self._get_first_reference(vuln.get('references', []))
-                    }
-                    
-                    success, msg = self.db.insert_cve(cve_data)
-                    
-                    if success:
-                        self.inserted_count += 1
-                    else:
-                        self.duplicate_count += 1
+                kind, data = self._prepare(vuln)
+                (packages if kind == 'package' else cves).append(data)
             
             except Exception as e:
                 self.error_count += 1
-                print(f"[{self.name}] Erreur sauvegarde : {e}")
+                print(f"[{self.name}] Erreur préparation : {e}")
+        
+        self._write_batch(packages, cves)
+        return self._stats()
+    
+    def _prepare(self, vuln):
+        """
+        Convertir une vulnérabilité normalisée en ligne de la base
         
+        Returns:
+            Tuple: ('package', données package) ou ('cve', données CVE)
+        """
+        # Décider si c'est une CVE générale ou un package
+        if vuln.get('ecosystem') and vuln.get('package'):
+            return 'package', self._to_package_data(vuln)
+        return 'cve', self._to_cve_data(vuln)
+    
+    def _write_batch(self, packages, cves):
+        """Écrire un lot de lignes préparées et cumuler les compteurs"""
+        batches = self.db.bulk_upsert_packages(packages) + self.db.bulk_upsert_cves(cves)
+        
+        # Plages de versions structurées (is_affected / check_versions) : un
+        # échec compte comme une erreur et bloque le filigrane, comme les upserts
+        ranged = [pkg for pkg in packages if pkg.get('affected_ranges')]
+        try:
+            self.db.bulk_replace_affected_ranges(ranged)
+        except Exception as e:
+            print(f"❌ Erreur écriture des plages de versions ({len(ranged)} avis): {e}")
+            self._write_failed = True
+            self.error_count += len(ranged)
+        
+        for batch in batches:
+            self._write_failed = self._write_failed or bool(batch['errors'])
+            self.inserted_count += batch['inserted']
+            self.updated_count += batch['updated']
+            self.duplicate_count += batch['duplicates']
+            self.error_count += batch['errors']
+    
+    def _stats(self):
+        """Compteurs de la collecte en cours"""
         return {
             'collected': self.collected_count,
             'inserted': self.inserted_count,
+            'updated': self.updated_count,
             'duplicates': self.duplicate_count,
-            'errors': self.error_count
+            'errors': self.error_count,
+            'retries': self.retry_count,
+            'cache_hits': self._cache_counts['hits'],
+            'cache_revalidated': self._cache_counts['revalidated'],
+            'cache_misses': self._cache_counts['misses']
+        }
+    
+    def _to_package_data(self, vuln):
+        """Convertir une vulnérabilité normalisée en ligne package_vulnerabilities"""
+        return {
+            'package_name': vuln.get('package'),
+            'ecosystem': self._normalize_ecosystem(vuln.get('ecosystem')),
+            'vulnerability_type': self._extract_vuln_type(vuln.get('summary', '')),
+            'cvss_score': self._extract_cvss_score(vuln.get('severity', '')),
+            'severity': self._normalize_severity(vuln.get('severity', '')),
+            'title': vuln.get('summary', 'No title')[:200],
+            'description': vuln.get('summary', 'No description'),
+            'published_date': self._parse_date(vuln.get('published')),
+            'discovered_date': self._parse_date(vuln.get('collected_at')),
+            'published_ts': self._parse_timestamp(vuln.get('published')),
+            'discovered_ts': self._parse_timestamp(vuln.get('collected_at')),
+            'affected_versions': vuln.get('affected_versions', '')[:255],
+            'patched_version': self._extract_patched_version(
+                vuln.get('affected_ranges', []), self._normalize_ecosystem(vuln.get('ecosystem'))
+            ),
+            'affected_ranges': vuln.get('affected_ranges', []),
+            'source': vuln.get('source', self.name),
+            'url': self._get_first_reference(vuln.get('references', [])),
+            'advisory_id': vuln.get('vuln_id', '')
+        }
+    
+    def _to_cve_data(self, vuln):
+        """Convertir une vulnérabilité normalisée en ligne cve_vulnerabilities"""
+        return {
+            'cve_id': vuln.get('vuln_id', ''),
+            'title': vuln.get('summary', 'No title')[:200],
+            'description': vuln.get('summary', 'No description'),
+            'cvss_score': self._extract_cvss_score(vuln.get('severity', '')),
+            'severity': self._normalize_severity(vuln.get('severity', '')),
+            'published_date': self._parse_date(vuln.get('published')),
+            'modified_date': self._parse_date(vuln.get('collected_at')),
+            'published_ts': self._parse_timestamp(vuln.get('published')),
+            'url': self._get_first_reference(vuln.get('references', []))
         }
     
     def run(self):
@@ -102,33 +192,347 @@ class BaseCollector(ABC):
         Returns:
             Dict: Statistiques complètes
         """
-        print(f"\n{'='*60}")
-        print(f"[{self.name}] Démarrage de la collecte...")
-        print(f"{'='*60}")
-        
+        self._print_header()
         self.start_time = time.time()
         
-        # Collecter
-        vulnerabilities = self.collect()
+        # Collecter (connexions keep-alive fermées en fin de collecte)
+        try:
+            vulnerabilities = self.collect()
+        finally:
+            self.close()
         self.collected_count = len(vulnerabilities)
         
-        # Sauvegarder
+        # Sauvegarder, puis avancer les filigranes
         stats = self.save_to_database(vulnerabilities)
+        self._commit_state()
         
-        # Calculer durée
+        self._print_summary(stats)
+        return stats
+    
+    def _print_header(self):
+        """Afficher le début d'une collecte"""
+        print(f"\n{'='*60}")
+        print(f"[{self.name}] Démarrage de la collecte...")
+        print(f"{'='*60}")
+    
+    def _print_summary(self, stats):
+        """Afficher le résumé d'une collecte"""
         duration = time.time() - self.start_time
         
-        # Afficher résumé
         print(f"\n{'='*60}")
         print(f"[{self.name}] Collecte terminée en {duration:.2f}s")
         print(f"  ✓ Collectées  : {stats['collected']}")
         print(f"  ✓ Insérées    : {stats['inserted']}")
+        print(f"  ✓ Mises à jour: {stats['updated']}")
         print(f"  ⚠ Doublons    : {stats['duplicates']}")
         print(f"  ✗ Erreurs     : {stats['errors']}")
+        print(f"  ↻ Réessais    : {stats['retries']}")
+        if self.http_cache is not None:
+            print(f"  ♻ Cache HTTP  : {stats['cache_hits']} servies, "
+                  f"{stats['cache_revalidated']} revalidées (304), {stats['cache_misses']} téléchargées")
         print(f"{'='*60}\n")
+    
+    # ========== EXÉCUTION EN PIPELINE ==========
+    
+    async def collect_stream(self):
+        """
+        Variante asynchrone de collect() : générateur des vulnérabilités
+        
+        Par défaut collect() s'exécute dans un thread et ses résultats sont
+        émis à la fin ; un collecteur la redéfinit pour émettre chaque
+        enregistrement dès qu'il est téléchargé.
+        
+        Yields:
+            Dict: Vulnérabilité normalisée
+        """
+        for vuln in await asyncio.to_thread(self.collect):
+            yield vuln
+    
+    async def _stream_concurrent(self, func, items):
+        """
+        Appliquer func (bloquante) à chaque élément, au plus self.concurrency
+        appels en cours, et émettre les résultats dans l'ordre d'arrivée
+        
+        Les échecs sont affichés et comptés dans error_count.
+        
+        Yields:
+            Tuple: (élément, résultat)
+        """
+        items = iter(items)
+        pending = {}
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            loop = asyncio.get_running_loop()
+            while True:
+                for item in islice(items, self.concurrency - len(pending)):
+                    pending[loop.run_in_executor(executor, func, item)] = item
+                if not pending:
+                    break
+                
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"[{self.name}] Erreur sur {item} : {e}")
+                        self.error_count += 1
+                        continue
+                    yield item, result
+    
+    async def run_async(self, batch_size=None, queue_size=None):
+        """
+        Exécuter le collecteur en pipeline : téléchargement → préparation → écriture
+        
+        Les trois étapes tournent en parallèle, reliées par des files bornées :
+        les lots sont écrits (dans un thread) pendant que les téléchargements
+        suivants continuent, et un écrivain lent ralentit le téléchargement
+        au lieu d'accumuler les enregistrements en mémoire.
+        
+        Args:
+            batch_size: Lignes par écriture (Config.DB_BULK_BATCH_SIZE)
+            queue_size: Capacité de chaque file (Config.COLLECTOR_QUEUE_SIZE)
+        
+        Returns:
+            Dict: Statistiques complètes (comme run())
+        """
+        batch_size = batch_size or Config.DB_BULK_BATCH_SIZE
+        queue_size = queue_size or Config.COLLECTOR_QUEUE_SIZE
+        collected = asyncio.Queue(queue_size)
+        prepared = asyncio.Queue(queue_size)
+        
+        self._print_header()
+        self.start_time = time.time()
+        
+        async def fetch():
+            try:
+                async for vuln in self.collect_stream():
+                    self.collected_count += 1
+                    await collected.put(vuln)
+            except Exception as e:
+                print(f"[{self.name}] Erreur collecte : {e}")
+                self.error_count += 1
+            finally:
+                await collected.put(None)
+        
+        async def prepare():
+            while (vuln := await collected.get()) is not None:
+                try:
+                    await prepared.put(self._prepare(vuln))
+                except Exception as e:
+                    self.error_count += 1
+                    print(f"[{self.name}] Erreur préparation : {e}")
+            await prepared.put(None)
+        
+        async def write():
+            rows = {'package': [], 'cve': []}
+            while True:
+                item = await prepared.get()
+                if item is not None:
+                    rows[item[0]].append(item[1])
+                if rows['package'] or rows['cve']:
+                    if item is None or len(rows['package']) + len(rows['cve']) >= batch_size:
+                        await asyncio.to_thread(self._write_batch, rows['package'], rows['cve'])
+                        rows = {'package': [], 'cve': []}
+                if item is None:
+                    break
         
+        try:
+            await asyncio.gather(fetch(), prepare(), write())
+        finally:
+            self.close()
+        self._commit_state()
+        
+        stats = self._stats()
+        self._print_summary(stats)
         return stats
     
+    def run_pipelined(self, **kwargs):
+        """Point d'entrée synchrone de run_async() (automatisation, scripts)"""
+        return asyncio.run(self.run_async(**kwargs))
+    
+    # ========== HTTP ==========
+    
+    @property
+    def session(self):
+        """Session HTTP keep-alive partagée par les threads du collecteur"""
+        if self._session is None:
+            with self._http_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+    
+    def _send(self, method, url, **kwargs):
+        """
+        Envoyer une requête au rythme autorisé par l'hôte, avec réessais
+        
+        Les réponses 429/5xx, les quotas épuisés et les erreurs réseau
+        sont réessayés (Config.COLLECTOR_RETRIES fois au plus) après un
+        délai exponentiel à gigue ; le limiteur tient compte des en-têtes
+        Retry-After / X-RateLimit-* de chaque réponse.
+        
+        Returns:
+            requests.Response: Dernière réponse reçue
+        
+        Raises:
+            requests.RequestException: Erreur réseau après le dernier essai
+        """
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.acquire(url)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except RETRY_EXCEPTIONS:
+                if attempt == self.retries:
+                    raise
+            else:
+                self.rate_limiter.observe(url, response)
+                if attempt == self.retries or not should_retry(response):
+                    return response
+            
+            with self._http_lock:
+                self.retry_count += 1
+            time.sleep(backoff_delay(attempt))
+    
+    def _request(self, method, url, not_before=None, **kwargs):
+        """
+        Requête HTTP sur la session partagée, via le cache disque
+        
+        Une réponse fraîche en cache est resservie sans appel réseau ; une
+        entrée périmée est revalidée (If-None-Match / If-Modified-Since) et
+        une réponse 304 réutilise son corps. Quand l'appelant fournit
+        lui-même un en-tête conditionnel, le cache n'est pas consulté et
+        la réponse 304 lui est rendue telle quelle.
+        
+        Args:
+            method: Méthode HTTP
+            url: URL complète
+            not_before: Horodatage (epoch) : une réponse en cache plus ancienne est revalidée
+            **kwargs: Arguments de requests.Session.request
+        
+        Raises:
+            requests.RequestException: Erreur réseau ou statut HTTP d'erreur (4xx/5xx)
+        """
+        kwargs.setdefault('timeout', Config.COLLECTOR_HTTP_TIMEOUT)
+        headers = dict(kwargs.pop('headers', None) or {})
+        cache = self.http_cache
+        key = entry = None
+        
+        if cache is not None and not ({'If-None-Match', 'If-Modified-Since'} & set(headers)):
+            key = cache.key(method, url, kwargs.get('params'), kwargs.get('json'))
+            entry = cache.get(key)
+            if entry is not None:
+                if cache.is_fresh(entry, not_before):
+                    self._count_cache('hits')
+                    return cache.to_response(entry)
+                headers.update(cache.conditional_headers(entry))
+        
+        response = self._send(method, url, headers=headers, **kwargs)
+        
+        if key is not None:
+            if entry is not None and response.status_code == 304:
+                cache.refresh(key)
+                self._count_cache('revalidated')
+                return cache.to_response(entry)
+            self._count_cache('misses')
+            if response.status_code == 200:
+                cache.store(key, response)
+        
+        response.raise_for_status()
+        return response
+    
+    def _count_cache(self, counter):
+        """Compter un accès au cache pour la collecte et pour le cache partagé"""
+        with self._http_lock:
+            self._cache_counts[counter] += 1
+        self.http_cache.record(counter)
+    
+    def _request_json(self, method, url, **kwargs):
+        """Requête HTTP sur la session partagée, réponse JSON décodée"""
+        return self._request(method, url, **kwargs).json()
+    
+    def _map_concurrent(self, func, items):
+        """
+        Appliquer func à chaque élément dans un pool borné de threads
+        
+        Les échecs sont affichés et comptés dans error_count, l'élément est
+        alors absent du résultat.
+        
+        Args:
+            func: Fonction appelée avec un élément
+            items: Éléments à traiter (clés du dictionnaire résultat)
+        
+        Returns:
+            Dict: {élément: résultat}
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(func, item): item for item in items}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"[{self.name}] Erreur sur {futures[future]} : {e}")
+                    self.error_count += 1
+        return results
+    
+    def close(self):
+        """Fermer la session HTTP (connexions keep-alive)"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+    
+    # ========== COLLECTE INCRÉMENTALE ==========
+    
+    def _get_state(self, key):
+        """
+        Filigrane enregistré pour une clé (vide en collecte complète)
+        
+        Returns:
+            Dict: {'watermark', 'etag', 'seen_ids'} ou {} si inconnu
+        """
+        if self.full:
+            return {}
+        if self._state is None:
+            self._state = self.db.get_collector_state(self.name)
+        return self._state.get(key, {})
+    
+    def _stage_state(self, key, watermark=None, etag=None, seen_ids=()):
+        """Préparer un nouveau filigrane, enregistré après l'écriture des données"""
+        self._pending_state[key] = {'watermark': watermark, 'etag': etag, 'seen_ids': list(seen_ids)}
+    
+    def _commit_state(self):
+        """
+        Enregistrer les filigranes préparés pendant la collecte
+        
+        Rien n'est enregistré si une écriture a échoué : la collecte
+        suivante retélécharge alors les mêmes avis.
+        """
+        if self._write_failed:
+            print(f"[{self.name}] ⚠ Filigranes non enregistrés (erreur d'écriture)")
+        elif self._pending_state:
+            self.db.save_collector_state(self.name, self._pending_state)
+        self._pending_state = {}
+        self._state = None
+        self._write_failed = False
+    
+    @staticmethod
+    def _parse_modified(value):
+        """Horodatage ISO 8601 ('2024-05-01T12:00:00.5Z') en datetime UTC comparable"""
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except (TypeError, ValueError):
+            return datetime.min.replace(tzinfo=timezone.utc)
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    
+    def _latest(self, *values):
+        """Horodatage ISO le plus récent parmi les valeurs non vides (None sinon)"""
+        values = [v for v in values if v]
+        return max(values, key=self._parse_modified) if values else None
+    
     # ========== MÉTHODES UTILITAIRES ==========
     
     def _normalize_severity(self, severity):
@@ -176,6 +580,10 @@ class BaseCollector(ABC):
         except:
             return datetime.now().strftime('%Y-%m-%d')
     
+    def _parse_timestamp(self, date_str):
+        """Date normalisée par _parse_date, en timestamp UTC (colonnes *_ts)"""
+        return VulnerabilityDB.to_timestamp(self._parse_date(date_str))
+    
     def _get_first_reference(self, references):
         """Obtenir la première référence URL"""
         if not references:
@@ -205,15 +613,9 @@ class BaseCollector(ABC):
         else:
             return 'Other'
     
-    def _extract_patched_version(self, affected_versions):
-        """Extraire la version patchée"""
-        # Simplification : retourner vide pour l'instant
-        return ''
-    
-    def _extract_patched_version(self, affected_versions):
-        """Extraire la version patchée"""
-        # Simplification : retourner vide pour l'instant
-        return ''
+    def _extract_patched_version(self, affected_ranges, ecosystem=None):
+        """Version corrigée la plus récente des plages affectées ('' si aucune)"""
+        return latest_fixed(affected_ranges, ecosystem)
 
     def _normalize_ecosystem(self, ecosystem):
         """
@@ -225,49 +627,5 @@ class BaseCollector(ABC):
         Returns:
             str: Nom normalisé (ex: 'pip', 'maven')
         """
-        if not ecosystem:
-            return 'npm'
-        
-        # Mapping des noms
-        ecosystem_map = {
-            # Python
-            'PyPI': 'pip',
-            'pypi': 'pip',
-            'Python': 'pip',
-            'PYPI': 'pip',
-            
-            # Java
-            'Maven': 'maven',
-            'MAVEN': 'maven',
-            'maven': 'maven',
-            
-            # JavaScript
-            'npm': 'npm',
-            'NPM': 'npm',
-            'Node': 'npm',
-            'node': 'npm',
-            'nodejs': 'npm',
-            
-            # Docker
-            'Docker': 'docker',
-            'docker': 'docker',
-            'DOCKER': 'docker',
-            
-            # Kubernetes
-            'Kubernetes': 'kubernetes',
-            'kubernetes': 'kubernetes',
-            'k8s': 'kubernetes',
-            'K8s': 'kubernetes',
-            
-            # GitHub
-            'GitHub': 'github',
-            'github': 'github',
-            'Github': 'github',
-            'GITHUB': 'github'
-        }
-        
-        # Nettoyer et normaliser
-        ecosystem_clean = str(ecosystem).strip()
-        normalized = ecosystem_map.get(ecosystem_clean, 'npm')
-        
-        return normalized
\ No newline at end of file
+        # Écosystème absent ou inconnu : npm
+        return normalize_ecosystem(ecosystem) or 'npm'
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""
+Cache disque des réponses HTTP des collecteurs
+
+Les réponses 200 sont conservées dans un fichier SQLite, sous une clé
+calculée sur la méthode, l'URL, les paramètres et le corps JSON de la
+requête. Une réponse plus récente que le TTL est resservie sans appel
+réseau ; au-delà, la requête est renvoyée avec If-None-Match /
+If-Modified-Since et une réponse 304 réutilise le corps en cache. La
+taille totale est bornée : les entrées les moins récemment lues sont
+évincées (LRU).
+
+Le cache est partagé par tous les collecteurs du processus
+(get_http_cache) et sûr entre threads.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from config import Config
+
+
+class HTTPCache:
+    """Cache de réponses HTTP sur disque (TTL, LRU borné, requêtes conditionnelles)"""
+
+    def __init__(self, path=None, ttl=None, max_bytes=None):
+        """
+        Args:
+            path: Fichier SQLite du cache (Config.HTTP_CACHE_PATH)
+            ttl: Durée de fraîcheur en secondes (Config.HTTP_CACHE_TTL)
+            max_bytes: Taille maximale des corps conservés (Config.HTTP_CACHE_MAX_BYTES)
+        """
+        self.path = path or Config.HTTP_CACHE_PATH
+        self.ttl = Config.HTTP_CACHE_TTL if ttl is None else ttl
+        self.max_bytes = max_bytes or Config.HTTP_CACHE_MAX_BYTES
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript('''
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            headers TEXT NOT NULL,
+            body BLOB NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            size INTEGER NOT NULL,
+            stored_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+        ''')
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        # Métriques
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(method, url, params=None, body=None):
+        """Clé d'une requête : méthode, URL, paramètres et corps JSON"""
+        payload = json.dumps([method.upper(), url, params or {}, body], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    # ========== LECTURE ==========
+
+    def get(self, key):
+        """
+        Entrée en cache (marquée comme lue pour l'éviction LRU)
+
+        Returns:
+            Dict: {'url', 'status', 'headers', 'body', 'etag', 'last_modified', 'stored_at'} ou None
+        """
+        with self._lock:
+            row = self._conn.execute('''
+            SELECT url, status, headers, body, etag, last_modified, stored_at
+            FROM responses WHERE key = ?
+            ''', (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+
+        url, status, headers, body, etag, last_modified, stored_at = row
+        return {'url': url, 'status': status, 'headers': json.loads(headers), 'body': body,
+                'etag': etag, 'last_modified': last_modified, 'stored_at': stored_at}
+
+    def is_fresh(self, entry, not_before=None):
+        """
+        Entrée utilisable sans requête
+
+        Args:
+            entry: Entrée renvoyée par get()
+            not_before: Horodatage (epoch) : une entrée stockée avant est périmée
+        """
+        if not_before is not None and entry['stored_at'] < not_before:
+            return False
+        return time.time() - entry['stored_at'] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        """En-têtes de revalidation d'une entrée (If-None-Match / If-Modified-Since)"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    @staticmethod
+    def to_response(entry):
+        """Reconstruire un requests.Response à partir d'une entrée"""
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body']
+        response.url = entry['url']
+        response.encoding = 'utf-8'
+        return response
+
+    # ========== ÉCRITURE ==========
+
+    def store(self, key, response):
+        """Conserver une réponse 200 puis évincer les entrées les plus anciennes"""
+        body = response.content
+        now = time.time()
+
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute('''
+            INSERT OR REPLACE INTO responses
+            (key, url, status, headers, body, etag, last_modified, size, stored_at, accessed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                key, response.url, response.status_code, json.dumps(dict(response.headers)), body,
+                response.headers.get('ETag'), response.headers.get('Last-Modified'), len(body), now, now
+            ))
+            self._size += len(body) - (old[0] if old else 0)
+            self._evict()
+
+    def refresh(self, key):
+        """Réponse 304 : l'entrée redevient fraîche pour un TTL"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+    def _evict(self):
+        """Supprimer les entrées les moins récemment lues au-delà de max_bytes (verrou tenu)"""
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+
+            evicted = []
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                self._size -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+            self.evictions += len(evicted)
+
+    def record(self, counter):
+        """Incrémenter une métrique ('hits', 'revalidated' ou 'misses')"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def clear(self):
+        """Vider le cache"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._size = 0
+
+    def stats(self):
+        """Métriques du cache (entrées, taille, succès, revalidations, échecs, évictions)"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            'entries': entries,
+            'bytes': self._size,
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def close(self):
+        """Fermer le fichier du cache"""
+        with self._lock:
+            self._conn.close()
+
+
+# ========== INSTANCE PARTAGÉE ==========
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """Cache partagé par les collecteurs du processus (None si Config.HTTP_CACHE_ENABLED est faux)"""
+    global _shared_cache
+    if not Config.HTTP_CACHE_ENABLED:
+        return None
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = HTTPCache()
+    return _shared_cache
@@ -3,9 +3,11 @@ Collecteur OSV + GitHub API
 Adapté pour le projet VTBDA
 """
 
-import requests
-import time
+import asyncio
 from datetime import datetime
+from urllib.parse import quote
+from config import Config
+from versions import format_ranges, osv_ranges
 from .base_collector import BaseCollector
 
 
@@ -32,13 +34,27 @@ class OSVGitHubCollector(BaseCollector):
         "github actions vulnerability"
     ]
     
-    OSV_API = "https://api.osv.dev/v1/query"
     GITHUB_API_URL = "https://api.github.com/search/issues"
     
-    def __init__(self):
-        super().__init__(name="OSV+GitHub")
+    def __init__(self, db=None, packages=None, osv_url=None, concurrency=None, rate_limit=None, full=False,
+                 http_cache=None):
+        """
+        Args:
+            db: Base injectée (instance partagée par défaut)
+            packages: Tuples (écosystème, package) à surveiller (PACKAGES par défaut)
+            osv_url: URL de base de l'API OSV (Config.OSV_API_URL)
+            concurrency: Requêtes HTTP simultanées (Config.COLLECTOR_CONCURRENCY)
+            rate_limit: Requêtes/s par hôte sans quota annoncé (limiteur partagé par défaut)
+            full: Ignorer les filigranes (collecte complète)
+            http_cache: Cache HTTP (partagé par défaut, False = désactivé)
+        """
+        super().__init__(name="OSV+GitHub", db=db, concurrency=concurrency, rate_limit=rate_limit, full=full,
+                         http_cache=http_cache)
+        self.packages = list(packages or self.PACKAGES)
+        self.osv_url = (osv_url or Config.OSV_API_URL).rstrip('/')
         self.osv_vulnerabilities = []
         self.github_issues = []
+        self._osv_modified = {}
     
     def collect(self):
         """
@@ -48,7 +64,7 @@ class OSVGitHubCollector(BaseCollector):
             List[Dict]: Liste combinée des vulnérabilités
         """
         # Collecter depuis OSV
-        print(f"[{self.name}] Collecte OSV pour {len(self.PACKAGES)} packages...")
+        print(f"[{self.name}] Collecte OSV pour {len(self.packages)} packages...")
         self.osv_vulnerabilities = self._collect_osv()
         
         # Collecter depuis GitHub
@@ -66,101 +82,236 @@ class OSVGitHubCollector(BaseCollector):
         """
         Collecter les vulnérabilités depuis OSV
         
+        Les identifiants sont obtenus par querybatch (jusqu'à
+        Config.OSV_BATCH_SIZE packages par appel), puis seuls les avis
+        nouveaux ou modifiés depuis la collecte précédente sont téléchargés,
+        une seule fois chacun, dans le pool de threads borné.
+        
         Returns:
             List[Dict]: Vulnérabilités OSV normalisées
         """
-        vulnerabilities = []
+        listings = self._query_osv_batch(self.packages)
+        targets = self._plan_osv_fetches(listings)
+        details = self._map_concurrent(self._fetch_osv_vuln, sorted(targets))
+        self._stage_osv_state(listings, targets, details)
         
-        for ecosystem, package in self.PACKAGES:
-            try:
-                print(f"  → {ecosystem}/{package}...", end=" ")
-                
-                # Requête OSV API
-                payload = {
-                    "package": {
-                        "ecosystem": ecosystem,
-                        "name": package
-                    }
-                }
-                
-                response = requests.post(
-                    self.OSV_API,
-                    json=payload,
-                    timeout=30
-                )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                vulns = data.get("vulns", [])
-                
-                print(f"{len(vulns)} trouvées")
+        # Normaliser chaque vulnérabilité
+        return [
+            self._normalize_osv_vuln(details[vuln_id], package, ecosystem)
+            for vuln_id in sorted(targets) if vuln_id in details
+            for ecosystem, package in targets[vuln_id]
+        ]
+    
+    def _query_osv_batch(self, packages):
+        """
+        Avis OSV de chaque package (endpoint querybatch)
+        
+        Les résultats paginés (next_page_token) sont redemandés au tour
+        suivant, avec les seules requêtes encore incomplètes.
+        
+        Args:
+            packages: Liste de tuples (écosystème, package)
+        
+        Returns:
+            Dict: {(écosystème, package): [(identifiant, modified)]}, sans les
+                  packages dont un lot a échoué
+        """
+        results = {}
+        tokens = {}
+        pending = list(dict.fromkeys(packages))
+        
+        while pending:
+            next_pending = []
+            for start in range(0, len(pending), Config.OSV_BATCH_SIZE):
+                chunk = pending[start:start + Config.OSV_BATCH_SIZE]
+                queries = []
+                for ecosystem, package in chunk:
+                    query = {"package": {"ecosystem": ecosystem, "name": package}}
+                    if (ecosystem, package) in tokens:
+                        query["page_token"] = tokens[(ecosystem, package)]
+                    queries.append(query)
                 
-                # Normaliser chaque vulnérabilité
-                for vuln in vulns:
-                    normalized = self._normalize_osv_vuln(vuln, package, ecosystem)
-                    vulnerabilities.append(normalized)
+                try:
+                    data = self._request_json('POST', f"{self.osv_url}/querybatch", json={"queries": queries})
+                except Exception as e:
+                    print(f"  → querybatch ({len(chunk)} packages) ERREUR : {e}")
+                    self.error_count += 1
+                    # Liste partielle : inutilisable pour les filigranes
+                    for key in chunk:
+                        results.pop(key, None)
+                    continue
                 
-                # Pause pour ne pas surcharger l'API
-                time.sleep(0.3)
+                for key, result in zip(chunk, data.get("results", [])):
+                    results.setdefault(key, []).extend(
+                        (vuln["id"], vuln.get("modified")) for vuln in result.get("vulns") or [] if vuln.get("id")
+                    )
+                    if result.get("next_page_token"):
+                        tokens[key] = result["next_page_token"]
+                        next_pending.append(key)
+            pending = next_pending
+        
+        return results
+    
+    def _plan_osv_fetches(self, listings):
+        """
+        Avis à télécharger : jamais vus, ou modifiés après le filigrane du package
+        
+        Args:
+            listings: Résultat de _query_osv_batch
+        
+        Returns:
+            Dict: {identifiant: [(écosystème, package)]}
+        """
+        targets = {}
+        for (ecosystem, package), vulns in listings.items():
+            state = self._get_state(f"osv:{ecosystem}/{package}")
+            seen = set(state.get('seen_ids') or ())
+            watermark = self._parse_modified(state.get('watermark'))
+            
+            changed = [
+                vuln_id for vuln_id, modified in vulns
+                if vuln_id not in seen or self._parse_modified(modified) > watermark
+            ]
+            print(f"  → {ecosystem}/{package}... {len(vulns)} trouvées, {len(changed)} nouvelles ou modifiées")
+            
+            # Date de modification : une copie plus ancienne du cache HTTP est revalidée
+            for vuln_id, modified in vulns:
+                self._osv_modified[vuln_id] = self._latest(self._osv_modified.get(vuln_id), modified)
+            
+            for vuln_id in changed:
+                targets.setdefault(vuln_id, []).append((ecosystem, package))
+        return targets
+    
+    def _stage_osv_state(self, listings, targets, fetched):
+        """
+        Préparer les filigranes des packages dont tous les avis à jour ont été
+        téléchargés (un échec laisse le filigrane inchangé pour ce package)
+        """
+        failed = {
+            package_key for vuln_id, package_keys in targets.items() if vuln_id not in fetched
+            for package_key in package_keys
+        }
+        for (ecosystem, package), vulns in listings.items():
+            if (ecosystem, package) in failed:
+                continue
+            key = f"osv:{ecosystem}/{package}"
+            self._stage_state(
+                key,
+                watermark=self._latest(self._get_state(key).get('watermark'), *(m for _, m in vulns)),
+                seen_ids=[vuln_id for vuln_id, _ in vulns]
+            )
+    
+    def _fetch_osv_vuln(self, vuln_id):
+        """Détail complet d'un avis OSV (GET /vulns/{id}), en cache s'il n'a pas changé depuis"""
+        modified = self._osv_modified.get(vuln_id)
+        return self._request_json(
+            'GET', f"{self.osv_url}/vulns/{quote(vuln_id, safe='')}",
+            not_before=self._parse_modified(modified).timestamp() if modified else None
+        )
+    
+    def _collect_github(self):
+        """
+        Collecter les issues GitHub liées à la sécurité
+        
+        Returns:
+            List[Dict]: Issues GitHub normalisées
+        """
+        issues = []
+        
+        for keyword in self.GITHUB_KEYWORDS:
+            try:
+                issues.extend(self._search_github(keyword))
             
             except Exception as e:
                 print(f"ERREUR : {e}")
                 self.error_count += 1
         
-        return vulnerabilities
+        return issues
     
-    def _collect_github(self):
+    def _search_github(self, keyword):
         """
-        Collecter les issues GitHub liées à la sécurité
+        Issues GitHub créées depuis la collecte précédente pour un mot-clé
+        
+        La requête est conditionnelle (If-None-Match avec l'ETag enregistré) :
+        une réponse 304 signifie qu'aucune issue n'est apparue.
         
         Returns:
             List[Dict]: Issues GitHub normalisées
         """
-        issues = []
+        print(f"  → GitHub: '{keyword}'...", end=" ")
+        
+        key = f"github:{keyword}"
+        state = self._get_state(key)
         
         headers = {
             'Accept': 'application/vnd.github.v3+json'
         }
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        
+        params = {
+            'q': f"{keyword} is:issue",
+            'sort': 'created',
+            'order': 'desc',
+            'per_page': 5
+        }
+        
+        response = self._request(
+            'GET',
+            self.GITHUB_API_URL,
+            headers=headers,
+            params=params
+        )
+        if response.status_code == 304:
+            print("inchangé")
+            return []
+        
+        items = response.json().get('items', [])
+        
+        # Seulement les issues postérieures au filigrane
+        watermark = self._parse_modified(state.get('watermark'))
+        items = [item for item in items if self._parse_modified(item.get('created_at')) > watermark]
+        
+        print(f"{len(items)} issues")
+        
+        self._stage_state(
+            key,
+            watermark=self._latest(state.get('watermark'), *(item.get('created_at') for item in items)),
+            etag=response.headers.get('ETag')
+        )
         
+        # Normaliser chaque issue
+        return [self._normalize_github_issue(item, keyword) for item in items]
+    
+    async def collect_stream(self):
+        """
+        Collecte en flux : chaque avis OSV est émis dès que son détail est
+        téléchargé, puis les issues GitHub mot-clé par mot-clé
+        
+        Yields:
+            Dict: Vulnérabilité normalisée
+        """
+        print(f"[{self.name}] Collecte OSV pour {len(self.packages)} packages...")
+        listings = await asyncio.to_thread(self._query_osv_batch, self.packages)
+        
+        # Un téléchargement par avis nouveau ou modifié, même s'il touche plusieurs packages
+        targets = self._plan_osv_fetches(listings)
+        fetched = set()
+        async for vuln_id, vuln in self._stream_concurrent(self._fetch_osv_vuln, sorted(targets)):
+            fetched.add(vuln_id)
+            for ecosystem, package in targets[vuln_id]:
+                yield self._normalize_osv_vuln(vuln, package, ecosystem)
+        self._stage_osv_state(listings, targets, fetched)
+        
+        print(f"[{self.name}] Collecte GitHub Issues...")
         for keyword in self.GITHUB_KEYWORDS:
             try:
-                print(f"  → GitHub: '{keyword}'...", end=" ")
-                
-                params = {
-                    'q': f"{keyword} is:issue",
-                    'sort': 'created',
-                    'order': 'desc',
-                    'per_page': 5
-                }
-                
-                response = requests.get(
-                    self.GITHUB_API_URL,
-                    headers=headers,
-                    params=params,
-                    timeout=30
-                )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                items = data.get('items', [])
-                
-                print(f"{len(items)} issues")
-                
-                # Normaliser chaque issue
-                for item in items:
-                    normalized = self._normalize_github_issue(item, keyword)
-                    issues.append(normalized)
-                
-                # Pause pour respecter rate limit GitHub
-                time.sleep(1)
+                for issue in await asyncio.to_thread(self._search_github, keyword):
+                    yield issue
             
             except Exception as e:
                 print(f"ERREUR : {e}")
                 self.error_count += 1
-        
-        return issues
     
     def _normalize_osv_vuln(self, vuln, package, ecosystem):
         """
@@ -191,12 +342,18 @@ class OSVGitHubCollector(BaseCollector):
             if url:
                 references.append(url)
         
-        # Versions affectées
+        # Versions affectées : intervalles structurés + résumé lisible
         affected_versions = []
+        affected_ranges = []
         for affected in vuln.get('affected', []):
-            pkg = affected.get('package', {}).get('name', '')
-            ranges = affected.get('ranges', [])
-            affected_versions.append(f"{pkg}:{ranges}")
+            pkg = affected.get('package', {})
+            name = pkg.get('name', '') or package
+            intervals = osv_ranges(affected)
+            affected_versions.append(f"{name} {format_ranges(intervals)}".strip())
+            affected_ranges.extend(
+                dict(interval, package=name, ecosystem=self._normalize_ecosystem(pkg.get('ecosystem') or ecosystem))
+                for interval in intervals
+            )
         
         return {
             'source': 'OSV',
@@ -206,6 +363,7 @@ class OSVGitHubCollector(BaseCollector):
             'severity': severity,
             'summary': summary,
             'affected_versions': ', '.join(affected_versions),
+            'affected_ranges': affected_ranges,
             'references': references,
             'published': published,
             'collected_at': datetime.now().isoformat()
@@ -238,12 +396,18 @@ class OSVGitHubCollector(BaseCollector):
 
 # Test du collecteur
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Collecteur OSV + GitHub")
+    parser.add_argument('--full', action='store_true', help="Ignorer les filigranes et tout retélécharger")
+    args = parser.parse_args()
+    
     print("=" * 70)
     print("TEST DU COLLECTEUR OSV + GITHUB")
     print("=" * 70)
     
-    collector = OSVGitHubCollector()
-    stats = collector.run()
+    collector = OSVGitHubCollector(full=args.full)
+    stats = collector.run_pipelined()
     
     print("\n✅ Test terminé !")
     print(f"📊 Résultats : {stats}")
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""
+Limiteur de débit adaptatif et politique de réessai des collecteurs
+
+Un seau à jetons par hôte, partagé par tous les collecteurs du processus :
+- sans information de l'API, le débit est Config.COLLECTOR_RATE_LIMIT
+  requêtes/s (rafale de Config.COLLECTOR_RATE_BURST) ;
+- dès qu'une réponse annonce son quota (X-RateLimit-Remaining /
+  X-RateLimit-Reset), les requêtes partent aussi vite que ce quota le
+  permet, puis attendent la remise à zéro quand il est épuisé ;
+- Retry-After (429, 503) bloque l'hôte pendant la durée demandée.
+
+Les réponses 429/5xx, les quotas épuisés (403 + X-RateLimit-Remaining: 0)
+et les erreurs réseau (timeout, connexion) sont réessayés avec un délai
+exponentiel à gigue complète (backoff_delay).
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from config import Config
+
+
+# Statuts HTTP réessayés
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Erreurs réseau réessayées
+RETRY_EXCEPTIONS = (requests.Timeout, requests.ConnectionError)
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """
+    Délai avant le réessai n° attempt (0 = premier) : tirage uniforme
+    entre 0 et min(cap, base * 2^attempt) (« full jitter »)
+    """
+    base = Config.COLLECTOR_BACKOFF_BASE if base is None else base
+    cap = Config.COLLECTOR_BACKOFF_MAX if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def should_retry(response):
+    """Réponse à réessayer : 429/5xx ou quota épuisé (403 de GitHub)"""
+    if response.status_code in RETRY_STATUSES:
+        return True
+    return response.status_code == 403 and response.headers.get('X-RateLimit-Remaining') == '0'
+
+
+def parse_retry_after(value):
+    """
+    Valeur de Retry-After en secondes (délai ou date HTTP)
+
+    Returns:
+        float: Secondes à attendre, None si absente ou illisible
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Seau à jetons d'un hôte, ajusté par les en-têtes de quota de l'API"""
+
+    def __init__(self, rate, burst=1):
+        """
+        Args:
+            rate: Jetons par seconde sans quota annoncé (0 = illimité)
+            burst: Jetons accumulables (requêtes consécutives sans attente)
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+        # Quota annoncé par l'API (None = inconnu) et blocage Retry-After
+        self.remaining = None
+        self.reset_at = None
+        self.blocked_until = 0.0
+
+        self._lock = threading.Lock()
+
+    def _delay(self, now):
+        """Attente nécessaire avant la prochaine requête (verrou tenu), 0 = jeton pris"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        if self.remaining is not None:
+            if now >= self.reset_at:
+                self.remaining = self.reset_at = None
+            elif self.remaining <= 0:
+                return self.reset_at - now
+            else:
+                # Quota connu et disponible : pas de limite locale
+                self.remaining -= 1
+                return 0.0
+
+        if not self.rate:
+            return 0.0
+
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """
+        Attendre un jeton
+
+        Returns:
+            float: Secondes d'attente
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                delay = self._delay(time.monotonic())
+            if delay <= 0:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def observe(self, headers):
+        """Ajuster le seau aux en-têtes d'une réponse (quota, Retry-After)"""
+        now = time.monotonic()
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+
+        with self._lock:
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            if remaining is not None and reset is not None:
+                try:
+                    # X-RateLimit-Reset : horodatage epoch de la remise à zéro
+                    self.reset_at = now + max(0.0, float(reset) - time.time())
+                    self.remaining = int(remaining)
+                except ValueError:
+                    pass
+
+
+class RateLimiter:
+    """Seaux à jetons par hôte"""
+
+    def __init__(self, rate=None, burst=None):
+        """
+        Args:
+            rate: Requêtes/s par hôte sans quota annoncé (Config.COLLECTOR_RATE_LIMIT)
+            burst: Rafale autorisée (Config.COLLECTOR_RATE_BURST)
+        """
+        self.rate = Config.COLLECTOR_RATE_LIMIT if rate is None else rate
+        self.burst = burst or Config.COLLECTOR_RATE_BURST
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url):
+        """Seau de l'hôte d'une URL"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def acquire(self, url):
+        """Attendre le droit d'envoyer une requête à cet hôte (secondes d'attente)"""
+        return self.bucket(url).acquire()
+
+    def observe(self, url, response):
+        """Prendre en compte les en-têtes de quota d'une réponse"""
+        self.bucket(url).observe(response.headers)
+
+
+# ========== INSTANCE PARTAGÉE ==========
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Limiteur partagé par les collecteurs du processus"""
+    global _shared_limiter
+    if _shared_limiter is None:
+        with _shared_limiter_lock:
+            if _shared_limiter is None:
+                _shared_limiter = RateLimiter()
+    return _shared_limiter
@@ -12,6 +12,85 @@ class Config:
     
     # Configuration session
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
+    
+    # Fichier SQLite utilisé par l'instance partagée (database.get_db)
+    DB_PATH = os.getenv('DB_PATH', os.path.join('data', 'vulnerabilities.db'))
+    
+    # Pool de connexions SQLite (database.py)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    DB_PRAGMAS = {
+        'cache_size': -16000,       # 16 Mo de cache de pages par connexion
+        'temp_store': 'MEMORY',
+    }
+    
+    # Mode WAL : les lectures de l'interface ne sont pas bloquées par les collecteurs
+    DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'WAL')
+    DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+    DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000))
+    DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 256 * 1024 * 1024))
+    
+    # Politique de checkpoint WAL
+    DB_WAL_AUTOCHECKPOINT = int(os.getenv('DB_WAL_AUTOCHECKPOINT', 1000))     # en pages, 0 = désactivé
+    DB_CHECKPOINT_INTERVAL = int(os.getenv('DB_CHECKPOINT_INTERVAL', 300))    # en secondes, 0 = pas de thread
+    DB_CHECKPOINT_MODE = os.getenv('DB_CHECKPOINT_MODE', 'PASSIVE')           # PASSIVE, FULL, RESTART, TRUNCATE
+    
+    # Ingestion par lots (bulk_upsert_*)
+    DB_BULK_BATCH_SIZE = int(os.getenv('DB_BULK_BATCH_SIZE', 500))
+    
+    # Durée de vie du cache des comptages filtrés (/api/vulnerabilities)
+    DB_COUNT_CACHE_TTL = int(os.getenv('DB_COUNT_CACHE_TTL', 60))
+    
+    # Migrations de schéma (migrations.py) : lignes par lot validé
+    DB_MIGRATION_CHUNK_SIZE = int(os.getenv('DB_MIGRATION_CHUNK_SIZE', 5000))
+    
+    # Sauvegarde en ligne (backup.py) : pages copiées par étape et pause entre deux étapes
+    DB_BACKUP_PAGES = int(os.getenv('DB_BACKUP_PAGES', 1024))
+    DB_BACKUP_SLEEP = float(os.getenv('DB_BACKUP_SLEEP', 0.01))
+    DB_BACKUP_DIR = os.getenv('DB_BACKUP_DIR', 'data')
+    
+    # Snapshot en lecture seule lu par les rapports (VulnerabilityDB.open_snapshot)
+    DB_SNAPSHOT_PATH = os.getenv('DB_SNAPSHOT_PATH', os.path.join('data', 'vulnerabilities_snapshot.db'))
+    
+    # Rétention : âge maximal (jours) des lignes chaudes par source, les lignes
+    # plus anciennes passent dans la base d'archive attachée (apply_retention)
+    RETENTION_DAYS = {
+        'GitHub Issues': int(os.getenv('RETENTION_GITHUB_ISSUES_DAYS', 90)),
+    }
+    RETENTION_DEFAULT_DAYS = int(os.getenv('RETENTION_DEFAULT_DAYS', 0))     # autres sources, 0 = conservées
+    RETENTION_TRENDS_DAYS = int(os.getenv('RETENTION_TRENDS_DAYS', 180))     # table trends (last_updated)
+    
+    # Graphe supply-chain (supply_chain.py) : profondeur maximale et clôtures en cache
+    SUPPLY_CHAIN_MAX_DEPTH = int(os.getenv('SUPPLY_CHAIN_MAX_DEPTH', 10))
+    SUPPLY_CHAIN_CACHE_SIZE = int(os.getenv('SUPPLY_CHAIN_CACHE_SIZE', 4096))
+    
+    # Collecteurs HTTP : requêtes simultanées, débit par hôte (requêtes/s, 0 = illimité), timeout
+    # Le débit ne s'applique qu'aux hôtes qui n'annoncent pas leur quota (X-RateLimit-*)
+    COLLECTOR_CONCURRENCY = int(os.getenv('COLLECTOR_CONCURRENCY', 8))
+    COLLECTOR_RATE_LIMIT = float(os.getenv('COLLECTOR_RATE_LIMIT', 10))
+    COLLECTOR_RATE_BURST = int(os.getenv('COLLECTOR_RATE_BURST', 1))
+    COLLECTOR_HTTP_TIMEOUT = float(os.getenv('COLLECTOR_HTTP_TIMEOUT', 30))
+    
+    # Réessais (429, 5xx, timeouts) : nombre maximal et délai exponentiel à gigue (secondes)
+    COLLECTOR_RETRIES = int(os.getenv('COLLECTOR_RETRIES', 4))
+    COLLECTOR_BACKOFF_BASE = float(os.getenv('COLLECTOR_BACKOFF_BASE', 0.5))
+    COLLECTOR_BACKOFF_MAX = float(os.getenv('COLLECTOR_BACKOFF_MAX', 30))
+    
+    # Collecte en pipeline (run_async) : enregistrements en attente entre deux étapes
+    COLLECTOR_QUEUE_SIZE = int(os.getenv('COLLECTOR_QUEUE_SIZE', 1000))
+    
+    # Cache disque des réponses HTTP des collecteurs (collectors/http_cache.py)
+    HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', 'true').lower() == 'true'
+    HTTP_CACHE_PATH = os.getenv('HTTP_CACHE_PATH', os.path.join('data', 'http_cache.db'))
+    HTTP_CACHE_TTL = int(os.getenv('HTTP_CACHE_TTL', 900))                           # secondes sans revalidation
+    HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', 64 * 1024 * 1024))  # éviction LRU au-delà
+    
+    # API OSV : URL de base et requêtes par appel querybatch (1000 au plus)
+    OSV_API_URL = os.getenv('OSV_API_URL', 'https://api.osv.dev/v1')
+    OSV_BATCH_SIZE = int(os.getenv('OSV_BATCH_SIZE', 1000))
+    
+    # Lecture en flux (iter_vulnerabilities) : lignes par aller-retour
+    DB_STREAM_CHUNK_SIZE = int(os.getenv('DB_STREAM_CHUNK_SIZE', 500))
 
 class DevelopmentConfig(Config):
     """Config pour développement"""
@@ -1,7 +1,246 @@
 import sqlite3
 import pandas as pd
 from datetime import datetime
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice
+import base64
+import calendar
+import hashlib
+import html
+import json
 import os
+import queue
+import re
+import threading
+import time
+from urllib.request import pathname2url
+
+from config import Config
+from migrations import LATEST_VERSION, MigrationRunner
+from versions import latest_fixed, normalize_package_name, parse_legacy_ranges, version_key
+
+
+class ConnectionPool:
+    """
+    Pool de connexions SQLite thread-safe (file bornée)
+
+    Les connexions sont créées à la demande jusqu'à `size`, les PRAGMAs sont
+    appliqués une seule fois à la création, puis elles sont réutilisées.
+    """
+
+    def __init__(self, db_name, size=5, timeout=30.0, pragmas=None, read_only=False, attach=None):
+        """
+        Args:
+            db_name: Chemin vers le fichier .db
+            size: Nombre maximum de connexions ouvertes
+            timeout: Attente maximale (secondes) pour obtenir une connexion
+            pragmas: Dictionnaire {nom: valeur} appliqué à chaque nouvelle connexion
+            read_only: True pour ouvrir le fichier en lecture seule (URI mode=ro)
+            attach: Dictionnaire {alias: chemin} des bases attachées à chaque connexion
+        """
+        self.db_name = db_name
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self.pragmas = dict(pragmas or {})
+        self.read_only = read_only
+        self.attach = dict(attach or {})
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Métriques
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+
+    def _create_connection(self):
+        """Ouvrir une nouvelle connexion et appliquer les PRAGMAs"""
+        if self.read_only:
+            uri = f"file:{pathname2url(os.path.abspath(self.db_name))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        for alias, path in self.attach.items():
+            conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+        return conn
+
+    def acquire(self):
+        """
+        Emprunter une connexion au pool
+
+        Returns:
+            sqlite3.Connection
+
+        Raises:
+            TimeoutError: si aucune connexion ne se libère avant `timeout`
+        """
+        if self._closed:
+            raise RuntimeError("Pool de connexions fermé")
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+
+            if can_create:
+                try:
+                    conn = self._create_connection()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                # Pool saturé : attendre qu'une connexion soit rendue
+                start = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(
+                        f"Aucune connexion disponible après {self.timeout}s (taille du pool : {self.size})"
+                    )
+                finally:
+                    with self._lock:
+                        self._waits += 1
+                        self._wait_time += time.perf_counter() - start
+
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+
+        return conn
+
+    def release(self, conn):
+        """Rendre une connexion au pool"""
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._lock:
+            self._in_use -= 1
+            closed = self._closed
+            if closed:
+                self._created -= 1
+
+        if closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    def stats(self):
+        """
+        Métriques du pool
+
+        Returns:
+            Dict: size, created, idle, in_use, checkouts, waits, wait_time_ms
+        """
+        with self._lock:
+            return {
+                'size': self.size,
+                'created': self._created,
+                'idle': self._idle.qsize(),
+                'in_use': self._in_use,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_ms': round(self._wait_time * 1000, 2)
+            }
+
+    def close_all(self):
+        """Fermer toutes les connexions inactives et refuser les nouveaux emprunts"""
+        with self._lock:
+            self._closed = True
+
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+class WalCheckpointer:
+    """
+    Thread de fond qui exécute périodiquement PRAGMA wal_checkpoint
+    
+    En mode PASSIVE le checkpoint ne bloque ni les lecteurs ni les écrivains :
+    il copie ce qui peut l'être et laisse le reste pour le passage suivant.
+    """
+    
+    MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+    
+    def __init__(self, db, interval=300, mode='PASSIVE'):
+        """
+        Args:
+            db: Instance de VulnerabilityDB
+            interval: Délai entre deux checkpoints (secondes)
+            mode: Mode de checkpoint SQLite
+        """
+        mode = str(mode).upper()
+        if mode not in self.MODES:
+            raise ValueError(f"Mode de checkpoint invalide : {mode}")
+        
+        self.db = db
+        self.interval = interval
+        self.mode = mode
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def checkpoint(self):
+        """
+        Exécuter un checkpoint immédiatement
+        
+        Returns:
+            Dict: busy, wal_pages, checkpointed_pages
+        """
+        with self.db.connection() as conn:
+            busy, log_pages, checkpointed = conn.execute(
+                f"PRAGMA wal_checkpoint({self.mode})"
+            ).fetchone()
+        
+        self.last_result = {
+            'busy': bool(busy),
+            'wal_pages': log_pages,
+            'checkpointed_pages': checkpointed,
+            'at': datetime.now().isoformat()
+        }
+        return self.last_result
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"❌ Erreur checkpoint WAL : {e}")
+    
+    def start(self):
+        """Démarrer le thread de checkpoint"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='wal-checkpointer', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Arrêter le thread de checkpoint"""
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+
+# Bases dont le schéma a déjà été vérifié dans ce processus (chemins absolus)
+_schema_ready = set()
+_schema_lock = threading.Lock()
+
 
 class VulnerabilityDB:
     """
@@ -9,31 +248,188 @@ class VulnerabilityDB:
     Compatible avec le projet VTBDA - DevSecOps & CI/CD
     """
     
-    def __init__(self, db_name='data/vulnerabilities.db'):
+    # Version du schéma à jour (PRAGMA user_version), voir migrations.py
+    SCHEMA_VERSION = LATEST_VERSION
+    
+    def __init__(self, db_name=None, init_schema=True, read_only=False, archive_path=None):
         """
         Initialiser la connexion à la base de données
         
         Args:
-            db_name: Chemin vers le fichier .db
+            db_name: Chemin vers le fichier .db (Config.DB_PATH par défaut)
+            init_schema: False pour ouvrir le fichier sans appliquer les
+                         migrations (outils d'inspection, dry-run)
+            read_only: True pour lire un snapshot (ou la base de production)
+                       sans jamais y écrire ; le schéma n'est pas touché
+            archive_path: Base d'archive attachée sous le nom `archive` par
+                          apply_retention et include_archive
+                          (<base>_archive.db à côté de la base par défaut)
         """
+        db_name = db_name or Config.DB_PATH
         self.db_name = db_name
+        self.read_only = read_only
+        
+        # Base d'archive (apply_retention), absente des snapshots en lecture seule,
+        # attachée à la demande (_attach_archive)
+        self.archive_path = None
+        if not read_only:
+            self.archive_path = archive_path or f"{os.path.splitext(db_name)[0]}_archive.db"
+        
+        # Pool de connexions partagé par toutes les méthodes
+        self.pool = ConnectionPool(
+            db_name,
+            size=Config.DB_POOL_SIZE,
+            timeout=Config.DB_POOL_TIMEOUT,
+            pragmas=self._connection_pragmas(),
+            read_only=read_only
+        )
+        self.checkpointer = None
+        self.fts_enabled = False
+        self._count_cache = {}
+        self._count_cache_lock = threading.Lock()
+        
+        # Schéma vérifié une seule fois par processus et par fichier
+        if read_only:
+            self.fts_enabled = self._has_table('vulnerabilities_fts')
+        elif init_schema:
+            self.ensure_schema()
+    
+    @contextmanager
+    def connection(self):
+        """
+        Emprunter une connexion du pool le temps d'un bloc `with`
+        
+        Commit si le bloc se termine normalement, rollback en cas d'exception.
+        
+        Usage:
+            with db.connection() as conn:
+                conn.execute(...)
+        """
+        conn = self.pool.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.release(conn)
+    
+    def get_pool_stats(self):
+        """Métriques du pool de connexions (checkouts, attentes, taille)"""
+        return self.pool.stats()
+    
+    @staticmethod
+    def _connection_pragmas():
+        """PRAGMAs appliqués à chaque connexion du pool"""
+        pragmas = dict(Config.DB_PRAGMAS)
+        pragmas.update({
+            'synchronous': Config.DB_SYNCHRONOUS,
+            'busy_timeout': Config.DB_BUSY_TIMEOUT_MS,
+            'mmap_size': Config.DB_MMAP_SIZE,
+            'wal_autocheckpoint': Config.DB_WAL_AUTOCHECKPOINT
+        })
+        return pragmas
+    
+    def _configure_journal_mode(self):
+        """
+        Activer le mode de journal configuré (WAL par défaut)
+        
+        Le mode WAL est persistant dans le fichier : il suffit de le
+        demander une fois, toutes les connexions suivantes en héritent.
+        """
+        with self.connection() as conn:
+            mode = conn.execute(f"PRAGMA journal_mode = {Config.DB_JOURNAL_MODE}").fetchone()[0]
+        
+        if mode.upper() != Config.DB_JOURNAL_MODE.upper():
+            print(f"⚠️  Mode de journal {Config.DB_JOURNAL_MODE} indisponible, mode actuel : {mode}")
+        return mode
+    
+    def checkpoint(self, mode=None):
+        """Forcer un checkpoint WAL (mode par défaut : Config.DB_CHECKPOINT_MODE)"""
+        checkpointer = WalCheckpointer(self, mode=mode or Config.DB_CHECKPOINT_MODE)
+        return checkpointer.checkpoint()
+    
+    def start_checkpointer(self):
+        """
+        Démarrer le checkpoint WAL en arrière-plan
+        
+        Returns:
+            WalCheckpointer ou None si désactivé (intervalle à 0 ou mode non-WAL)
+        """
+        if self.read_only or Config.DB_CHECKPOINT_INTERVAL <= 0 or Config.DB_JOURNAL_MODE.upper() != 'WAL':
+            return None
+        
+        if self.checkpointer is None:
+            self.checkpointer = WalCheckpointer(
+                self,
+                interval=Config.DB_CHECKPOINT_INTERVAL,
+                mode=Config.DB_CHECKPOINT_MODE
+            )
+        self.checkpointer.start()
+        return self.checkpointer
+    
+    def ensure_schema(self):
+        """
+        Initialiser le schéma une seule fois par processus
+        
+        Les instances suivantes sur le même fichier ne font plus aucune
+        requête DDL. Une base déjà à SCHEMA_VERSION (PRAGMA user_version)
+        n'exécute pas create_tables, seul le mode de journal est appliqué.
+        """
+        key = os.path.abspath(self.db_name)
+        if key in _schema_ready:
+            self.fts_enabled = self._has_table('vulnerabilities_fts')
+            return
         
-        # Créer dossier data/ s'il n'existe pas
-        os.makedirs('data', exist_ok=True)
+        with _schema_lock:
+            if key not in _schema_ready:
+                # Créer le dossier de la base s'il n'existe pas
+                os.makedirs(os.path.dirname(key), exist_ok=True)
+                
+                if self.get_schema_version() >= self.SCHEMA_VERSION:
+                    self._configure_journal_mode()
+                else:
+                    self.create_tables()
+                    with self.connection() as conn:
+                        conn.execute(f"PRAGMA user_version = {int(self.SCHEMA_VERSION)}")
+                
+                _schema_ready.add(key)
+                print(f"✅ Base de données initialisée : {self.db_name}")
         
-        # Créer tables si elles n'existent pas
-        self.create_tables()
-        print(f"✅ Base de données initialisée : {db_name}")
+        self.fts_enabled = self._has_table('vulnerabilities_fts')
+    
+    def get_schema_version(self):
+        """Version du schéma enregistrée dans le fichier (PRAGMA user_version)"""
+        with self.connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def _has_table(self, name):
+        """Vérifier l'existence d'une table (ou table virtuelle)"""
+        with self.connection() as conn:
+            return conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+            ).fetchone() is not None
     
     def create_tables(self):
         """
-        Créer les 3 tables nécessaires pour le projet
+        Créer les tables ou mettre le schéma à jour
+        
+        Le schéma est versionné (PRAGMA user_version) : les migrations en
+        attente de migrations.py sont appliquées dans l'ordre.
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        self._configure_journal_mode()
+        MigrationRunner(self).run()
+        self.fts_enabled = self._has_table('vulnerabilities_fts')
         
+        print("✅ Tables créées avec succès")
+    
+    def _create_base_tables(self, conn):
+        """
+        Créer les 5 tables du projet et leurs index (migration 1)
+        """
         # TABLE 1 : CVE (vulnérabilités générales de NVD)
-        cursor.execute('''
+        conn.execute('''
         CREATE TABLE IF NOT EXISTS cve_vulnerabilities (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             cve_id TEXT UNIQUE NOT NULL,
@@ -45,12 +441,13 @@ class VulnerabilityDB:
             modified_date TEXT,
             source TEXT DEFAULT 'NVD',
             url TEXT,
-            collected_date TEXT DEFAULT CURRENT_TIMESTAMP
+            collected_date TEXT DEFAULT CURRENT_TIMESTAMP,
+            published_ts INTEGER
         )
         ''')
         
         # TABLE 2 : PACKAGES (npm, pip, maven, docker, kubernetes, github)
-        cursor.execute('''
+        conn.execute('''
         CREATE TABLE IF NOT EXISTS package_vulnerabilities (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             package_name TEXT NOT NULL,
@@ -66,12 +463,16 @@ class VulnerabilityDB:
             patched_version TEXT,
             source TEXT,
             url TEXT,
-            collected_date TEXT DEFAULT CURRENT_TIMESTAMP
+            collected_date TEXT DEFAULT CURRENT_TIMESTAMP,
+            advisory_id TEXT NOT NULL DEFAULT '',
+            content_hash TEXT,
+            published_ts INTEGER,
+            discovered_ts INTEGER
         )
         ''')
         
         # TABLE 3 : SUPPLY-CHAIN (dépendances entre packages)
-        cursor.execute('''
+        conn.execute('''
         CREATE TABLE IF NOT EXISTS supply_chain (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             parent_package TEXT NOT NULL,
@@ -84,7 +485,7 @@ class VulnerabilityDB:
         ''')
         
         # TABLE 4 : ARTICLES (pour stocker les articles/rapports)
-        cursor.execute('''
+        conn.execute('''
         CREATE TABLE IF NOT EXISTS articles (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT NOT NULL,
@@ -98,7 +499,7 @@ class VulnerabilityDB:
         ''')
         
         # TABLE 5 : TRENDS (tendances des mots-clés)
-        cursor.execute('''
+        conn.execute('''
         CREATE TABLE IF NOT EXISTS trends (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             keyword TEXT NOT NULL,
@@ -109,336 +510,1725 @@ class VulnerabilityDB:
         ''')
         
         # Index pour accélérer les recherches
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cve_severity ON cve_vulnerabilities(severity)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pkg_severity ON package_vulnerabilities(severity)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pkg_ecosystem ON package_vulnerabilities(ecosystem)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pkg_name ON package_vulnerabilities(package_name)')
-        
-        conn.commit()
-        conn.close()
-        print("✅ Tables créées avec succès")
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_cve_severity ON cve_vulnerabilities(severity)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_pkg_severity ON package_vulnerabilities(severity)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_pkg_ecosystem ON package_vulnerabilities(ecosystem)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_pkg_name ON package_vulnerabilities(package_name)')
     
-    # ========== FONCTIONS INSERT (Ajouter données) ==========
+    # Colonnes timestamp calculées depuis leur colonne date texte
+    TIMESTAMP_COLUMNS = (
+        ('cve_vulnerabilities', 'published_ts', 'published_date'),
+        ('package_vulnerabilities', 'published_ts', 'published_date'),
+        ('package_vulnerabilities', 'discovered_ts', 'discovered_date'),
+    )
     
-    def insert_cve(self, cve_data):
+    @staticmethod
+    def to_timestamp(date_str):
         """
-        Ajouter une vulnérabilité CVE avec description complète
-        
-        Args:
-            cve_data: Dictionnaire avec clés : cve_id, title, description, 
-                     cvss_score, severity, published_date, url
+        Convertir une date 'YYYY-MM-DD' (ou ISO 8601) en timestamp UTC
         
         Returns:
-            True si succès, False sinon
+            int: secondes depuis l'epoch, None si la date est absente ou invalide
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
+        if not date_str:
+            return None
         try:
-            cursor.execute('''
-            INSERT OR IGNORE INTO cve_vulnerabilities 
-            (cve_id, title, description, cvss_score, severity, published_date, modified_date, url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                cve_data.get('cve_id'),
-                cve_data.get('title', 'No title'),
-                cve_data.get('description', 'No description available'),
-                cve_data.get('cvss_score'),
-                cve_data.get('severity'),
-                cve_data.get('published_date'),
-                cve_data.get('modified_date'),
-                cve_data.get('url')
-            ))
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"❌ Erreur insertion CVE : {e}")
-            return False
-        finally:
-            conn.close()
+            day = datetime.strptime(str(date_str)[:10], '%Y-%m-%d')
+        except ValueError:
+            return None
+        return calendar.timegm(day.timetuple())
     
-    def insert_package_vulnerability(self, package_data):
+    @staticmethod
+    def since_timestamp(days):
+        """Timestamp UTC d'il y a `days` jours (borne basse d'un filtre de période)"""
+        return int(time.time()) - int(days) * 86400
+    
+    def _create_fts_index(self, conn):
         """
-        Ajouter une vulnérabilité de package avec description complète
+        Créer la table FTS5 vulnerabilities_fts et ses triggers
         
-        Args:
-            package_data: Dictionnaire avec toutes les infos du package
+        Une seule table indexe les deux sources : rowid = id pour un package,
+        rowid = -id pour une CVE. Elle est tenue à jour par les triggers
+        d'insertion, de mise à jour et de suppression ; le remplissage
+        initial est fait par lots par la migration 4.
         
         Returns:
-            ID de la vulnérabilité insérée ou None
+            bool: False si SQLite est compilé sans FTS5
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
-            INSERT INTO package_vulnerabilities 
-            (package_name, ecosystem, vulnerability_type, cvss_score, severity, 
-             title, description, published_date, discovered_date, affected_versions, 
-             patched_version, source, url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                package_data.get('package_name'),
-                package_data.get('ecosystem'),
-                package_data.get('vulnerability_type'),
-                package_data.get('cvss_score'),
-                package_data.get('severity'),
-                package_data.get('title', 'No title'),
-                package_data.get('description', 'No description available'),
-                package_data.get('published_date'),
-                package_data.get('discovered_date'),
-                package_data.get('affected_versions'),
-                package_data.get('patched_version'),
-                package_data.get('source'),
-                package_data.get('url')
-            ))
-            conn.commit()
-            vuln_id = cursor.lastrowid
-            return vuln_id
-        except Exception as e:
-            print(f"❌ Erreur insertion package : {e}")
-            return None
-        finally:
-            conn.close()
+            conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS vulnerabilities_fts USING fts5(
+                cve_id, title, description, package_name,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  FTS5 indisponible, recherche LIKE utilisée : {e}")
+            return False
+        
+        conn.executescript('''
+        CREATE TRIGGER IF NOT EXISTS trg_cve_fts_insert AFTER INSERT ON cve_vulnerabilities BEGIN
+            INSERT INTO vulnerabilities_fts(rowid, cve_id, title, description, package_name)
+            VALUES (-new.id, new.cve_id, new.title, new.description, NULL);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_cve_fts_update AFTER UPDATE OF cve_id, title, description ON cve_vulnerabilities BEGIN
+            UPDATE vulnerabilities_fts
+            SET cve_id = new.cve_id, title = new.title, description = new.description
+            WHERE rowid = -old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_cve_fts_delete AFTER DELETE ON cve_vulnerabilities BEGIN
+            DELETE FROM vulnerabilities_fts WHERE rowid = -old.id;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_pkg_fts_insert AFTER INSERT ON package_vulnerabilities BEGIN
+            INSERT INTO vulnerabilities_fts(rowid, cve_id, title, description, package_name)
+            VALUES (new.id, new.advisory_id, new.title, new.description, new.package_name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_pkg_fts_update AFTER UPDATE OF advisory_id, title, description, package_name ON package_vulnerabilities BEGIN
+            UPDATE vulnerabilities_fts
+            SET cve_id = new.advisory_id, title = new.title,
+                description = new.description, package_name = new.package_name
+            WHERE rowid = old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_pkg_fts_delete AFTER DELETE ON package_vulnerabilities BEGIN
+            DELETE FROM vulnerabilities_fts WHERE rowid = old.id;
+        END;
+        ''')
+        
+        return True
     
-    def insert_supply_chain(self, parent_package, dependent_package, ecosystem, vulnerability_id=None):
+    # Colonnes de vulnerability_index calculées depuis chaque table source
+    # id = id du package, ou -id de la CVE (même convention que vulnerabilities_fts)
+    VULNERABILITY_INDEX_COLUMNS = (
+        'id', 'cve_id', 'title', 'severity', 'cvss_score', 'package_name', 'ecosystem',
+        'vulnerability_type', 'published_date', 'discovered_date', 'source', 'url',
+        'published_ts', 'discovered_ts'
+    )
+    VULNERABILITY_INDEX_SOURCES = {
+        'cve_vulnerabilities': (
+            "-{row}.id", "{row}.cve_id", "{row}.title", "{row}.severity", "{row}.cvss_score",
+            "NULL", "NULL", "NULL", "IFNULL({row}.published_date, '')", "{row}.published_date",
+            "{row}.source", "{row}.url", "{row}.published_ts", "{row}.published_ts"
+        ),
+        'package_vulnerabilities': (
+            "{row}.id", "NULL", "{row}.title", "{row}.severity", "{row}.cvss_score",
+            "{row}.package_name", "{row}.ecosystem", "{row}.vulnerability_type",
+            "IFNULL({row}.published_date, '')", "{row}.discovered_date", "{row}.source", "{row}.url",
+            "{row}.published_ts", "{row}.discovered_ts"
+        ),
+    }
+    
+    def _create_vulnerability_index(self, conn):
         """
-        Ajouter une relation de dépendance supply-chain
+        Créer vulnerability_index : table unifiée CVE + packages
+        
+        Elle remplace les UNION ALL ad hoc : une seule table, remplie par
+        triggers depuis les deux tables sources, porte les index composites
+        (date, sévérité, score CVSS, package) utilisés par les requêtes de
+        liste. Les descriptions restent dans les tables sources. Le
+        remplissage initial est fait par lots par la migration 6.
         """
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(vulnerability_index)")]
+        if columns and list(self.VULNERABILITY_INDEX_COLUMNS) != columns:
+            # Table dérivée d'un schéma antérieur : la reconstruire entièrement
+            conn.execute("DROP TABLE vulnerability_index")
+            for prefix in ('cve', 'pkg'):
+                for event in ('insert', 'update', 'delete'):
+                    conn.execute(f"DROP TRIGGER IF EXISTS trg_{prefix}_index_{event}")
         
-        try:
-            cursor.execute('''
-            INSERT INTO supply_chain 
-            (parent_package, dependent_package, ecosystem, vulnerability_id)
-            VALUES (?, ?, ?, ?)
-            ''', (parent_package, dependent_package, ecosystem, vulnerability_id))
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"❌ Erreur insertion supply-chain : {e}")
-            return False
-        finally:
-            conn.close()
-    
-    def insert_article(self, article_data):
-        """Ajouter un article"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        conn.executescript('''
+        CREATE TABLE IF NOT EXISTS vulnerability_index (
+            id INTEGER PRIMARY KEY,
+            cve_id TEXT,
+            title TEXT,
+            severity TEXT,
+            cvss_score REAL,
+            package_name TEXT,
+            ecosystem TEXT,
+            vulnerability_type TEXT,
+            published_date TEXT NOT NULL DEFAULT '',
+            discovered_date TEXT,
+            source TEXT,
+            url TEXT,
+            published_ts INTEGER,
+            discovered_ts INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_vi_published ON vulnerability_index(published_date, id);
+        CREATE INDEX IF NOT EXISTS idx_vi_published_ts ON vulnerability_index(published_ts);
+        CREATE INDEX IF NOT EXISTS idx_vi_severity_published ON vulnerability_index(severity, published_date, id);
+        CREATE INDEX IF NOT EXISTS idx_vi_cvss ON vulnerability_index(cvss_score DESC, published_date DESC);
+        CREATE INDEX IF NOT EXISTS idx_vi_package ON vulnerability_index(package_name);
         
-        try:
-            cursor.execute('''
-            INSERT INTO articles (title, content, source, category, url, published_date)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                article_data.get('title'),
-                article_data.get('content'),
-                article_data.get('source'),
-                article_data.get('category'),
-                article_data.get('url'),
-                article_data.get('published_date')
-            ))
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"❌ Erreur insertion article : {e}")
-            return False
-        finally:
-            conn.close()
-    
-    def insert_trend(self, keyword, count=1, severity_level=None):
-        """Ajouter une tendance"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        DROP INDEX IF EXISTS idx_cve_keyset;
+        DROP INDEX IF EXISTS idx_pkg_keyset;
+        ''')
         
-        try:
-            cursor.execute('''
-            INSERT INTO trends (keyword, count, severity_level)
-            VALUES (?, ?, ?)
-            ''', (keyword, count, severity_level))
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"❌ Erreur insertion trend : {e}")
-            return False
-        finally:
-            conn.close()
+        columns = ', '.join(self.VULNERABILITY_INDEX_COLUMNS)
+        for table, prefix in (('cve_vulnerabilities', 'cve'), ('package_vulnerabilities', 'pkg')):
+            new_values = ', '.join(v.format(row='new') for v in self.VULNERABILITY_INDEX_SOURCES[table])
+            old_id = self.VULNERABILITY_INDEX_SOURCES[table][0].format(row='old')
+            conn.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_index_insert AFTER INSERT ON {table} BEGIN
+                INSERT OR REPLACE INTO vulnerability_index({columns}) VALUES ({new_values});
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_index_update AFTER UPDATE ON {table} BEGIN
+                DELETE FROM vulnerability_index WHERE id = {old_id};
+                INSERT OR REPLACE INTO vulnerability_index({columns}) VALUES ({new_values});
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_index_delete AFTER DELETE ON {table} BEGIN
+                DELETE FROM vulnerability_index WHERE id = {old_id};
+            END;
+            ''')
+        
+    # Jointure vers les tables sources pour les colonnes lourdes (description)
+    SOURCE_JOIN = '''
+        LEFT JOIN cve_vulnerabilities c ON v.id < 0 AND c.id = -v.id
+        LEFT JOIN package_vulnerabilities p ON v.id > 0 AND p.id = v.id
+    '''
     
-    # ========== FONCTIONS GET (Récupérer données) ==========
+    # Colonnes projetables (alias -> expression SQL sur vulnerability_index v).
+    # Les expressions lues dans c. ou p. ajoutent la jointure SOURCE_JOIN.
+    VULNERABILITY_COLUMNS = {
+        'id': 'v.id',
+        'cve_id': 'v.cve_id',
+        'title': 'v.title',
+        'description': 'COALESCE(c.description, p.description)',
+        'severity': 'v.severity',
+        'cvss_score': 'v.cvss_score',
+        'affected_component': 'v.package_name',
+        'ecosystem': 'v.ecosystem',
+        'vulnerability_type': 'v.vulnerability_type',
+        'published_date': "NULLIF(v.published_date, '')",
+        'discovered_date': 'v.discovered_date',
+        'modified_date': 'c.modified_date',
+        'affected_versions': 'p.affected_versions',
+        'patched_version': 'p.patched_version',
+        'source': 'v.source',
+        'url': 'v.url',
+        'published_ts': 'v.published_ts',
+        'discovered_ts': 'v.discovered_ts',
+    }
     
-    def get_all_cve(self):
-        """Récupérer toutes les CVE"""
-        conn = sqlite3.connect(self.db_name)
-        df = pd.read_sql_query(
-            "SELECT * FROM cve_vulnerabilities ORDER BY published_date DESC", 
-            conn
-        )
-        conn.close()
-        return df
+    # Variante d'affichage : identifiant et composant toujours renseignés
+    DISPLAY_COLUMNS = dict(
+        VULNERABILITY_COLUMNS,
+        cve_id="COALESCE(v.cve_id, 'PKG-' || v.package_name)",
+        affected_component="COALESCE(v.package_name, 'N/A')"
+    )
     
-    def get_all_packages(self):
-        """Récupérer toutes les vulnérabilités de packages"""
-        conn = sqlite3.connect(self.db_name)
-        df = pd.read_sql_query(
-            "SELECT * FROM package_vulnerabilities ORDER BY published_date DESC", 
-            conn
-        )
-        conn.close()
-        return df
+    # Colonnes par défaut des listes : sans texte lourd
+    LIST_COLUMNS = (
+        'id', 'cve_id', 'title', 'severity', 'cvss_score',
+        'affected_component', 'ecosystem', 'published_date', 'url'
+    )
     
-    def get_all_vulnerabilities_combined(self):
+    @staticmethod
+    def _projection(mapping, columns):
         """
-        Combiner CVE et Packages dans une seule vue
-        Compatible avec l'interface actuelle
-        """
-        conn = sqlite3.connect(self.db_name)
+        Construire la liste SELECT d'une projection de colonnes
         
-        # Union des deux tables
-        query = '''
-        SELECT 
-            cve_id,
-            title,
-            description,
-            severity,
-            cvss_score,
-            NULL as affected_component,
-            NULL as ecosystem,
-            NULL as vulnerability_type,
-            published_date,
-            published_date as discovered_date,
-            NULL as modified_date,
-            source,
-            url
-        FROM cve_vulnerabilities
-        
-        UNION ALL
-        
-        SELECT 
-            NULL as cve_id,
-            title,
-            description,
-            severity,
-            cvss_score,
-            package_name as affected_component,
-            ecosystem,
-            vulnerability_type,
-            published_date,
-            discovered_date,
-            NULL as modified_date,
-            source,
-            url
-        FROM package_vulnerabilities
+        Returns:
+            Tuple: (liste SELECT, True si la jointure SOURCE_JOIN est nécessaire)
         
-        ORDER BY published_date DESC
-        '''
+        Raises:
+            ValueError: si une colonne n'est pas dans `mapping`
+        """
+        unknown = [col for col in columns if col not in mapping]
+        if unknown:
+            raise ValueError(f"Colonnes inconnues : {', '.join(map(str, unknown))}")
         
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
+        select = ', '.join(f"{mapping[col]} AS {col}" for col in columns)
+        needs_join = any(re.search(r'\b[cp]\.', mapping[col]) for col in columns)
+        return select, needs_join
     
-    def get_packages_by_severity(self, severity):
-        """Filtrer packages par sévérité"""
-        conn = sqlite3.connect(self.db_name)
-        query = "SELECT * FROM package_vulnerabilities WHERE severity = ? ORDER BY cvss_score DESC"
-        df = pd.read_sql_query(query, conn, params=(severity,))
-        conn.close()
-        return df
+    # Dimensions de stats_rollup alimentées par chaque table
+    # (dimension, expression SQL de la clé à partir de new./old.)
+    ROLLUP_DIMENSIONS = {
+        'cve_vulnerabilities': [
+            ('table', "'cve'"),
+            ('severity', "IFNULL({row}.severity, '')"),
+            ('day', "IFNULL(substr({row}.published_date, 1, 10), '')"),
+        ],
+        'package_vulnerabilities': [
+            ('table', "'package'"),
+            ('severity', "IFNULL({row}.severity, '')"),
+            ('ecosystem', "IFNULL({row}.ecosystem, '')"),
+            ('package', "{row}.package_name"),
+            ('day', "IFNULL(substr({row}.published_date, 1, 10), '')"),
+        ],
+    }
     
-    def get_packages_by_ecosystem(self, ecosystem):
-        """Filtrer par écosystème"""
-        conn = sqlite3.connect(self.db_name)
-        query = "SELECT * FROM package_vulnerabilities WHERE ecosystem = ? ORDER BY published_date DESC"
-        df = pd.read_sql_query(query, conn, params=(ecosystem,))
-        conn.close()
-        return df
+    def _rollup_upsert(self, table, row, delta):
+        """Instruction d'upsert de stats_rollup pour un trigger (row = new ou old)"""
+        values = ',\n                '.join(
+            f"('{dimension}', {key.format(row=row)}, {delta})"
+            for dimension, key in self.ROLLUP_DIMENSIONS[table]
+        )
+        return f'''INSERT INTO stats_rollup(dimension, key, count) VALUES
+                {values}
+            ON CONFLICT(dimension, key) DO UPDATE SET count = count + excluded.count;'''
     
-    def search_vulnerabilities(self, severity=None, component=None, days=None):
+    def _create_stats_rollup(self, conn):
         """
-        Recherche multi-critères compatible avec l'interface Flask
+        Créer la table stats_rollup et les triggers qui la maintiennent
+        
+        Chaque insertion / suppression / mise à jour dans les tables de
+        vulnérabilités ajuste les compteurs (table, sévérité, écosystème,
+        package, jour) : les statistiques se lisent en O(1) lignes. Le
+        calcul initial est fait par la migration 5.
         """
-        conn = sqlite3.connect(self.db_name)
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_rollup (
+            dimension TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, key)
+        ) WITHOUT ROWID
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_rollup_count ON stats_rollup(dimension, count DESC)')
         
-        # Construction de la requête dynamique
-        conditions = []
-        params = []
+        for table, prefix in (('cve_vulnerabilities', 'cve'), ('package_vulnerabilities', 'pkg')):
+            columns = ', '.join(sorted({
+                column
+                for _, key in self.ROLLUP_DIMENSIONS[table]
+                for column in re.findall(r'\{row\}\.(\w+)', key)
+            }))
+            # Une requête par trigger (pas d'executescript, qui validerait la
+            # transaction de la migration avant la lecture du plafond)
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_rollup_insert AFTER INSERT ON {table} BEGIN
+                {self._rollup_upsert(table, 'new', 1)}
+            END''')
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_rollup_delete AFTER DELETE ON {table} BEGIN
+                {self._rollup_upsert(table, 'old', -1)}
+            END''')
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{prefix}_rollup_update AFTER UPDATE OF {columns} ON {table} BEGIN
+                {self._rollup_upsert(table, 'old', -1)}
+                {self._rollup_upsert(table, 'new', 1)}
+            END''')
+    
+    def _count_stats_rollup(self, conn, table, low=None, high=None):
+        """
+        Ajouter à stats_rollup les compteurs des lignes d'une table
         
-        base_query = '''
-        SELECT 
-            COALESCE(cve_id, 'PKG-' || package_name) as cve_id,
-            title,
-            description,
-            severity,
-            cvss_score,
-            COALESCE(package_name, 'N/A') as affected_component,
-            ecosystem,
-            vulnerability_type,
-            published_date,
-            url
-        FROM (
-            SELECT cve_id, title, description, severity, cvss_score, 
-                   NULL as package_name, NULL as ecosystem, NULL as vulnerability_type,
-                   published_date, url
-            FROM cve_vulnerabilities
-            
-            UNION ALL
-            
-            SELECT NULL as cve_id, title, description, severity, cvss_score,
-                   package_name, ecosystem, vulnerability_type,
-                   published_date, url
-            FROM package_vulnerabilities
-        )
-        '''
+        Args:
+            table: Table source (clé de ROLLUP_DIMENSIONS)
+            low, high: Bornes exclusive / inclusive des rowid comptés (toute la table par défaut)
         
-        if severity:
-            conditions.append("severity = ?")
-            params.append(severity)
+        Returns:
+            int: Nombre de lignes comptées
+        """
+        where, params = '', ()
+        if low is not None:
+            where, params = 'AND rowid > ? AND rowid <= ?', (low, high)
         
-        if component:
-            conditions.append("(package_name LIKE ? OR cve_id LIKE ?)")
-            params.extend([f'%{component}%', f'%{component}%'])
+        for dimension, key in self.ROLLUP_DIMENSIONS[table]:
+            key_sql = key.format(row=table)
+            conn.execute(f'''
+            INSERT INTO stats_rollup(dimension, key, count)
+            SELECT '{dimension}', {key_sql}, COUNT(*)
+            FROM {table}
+            WHERE {key_sql} IS NOT NULL {where}
+            GROUP BY {key_sql}
+            ON CONFLICT(dimension, key) DO UPDATE SET count = count + excluded.count
+            ''', params)
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE 1 {where}", params).fetchone()[0]
+    
+    def _rebuild_stats_rollup(self, conn):
+        """Recalculer entièrement stats_rollup à partir des tables sources"""
+        conn.execute("DELETE FROM stats_rollup")
+        for table in self.ROLLUP_DIMENSIONS:
+            self._count_stats_rollup(conn, table)
+    
+    def rebuild_stats_rollup(self):
+        """
+        Commande de récupération : reconstruire les statistiques matérialisées
         
-        if days:
-            conditions.append("julianday('now') - julianday(published_date) <= ?")
-            params.append(days)
+        Returns:
+            int: Nombre de lignes dans stats_rollup
+        """
+        with self.connection() as conn:
+            self._rebuild_stats_rollup(conn)
+            rows = conn.execute("SELECT COUNT(*) FROM stats_rollup").fetchone()[0]
         
-        if conditions:
-            base_query += " WHERE " + " AND ".join(conditions)
+        print(f"✅ Statistiques reconstruites : {rows} compteurs")
+        return rows
+    
+    def _create_supply_chain_state(self, conn):
+        """
+        Créer le compteur de version du graphe supply_chain
         
-        base_query += " ORDER BY published_date DESC"
+        Les triggers l'incrémentent à chaque modification d'une arête :
+        le graphe en mémoire (supply_chain.py) compare cette version à
+        celle qu'il a chargée avant de répondre depuis son cache.
+        """
+        conn.executescript('''
+        CREATE TABLE IF NOT EXISTS supply_chain_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO supply_chain_state (id, version) VALUES (1, 0);
         
-        df = pd.read_sql_query(base_query, conn, params=params)
-        conn.close()
-        return df
-    
-    def get_supply_chain_impact(self, package_name):
-        """Trouver tous les packages qui dépendent d'un package donné"""
-        conn = sqlite3.connect(self.db_name)
-        query = '''
-        SELECT sc.parent_package, sc.dependent_package, sc.ecosystem, 
-               pv.severity, pv.cvss_score, pv.description
-        FROM supply_chain sc
-        LEFT JOIN package_vulnerabilities pv ON sc.vulnerability_id = pv.id
-        WHERE sc.dependent_package = ?
-        '''
-        df = pd.read_sql_query(query, conn, params=(package_name,))
-        conn.close()
-        return df
+        CREATE TRIGGER IF NOT EXISTS trg_sc_version_insert AFTER INSERT ON supply_chain BEGIN
+            UPDATE supply_chain_state SET version = version + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sc_version_delete AFTER DELETE ON supply_chain BEGIN
+            UPDATE supply_chain_state SET version = version + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_sc_version_update AFTER UPDATE ON supply_chain BEGIN
+            UPDATE supply_chain_state SET version = version + 1 WHERE id = 1;
+        END;
+        ''')
     
-    # ========== FONCTIONS STATISTIQUES ==========
+    def get_supply_chain_version(self):
+        """Version courante du graphe supply_chain (0 si le compteur n'existe pas)"""
+        with self.connection() as conn:
+            row = conn.execute("SELECT version FROM supply_chain_state WHERE id = 1").fetchone()
+        return row[0] if row else 0
     
-    def get_total_count(self):
-        """Compter total de vulnérabilités"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+    def _create_dependency_graph(self, conn):
+        """
+        Créer le dictionnaire des packages et les arêtes entières du graphe
         
-        cursor.execute("SELECT COUNT(*) FROM cve_vulnerabilities")
-        cve_count = cursor.fetchone()[0]
+        packages donne un id entier à chaque (nom, écosystème) ;
+        dependency_edges stocke les paires (parent_id, dependency_id),
+        indexées dans les deux sens. Les insertions dans supply_chain y
+        sont reportées par trigger ; le graphe en mémoire suit désormais
+        la version des arêtes.
+        """
+        conn.executescript('''
+        CREATE TABLE IF NOT EXISTS packages (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            ecosystem TEXT NOT NULL DEFAULT '',
+            UNIQUE (name, ecosystem)
+        );
+        CREATE TABLE IF NOT EXISTS dependency_edges (
+            parent_id INTEGER NOT NULL REFERENCES packages(id),
+            dependency_id INTEGER NOT NULL REFERENCES packages(id),
+            PRIMARY KEY (parent_id, dependency_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_edges_dependency ON dependency_edges(dependency_id, parent_id);
+        
+        CREATE INDEX IF NOT EXISTS idx_sc_dependent ON supply_chain(dependent_package);
+        CREATE INDEX IF NOT EXISTS idx_sc_parent ON supply_chain(parent_package);
+        CREATE INDEX IF NOT EXISTS idx_sc_vulnerability ON supply_chain(vulnerability_id);
+        
+        DROP TRIGGER IF EXISTS trg_sc_version_insert;
+        DROP TRIGGER IF EXISTS trg_sc_version_delete;
+        DROP TRIGGER IF EXISTS trg_sc_version_update;
+        CREATE TRIGGER IF NOT EXISTS trg_edges_version_insert AFTER INSERT ON dependency_edges BEGIN
+            UPDATE supply_chain_state SET version = version + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_edges_version_delete AFTER DELETE ON dependency_edges BEGIN
+            UPDATE supply_chain_state SET version = version + 1 WHERE id = 1;
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_sc_edges_insert AFTER INSERT ON supply_chain BEGIN
+            INSERT OR IGNORE INTO packages (name, ecosystem) VALUES
+                (new.parent_package, IFNULL(new.ecosystem, '')),
+                (new.dependent_package, IFNULL(new.ecosystem, ''));
+            INSERT OR IGNORE INTO dependency_edges (parent_id, dependency_id)
+            SELECT p.id, d.id FROM packages p, packages d
+            WHERE p.name = new.parent_package AND p.ecosystem = IFNULL(new.ecosystem, '')
+            AND d.name = new.dependent_package AND d.ecosystem = IFNULL(new.ecosystem, '');
+        END;
+        ''')
+    
+    def _sync_dependency_edges(self, conn):
+        """
+        Reporter les relations existantes de supply_chain dans dependency_edges
+        
+        Returns:
+            int: Nombre d'arêtes ajoutées
+        """
+        conn.execute('''
+        INSERT OR IGNORE INTO packages (name, ecosystem)
+        SELECT parent_package, IFNULL(ecosystem, '') FROM supply_chain
+        UNION
+        SELECT dependent_package, IFNULL(ecosystem, '') FROM supply_chain
+        ''')
+        return conn.execute('''
+        INSERT OR IGNORE INTO dependency_edges (parent_id, dependency_id)
+        SELECT p.id, d.id
+        FROM supply_chain sc
+        JOIN packages p ON p.name = sc.parent_package AND p.ecosystem = IFNULL(sc.ecosystem, '')
+        JOIN packages d ON d.name = sc.dependent_package AND d.ecosystem = IFNULL(sc.ecosystem, '')
+        ''').rowcount
+    
+    def _create_affected_ranges(self, conn):
+        """
+        Créer la table des plages de versions affectées
+        
+        Une ligne par intervalle [introduced, fixed) ou [introduced,
+        last_affected] d'un avis de package_vulnerabilities ; les bornes sont
+        aussi stockées sous forme de clé triable (versions.version_key) et
+        l'index (ecosystem, package_name, introduced_key) résout
+        « cette version est-elle affectée » par une recherche d'intervalle.
+        """
+        conn.executescript('''
+        CREATE TABLE IF NOT EXISTS affected_ranges (
+            id INTEGER PRIMARY KEY,
+            vulnerability_id INTEGER NOT NULL REFERENCES package_vulnerabilities(id),
+            ecosystem TEXT NOT NULL,
+            package_name TEXT NOT NULL,
+            introduced TEXT,
+            introduced_key TEXT NOT NULL DEFAULT '',
+            fixed TEXT,
+            fixed_key TEXT,
+            last_affected TEXT,
+            last_affected_key TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_ranges_lookup ON affected_ranges(ecosystem, package_name, introduced_key);
+        CREATE INDEX IF NOT EXISTS idx_ranges_vulnerability ON affected_ranges(vulnerability_id);
+        
+        CREATE TRIGGER IF NOT EXISTS trg_pkg_ranges_delete AFTER DELETE ON package_vulnerabilities BEGIN
+            DELETE FROM affected_ranges WHERE vulnerability_id = old.id;
+        END;
+        ''')
+    
+    def _backfill_affected_ranges(self, conn, low=0, high=None):
+        """
+        Convertir l'ancien texte de affected_versions en plages structurées
+        
+        Les segments illisibles (texte tronqué) sont ignorés ; patched_version
+        est renseignée quand elle était vide.
+        
+        Args:
+            low, high: Bornes exclusive / inclusive des id traités (toute la table par défaut)
+        
+        Returns:
+            int: Nombre de plages créées
+        """
+        if high is None:
+            high = conn.execute("SELECT COALESCE(MAX(id), 0) FROM package_vulnerabilities").fetchone()[0]
+        
+        rows = conn.execute('''
+        SELECT id, ecosystem, affected_versions, patched_version FROM package_vulnerabilities p
+        WHERE p.id > ? AND p.id <= ?
+        AND affected_versions LIKE '%[%'
+        AND NOT EXISTS (SELECT 1 FROM affected_ranges r WHERE r.vulnerability_id = p.id)
+        ''', (low, high)).fetchall()
+        
+        created = 0
+        for vuln_id, ecosystem, text, patched in rows:
+            parsed = parse_legacy_ranges(text)
+            for package_name, intervals in parsed:
+                created += self._insert_affected_ranges(conn, vuln_id, ecosystem, package_name, intervals)
+            if parsed and not patched:
+                conn.execute(
+                    "UPDATE package_vulnerabilities SET patched_version = ? WHERE id = ?",
+                    (latest_fixed([i for _, intervals in parsed for i in intervals], ecosystem), vuln_id)
+                )
+        return created
+    
+    def _rekey_affected_ranges(self, conn, low, high):
+        """
+        Recalculer les clés de tri des plages selon l'ordre de leur écosystème
+        
+        Args:
+            low, high: Bornes exclusive / inclusive des id traités
+        
+        Returns:
+            int: Nombre de plages relues
+        """
+        rows = conn.execute('''
+        SELECT id, ecosystem, introduced, fixed, last_affected FROM affected_ranges
+        WHERE id > ? AND id <= ?
+        ''', (low, high)).fetchall()
+        conn.executemany('''
+        UPDATE affected_ranges SET introduced_key = ?, fixed_key = ?, last_affected_key = ?
+        WHERE id = ?
+        ''', [
+            (version_key(introduced, ecosystem) or '', version_key(fixed, ecosystem),
+             version_key(last_affected, ecosystem), range_id)
+            for range_id, ecosystem, introduced, fixed, last_affected in rows
+        ])
+        return len(rows)
+    
+    def _create_collector_state(self, conn):
+        """
+        Créer la table des filigranes de collecte
+        
+        Une ligne par (source, clé) : dernier horodatage 'modified' vu,
+        identifiants déjà téléchargés (JSON) et ETag de la dernière réponse.
+        """
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS collector_state (
+            source TEXT NOT NULL,
+            state_key TEXT NOT NULL,
+            watermark TEXT,
+            etag TEXT,
+            seen_ids TEXT NOT NULL DEFAULT '[]',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source, state_key)
+        ) WITHOUT ROWID
+        ''')
+    
+    def _create_archive_tombstones(self, conn):
+        """
+        Créer les clés des avis archivés et les triggers qui les protègent
+        
+        apply_retention y inscrit chaque CVE et chaque clé naturelle de
+        package déplacée vers l'archive, avec la date de modification de la
+        CVE ou l'empreinte de contenu du package. Les triggers BEFORE INSERT
+        ignorent ensuite la réinsertion des mêmes données par un collecteur
+        (comptée comme doublon), sans quoi la rétention serait annulée à la
+        collecte suivante ; une CVE modifiée depuis ou un package dont le
+        contenu a changé efface sa clé et revient dans les tables chaudes.
+        """
+        conn.executescript('''
+        CREATE TABLE IF NOT EXISTS archived_cves (
+            cve_id TEXT PRIMARY KEY,
+            modified_date TEXT
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS archived_packages (
+            source TEXT NOT NULL,
+            advisory_id TEXT NOT NULL,
+            package_name TEXT NOT NULL,
+            ecosystem TEXT NOT NULL,
+            content_hash TEXT,
+            PRIMARY KEY (source, advisory_id, package_name, ecosystem)
+        ) WITHOUT ROWID;
+        
+        DROP TRIGGER IF EXISTS trg_cve_archived_insert;
+        CREATE TRIGGER trg_cve_archived_insert BEFORE INSERT ON cve_vulnerabilities
+        WHEN EXISTS (SELECT 1 FROM archived_cves WHERE cve_id = new.cve_id)
+        BEGIN
+            DELETE FROM archived_cves
+            WHERE cve_id = new.cve_id AND IFNULL(new.modified_date, '') > IFNULL(modified_date, '');
+            SELECT RAISE(IGNORE) FROM archived_cves WHERE cve_id = new.cve_id;
+        END;
+        DROP TRIGGER IF EXISTS trg_pkg_archived_insert;
+        CREATE TRIGGER trg_pkg_archived_insert BEFORE INSERT ON package_vulnerabilities
+        WHEN EXISTS (
+            SELECT 1 FROM archived_packages
+            WHERE source = IFNULL(new.source, '') AND advisory_id = new.advisory_id
+            AND package_name = new.package_name AND ecosystem = IFNULL(new.ecosystem, '')
+        )
+        BEGIN
+            DELETE FROM archived_packages
+            WHERE source = IFNULL(new.source, '') AND advisory_id = new.advisory_id
+            AND package_name = new.package_name AND ecosystem = IFNULL(new.ecosystem, '')
+            AND content_hash IS NOT new.content_hash;
+            SELECT RAISE(IGNORE) FROM archived_packages
+            WHERE source = IFNULL(new.source, '') AND advisory_id = new.advisory_id
+            AND package_name = new.package_name AND ecosystem = IFNULL(new.ecosystem, '');
+        END;
+        ''')
+    
+    def _backfill_archive_tombstones(self, conn):
+        """
+        Inscrire les clés et le contenu des avis déjà présents dans la base d'archive
+        
+        Returns:
+            int: Nombre de clés ajoutées ou mises à jour
+        """
+        if not self._has_archive(conn):
+            return 0
+        
+        added = conn.execute(self.ARCHIVED_CVES_SQL.format(source='archive', where='')).rowcount
+        return added + conn.execute(self.ARCHIVED_PACKAGES_SQL.format(source='archive', where='')).rowcount
+    
+    # ========== FONCTIONS INSERT (Ajouter données) ==========
+    
+    CVE_INSERT_SQL = '''
+    INSERT OR IGNORE INTO cve_vulnerabilities 
+    (cve_id, title, description, cvss_score, severity, published_date, modified_date, url, published_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
+    # Mise à jour seulement si le contenu de la CVE a changé
+    CVE_UPSERT_SQL = '''
+    INSERT INTO cve_vulnerabilities 
+    (cve_id, title, description, cvss_score, severity, published_date, modified_date, url, published_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(cve_id) DO UPDATE SET
+        title = excluded.title,
+        description = excluded.description,
+        cvss_score = excluded.cvss_score,
+        severity = excluded.severity,
+        published_date = excluded.published_date,
+        modified_date = excluded.modified_date,
+        url = excluded.url,
+        published_ts = excluded.published_ts
+    WHERE cve_vulnerabilities.title IS NOT excluded.title
+       OR cve_vulnerabilities.description IS NOT excluded.description
+       OR cve_vulnerabilities.cvss_score IS NOT excluded.cvss_score
+       OR cve_vulnerabilities.severity IS NOT excluded.severity
+       OR cve_vulnerabilities.published_date IS NOT excluded.published_date
+       OR cve_vulnerabilities.modified_date IS NOT excluded.modified_date
+       OR cve_vulnerabilities.url IS NOT excluded.url
+    '''
+    
+    # Clé naturelle : (source, advisory_id, package_name, ecosystem). SQLite
+    # tient les NULL pour distincts dans un index unique : source et ecosystem
+    # absents sont indexés comme ''
+    PACKAGE_NATURAL_KEY = "IFNULL(source, ''), advisory_id, package_name, IFNULL(ecosystem, '')"
+    PACKAGE_NATURAL_KEY_WHERE = (
+        "IFNULL(source, '') = IFNULL(?, '') AND advisory_id = ? "
+        "AND package_name = ? AND IFNULL(ecosystem, '') = IFNULL(?, '')"
+    )
+    
+    # La ligne n'est réécrite que si son empreinte de contenu a changé
+    PACKAGE_UPSERT_SQL = f'''
+    INSERT INTO package_vulnerabilities 
+    (package_name, ecosystem, vulnerability_type, cvss_score, severity, 
+     title, description, published_date, discovered_date, affected_versions, 
+     patched_version, source, url, advisory_id, content_hash, published_ts, discovered_ts)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT({PACKAGE_NATURAL_KEY}) DO UPDATE SET
+        vulnerability_type = excluded.vulnerability_type,
+        cvss_score = excluded.cvss_score,
+        severity = excluded.severity,
+        title = excluded.title,
+        description = excluded.description,
+        published_date = excluded.published_date,
+        affected_versions = excluded.affected_versions,
+        patched_version = excluded.patched_version,
+        url = excluded.url,
+        content_hash = excluded.content_hash,
+        published_ts = excluded.published_ts
+    WHERE package_vulnerabilities.content_hash IS NOT excluded.content_hash
+    '''
+    
+    # Champs qui entrent dans l'empreinte de contenu d'un package
+    PACKAGE_HASH_FIELDS = (
+        'vulnerability_type', 'cvss_score', 'severity', 'title', 'description',
+        'published_date', 'affected_versions', 'patched_version', 'url'
+    )
+    
+    @classmethod
+    def _timestamp_of(cls, data, ts_key, date_key):
+        """Timestamp fourni par le collecteur, sinon calculé depuis la date texte"""
+        ts = data.get(ts_key)
+        return ts if ts is not None else cls.to_timestamp(data.get(date_key))
+    
+    @classmethod
+    def _cve_row(cls, cve_data):
+        """Convertir un dictionnaire CVE en tuple pour CVE_INSERT_SQL"""
+        return (
+            cve_data.get('cve_id'),
+            cve_data.get('title', 'No title'),
+            cve_data.get('description', 'No description available'),
+            cve_data.get('cvss_score'),
+            cve_data.get('severity'),
+            cve_data.get('published_date'),
+            cve_data.get('modified_date'),
+            cve_data.get('url'),
+            cls._timestamp_of(cve_data, 'published_ts', 'published_date')
+        )
+    
+    @classmethod
+    def _content_hash(cls, package_data):
+        """Empreinte SHA-1 du contenu d'une vulnérabilité de package"""
+        content = '\x1f'.join(str(package_data.get(field, '')) for field in cls.PACKAGE_HASH_FIELDS)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _package_advisory_id(package_data):
+        """Identifiant d'avis : fourni par le collecteur, sinon URL ou titre"""
+        return (
+            package_data.get('advisory_id')
+            or package_data.get('url')
+            or package_data.get('title', 'No title')
+        )
+    
+    @classmethod
+    def _package_row(cls, package_data):
+        """Convertir un dictionnaire package en tuple pour PACKAGE_UPSERT_SQL"""
+        return (
+            package_data.get('package_name'),
+            package_data.get('ecosystem'),
+            package_data.get('vulnerability_type'),
+            package_data.get('cvss_score'),
+            package_data.get('severity'),
+            package_data.get('title', 'No title'),
+            package_data.get('description', 'No description available'),
+            package_data.get('published_date'),
+            package_data.get('discovered_date'),
+            package_data.get('affected_versions'),
+            package_data.get('patched_version'),
+            package_data.get('source'),
+            package_data.get('url'),
+            cls._package_advisory_id(package_data),
+            cls._content_hash(package_data),
+            cls._timestamp_of(package_data, 'published_ts', 'published_date'),
+            cls._timestamp_of(package_data, 'discovered_ts', 'discovered_date')
+        )
+    
+    def insert_cve(self, cve_data):
+        """
+        Ajouter une vulnérabilité CVE avec description complète
+        
+        Args:
+            cve_data: Dictionnaire avec clés : cve_id, title, description, 
+                     cvss_score, severity, published_date, url
+        
+        Returns:
+            True si succès, False sinon
+        """
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self.CVE_INSERT_SQL, self._cve_row(cve_data))
+                return True
+        except Exception as e:
+            print(f"❌ Erreur insertion CVE : {e}")
+            return False
+    
+    def insert_package_vulnerability(self, package_data):
+        """
+        Ajouter (ou mettre à jour) une vulnérabilité de package
+        
+        Args:
+            package_data: Dictionnaire avec toutes les infos du package
+                          (advisory_id recommandé pour la déduplication)
+        
+        Returns:
+            ID de la vulnérabilité (nouvelle ou existante) ou None
+        """
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self.PACKAGE_UPSERT_SQL, self._package_row(package_data))
+                cursor.execute(f'''
+                SELECT id FROM package_vulnerabilities
+                WHERE {self.PACKAGE_NATURAL_KEY_WHERE}
+                ''', (
+                    package_data.get('source'),
+                    self._package_advisory_id(package_data),
+                    package_data.get('package_name'),
+                    package_data.get('ecosystem')
+                ))
+                row = cursor.fetchone()
+                vuln_id = row[0] if row else cursor.lastrowid
+                return vuln_id
+        except Exception as e:
+            print(f"❌ Erreur insertion package : {e}")
+            return None
+    
+    def insert_supply_chain(self, parent_package, dependent_package, ecosystem, vulnerability_id=None):
+        """
+        Ajouter une relation de dépendance supply-chain
+        """
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                INSERT INTO supply_chain 
+                (parent_package, dependent_package, ecosystem, vulnerability_id)
+                VALUES (?, ?, ?, ?)
+                ''', (parent_package, dependent_package, ecosystem, vulnerability_id))
+                return True
+        except Exception as e:
+            print(f"❌ Erreur insertion supply-chain : {e}")
+            return False
+    
+    def insert_article(self, article_data):
+        """Ajouter un article"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                INSERT INTO articles (title, content, source, category, url, published_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    article_data.get('title'),
+                    article_data.get('content'),
+                    article_data.get('source'),
+                    article_data.get('category'),
+                    article_data.get('url'),
+                    article_data.get('published_date')
+                ))
+                return True
+        except Exception as e:
+            print(f"❌ Erreur insertion article : {e}")
+            return False
+    
+    def insert_trend(self, keyword, count=1, severity_level=None):
+        """Ajouter une tendance"""
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                INSERT INTO trends (keyword, count, severity_level)
+                VALUES (?, ?, ?)
+                ''', (keyword, count, severity_level))
+                return True
+        except Exception as e:
+            print(f"❌ Erreur insertion trend : {e}")
+            return False
+    
+    # ========== FONCTIONS BULK (Ingestion par lots) ==========
+    
+    def _bulk_execute(self, table, sql, rows, batch_size=None):
+        """
+        Insérer des lignes par lots : un executemany et un commit par lot
+        
+        Les lignes réellement insérées sont comptées via l'id AUTOINCREMENT
+        (id > max(id) avant le lot), les autres modifications sont des mises
+        à jour et les lignes restantes des doublons ignorés.
+        
+        Args:
+            table: Table cible (pour compter les insertions)
+            sql: Requête paramétrée
+            rows: Itérable de tuples
+            batch_size: Taille des lots (Config.DB_BULK_BATCH_SIZE par défaut)
+        
+        Returns:
+            List[Dict]: Un dictionnaire par lot (batch, rows, inserted, updated, duplicates, errors)
+        """
+        batch_size = batch_size or Config.DB_BULK_BATCH_SIZE
+        rows = iter(rows)
+        results = []
+        
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            
+            stats = {'batch': len(results) + 1, 'rows': len(batch),
+                     'inserted': 0, 'updated': 0, 'duplicates': 0, 'errors': 0}
+            try:
+                with self.connection() as conn:
+                    max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+                    # rowcount : modifications directes, hors triggers (FTS, index, cumuls)
+                    changes = conn.executemany(sql, batch).rowcount
+                    inserted = conn.execute(
+                        f"SELECT COUNT(*) FROM {table} WHERE id > ?", (max_id,)
+                    ).fetchone()[0]
+                
+                stats['inserted'] = inserted
+                stats['updated'] = changes - inserted
+                stats['duplicates'] = len(batch) - changes
+            except Exception as e:
+                stats['errors'] = len(batch)
+                stats['error'] = str(e)
+                print(f"❌ Erreur insertion par lot ({table}, lot {stats['batch']}) : {e}")
+            
+            results.append(stats)
+        
+        return results
+    
+    def bulk_upsert_cves(self, cves, batch_size=None):
+        """
+        Ajouter ou mettre à jour des CVE par lots (une transaction par lot)
+        
+        Une CVE déjà connue n'est réécrite que si son contenu a changé.
+        
+        Args:
+            cves: Itérable de dictionnaires (mêmes clés que insert_cve)
+            batch_size: Taille des lots
+        
+        Returns:
+            List[Dict]: Compteurs par lot (batch, rows, inserted, updated, duplicates, errors)
+        """
+        rows = (self._cve_row(cve) for cve in cves)
+        return self._bulk_execute('cve_vulnerabilities', self.CVE_UPSERT_SQL, rows, batch_size)
+    
+    def bulk_upsert_packages(self, packages, batch_size=None):
+        """
+        Ajouter ou mettre à jour des vulnérabilités de packages par lots
+        
+        Déduplication sur la clé naturelle (source, advisory_id, package_name,
+        ecosystem) : une ligne existante n'est réécrite que si son empreinte
+        de contenu a changé.
+        
+        Args:
+            packages: Itérable de dictionnaires (mêmes clés que insert_package_vulnerability)
+            batch_size: Taille des lots
+        
+        Returns:
+            List[Dict]: Compteurs par lot (batch, rows, inserted, updated, duplicates, errors)
+        """
+        rows = (self._package_row(pkg) for pkg in packages)
+        return self._bulk_execute('package_vulnerabilities', self.PACKAGE_UPSERT_SQL, rows, batch_size)
+    
+    def bulk_load_dependency_edges(self, edges, ecosystem='', batch_size=None):
+        """
+        Charger un graphe de dépendances (lockfile) en une transaction
+        
+        Les paires de noms sont copiées dans une table temporaire, puis
+        packages et dependency_edges sont alimentées par deux requêtes
+        ensemblistes : pas d'aller-retour par arête.
+        
+        Args:
+            edges: Itérable de paires (package, dépendance)
+            ecosystem: Écosystème des packages ('npm', 'pip', ...)
+            batch_size: Lignes par executemany (Config.DB_BULK_BATCH_SIZE)
+        
+        Returns:
+            Dict: {'rows': paires lues, 'packages': nouveaux packages, 'inserted': nouvelles arêtes}
+        """
+        batch_size = batch_size or Config.DB_BULK_BATCH_SIZE
+        ecosystem = ecosystem or ''
+        edges = iter(edges)
+        
+        with self.connection() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS edge_import (parent TEXT NOT NULL, dependency TEXT NOT NULL)")
+            conn.execute("DELETE FROM temp.edge_import")
+            while True:
+                batch = list(islice(edges, batch_size))
+                if not batch:
+                    break
+                conn.executemany("INSERT INTO temp.edge_import (parent, dependency) VALUES (?, ?)", batch)
+            
+            rows = conn.execute("SELECT COUNT(*) FROM temp.edge_import").fetchone()[0]
+            packages = conn.execute('''
+            INSERT OR IGNORE INTO packages (name, ecosystem)
+            SELECT parent, ? FROM temp.edge_import
+            UNION
+            SELECT dependency, ? FROM temp.edge_import
+            ''', (ecosystem, ecosystem)).rowcount
+            inserted = conn.execute('''
+            INSERT OR IGNORE INTO dependency_edges (parent_id, dependency_id)
+            SELECT p.id, d.id
+            FROM temp.edge_import e
+            JOIN packages p ON p.name = e.parent AND p.ecosystem = ?
+            JOIN packages d ON d.name = e.dependency AND d.ecosystem = ?
+            ''', (ecosystem, ecosystem)).rowcount
+            conn.execute("DELETE FROM temp.edge_import")
+        
+        print(f"✅ Graphe chargé : {rows} arêtes lues, {inserted} nouvelles, {packages} nouveaux packages")
+        return {'rows': rows, 'packages': packages, 'inserted': inserted}
+    
+    # ========== FONCTIONS GET (Récupérer données) ==========
+    
+    def get_all_cve(self):
+        """Récupérer toutes les CVE"""
+        with self.connection() as conn:
+            df = pd.read_sql_query(
+                "SELECT * FROM cve_vulnerabilities ORDER BY published_date DESC", 
+                conn
+            )
+        return df
+    
+    def get_all_packages(self):
+        """Récupérer toutes les vulnérabilités de packages"""
+        with self.connection() as conn:
+            df = pd.read_sql_query(
+                "SELECT * FROM package_vulnerabilities ORDER BY published_date DESC", 
+                conn
+            )
+        return df
+    
+    # Colonnes par défaut de get_all_vulnerabilities_combined
+    COMBINED_COLUMNS = (
+        'cve_id', 'title', 'description', 'severity', 'cvss_score', 'affected_component',
+        'ecosystem', 'vulnerability_type', 'published_date', 'discovered_date',
+        'modified_date', 'source', 'url', 'published_ts'
+    )
+    
+    def get_all_vulnerabilities_combined(self, days=None, columns=None):
+        """
+        Combiner CVE et Packages dans une seule vue
+        Compatible avec l'interface actuelle
+        
+        Args:
+            days: Ne garder que les vulnérabilités publiées ces X derniers jours
+            columns: Projection (clés de VULNERABILITY_COLUMNS), COMBINED_COLUMNS par défaut
+        """
+        select, needs_join = self._projection(self.VULNERABILITY_COLUMNS, columns or self.COMBINED_COLUMNS)
+        query = f"SELECT {select} FROM vulnerability_index v"
+        if needs_join:
+            query += self.SOURCE_JOIN
+        params = []
+        
+        if days:
+            query += " WHERE v.published_ts >= ?"
+            params.append(self.since_timestamp(days))
+        
+        query += " ORDER BY v.published_date DESC"
+        
+        with self.connection() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+        return df
+    
+    def get_packages_by_severity(self, severity):
+        """Filtrer packages par sévérité"""
+        query = "SELECT * FROM package_vulnerabilities WHERE severity = ? ORDER BY cvss_score DESC"
+        with self.connection() as conn:
+            df = pd.read_sql_query(query, conn, params=(severity,))
+        return df
+    
+    def get_packages_by_ecosystem(self, ecosystem):
+        """Filtrer par écosystème"""
+        query = "SELECT * FROM package_vulnerabilities WHERE ecosystem = ? ORDER BY published_date DESC"
+        with self.connection() as conn:
+            df = pd.read_sql_query(query, conn, params=(ecosystem,))
+        return df
+    
+    # Colonnes par défaut de search_vulnerabilities
+    SEARCH_COLUMNS = (
+        'cve_id', 'title', 'description', 'severity', 'cvss_score',
+        'affected_component', 'ecosystem', 'vulnerability_type', 'published_date', 'url'
+    )
+    
+    def search_vulnerabilities(self, severity=None, component=None, days=None, columns=None,
+                               as_dataframe=True, include_archive=False):
+        """
+        Recherche multi-critères compatible avec l'interface Flask
+        
+        Args:
+            columns: Projection (clés de DISPLAY_COLUMNS), SEARCH_COLUMNS par défaut.
+                     Passer LIST_COLUMNS évite de lire les descriptions.
+            as_dataframe: False pour une liste de dictionnaires lue directement
+                          sur le curseur (sans passer par pandas)
+            include_archive: True pour ajouter les lignes déplacées dans la
+                             base d'archive par apply_retention
+        """
+        # Construction de la requête dynamique
+        conditions = []
+        params = []
+        
+        columns = columns or self.SEARCH_COLUMNS
+        select, needs_join = self._projection(self.DISPLAY_COLUMNS, columns)
+        from_clause = " FROM vulnerability_index v"
+        if needs_join:
+            from_clause += self.SOURCE_JOIN
+        
+        if severity:
+            conditions.append("v.severity = ?")
+            params.append(severity)
+        
+        if component:
+            conditions.append("(v.package_name LIKE ? OR v.cve_id LIKE ?)")
+            params.extend([f'%{component}%', f'%{component}%'])
+        
+        if days:
+            conditions.append("v.published_ts >= ?")
+            params.append(self.since_timestamp(days))
+        
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        
+        with self.connection() as conn:
+            if include_archive and self._has_archive(conn):
+                # Mêmes filtres sur les tables chaudes et sur l'archive
+                base_query = (
+                    f"SELECT {', '.join(columns)} FROM ("
+                    f"SELECT {select}, v.published_date AS sort_date{from_clause}{where} UNION ALL "
+                    f"SELECT {select}, v.published_date AS sort_date{self._archive_sql(from_clause)}{where}"
+                    f") ORDER BY sort_date DESC"
+                )
+                params = params * 2
+            else:
+                base_query = f"SELECT {select}{from_clause}{where} ORDER BY v.published_date DESC"
+            
+            if not as_dataframe:
+                cursor = conn.execute(base_query, params)
+                names = [col[0] for col in cursor.description]
+                return [dict(zip(names, row)) for row in cursor]
+            df = pd.read_sql_query(base_query, conn, params=params)
+        return df
+    
+    # ========== LECTURE EN FLUX ==========
+    
+    def _stream_query(self, columns=None, where=None, days=None):
+        """
+        Construire la requête de iter_vulnerabilities
+        
+        Raises:
+            ValueError: si une colonne n'est pas dans VULNERABILITY_COLUMNS
+        """
+        columns = list(columns or self.VULNERABILITY_COLUMNS)
+        where = where or {}
+        select, needs_join = self._projection(self.VULNERABILITY_COLUMNS, columns)
+        _, filter_join = self._projection(self.VULNERABILITY_COLUMNS, list(where))
+        query = f"SELECT {select} FROM vulnerability_index v"
+        if needs_join or filter_join:
+            # Jointure vers les tables sources seulement si le texte est demandé
+            query += self.SOURCE_JOIN
+        
+        conditions = []
+        params = []
+        for col, value in where.items():
+            conditions.append(f"{self.VULNERABILITY_COLUMNS[col]} = ?")
+            params.append(value)
+        if days:
+            conditions.append("v.published_ts >= ?")
+            params.append(self.since_timestamp(days))
+        
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY v.published_date DESC, v.id DESC"
+        return query, params
+    
+    def iter_vulnerabilities(self, columns=None, where=None, days=None, chunk_size=None):
+        """
+        Parcourir les vulnérabilités (CVE + packages) sans tout charger
+        
+        Les lignes sont lues par paquets de `chunk_size` : la mémoire utilisée
+        ne dépend pas de la taille de la base. Interrompre la boucle libère
+        la connexion.
+        
+        Args:
+            columns: Colonnes voulues (clés de VULNERABILITY_COLUMNS), toutes par défaut
+            where: Filtres d'égalité {colonne: valeur}
+            days: Ne garder que les vulnérabilités publiées ces X derniers jours
+            chunk_size: Lignes lues par aller-retour (Config.DB_STREAM_CHUNK_SIZE)
+        
+        Yields:
+            Dict: une vulnérabilité par itération
+        """
+        query, params = self._stream_query(columns, where, days)
+        chunk_size = chunk_size or Config.DB_STREAM_CHUNK_SIZE
+        
+        with self.connection() as conn:
+            cursor = conn.execute(query, params)
+            names = [col[0] for col in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(names, row))
+    
+    def iter_vulnerability_frames(self, columns=None, where=None, days=None, chunk_size=None):
+        """
+        Variante de iter_vulnerabilities produisant des DataFrames
+        
+        Yields:
+            DataFrame: au plus `chunk_size` lignes par itération
+        """
+        query, params = self._stream_query(columns, where, days)
+        chunk_size = chunk_size or Config.DB_STREAM_CHUNK_SIZE
+        
+        with self.connection() as conn:
+            for frame in pd.read_sql_query(query, conn, params=params, chunksize=chunk_size):
+                yield frame
+    
+    # ========== PAGINATION PAR CURSEUR ==========
+    
+    @staticmethod
+    def encode_cursor(published_date, row_id):
+        """Encoder la position (published_date, id) en curseur opaque"""
+        raw = json.dumps([published_date, row_id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Décoder un curseur produit par encode_cursor
+        
+        Raises:
+            ValueError: si le curseur est invalide
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            published_date, row_id = json.loads(base64.urlsafe_b64decode(padded))
+            return str(published_date), int(row_id)
+        except Exception:
+            raise ValueError(f"Curseur invalide : {cursor}")
+    
+    # Projection des pages : identifiant affichable, composant brut (None pour une CVE)
+    PAGE_COLUMNS = dict(VULNERABILITY_COLUMNS, cve_id=DISPLAY_COLUMNS['cve_id'])
+    
+    def get_vulnerabilities_page(self, limit=10, cursor=None, severity=None, ecosystem=None,
+                                 columns=None):
+        """
+        Page de vulnérabilités (CVE + packages) triée par date de publication
+        
+        Pagination par curseur sur vulnerability_index : la lecture démarre
+        à la position du curseur dans l'index (published_date, id) et ne lit
+        que `limit + 1` lignes, quel que soit le numéro de page.
+        
+        Args:
+            limit: Taille de la page
+            cursor: Curseur opaque renvoyé par la page précédente
+            severity: Filtre optionnel de sévérité
+            ecosystem: Filtre optionnel d'écosystème (exclut les CVE générales)
+            columns: Projection (clés de PAGE_COLUMNS), LIST_COLUMNS par défaut
+        
+        Returns:
+            Dict: items (liste de dictionnaires), next_cursor (None en fin de liste)
+        """
+        conditions = []
+        params = []
+        
+        if severity:
+            conditions.append("v.severity = ?")
+            params.append(severity)
+        if ecosystem:
+            conditions.append("v.ecosystem = ?")
+            params.append(ecosystem)
+        if cursor:
+            # Borne `<=` explicite : SQLite positionne la lecture dans l'index
+            # au lieu de le parcourir depuis le début
+            published_date, row_id = self.decode_cursor(cursor)
+            conditions.append("v.published_date <= ? AND (v.published_date < ? OR v.id < ?)")
+            params.extend([published_date, published_date, row_id])
+        
+        select, needs_join = self._projection(self.PAGE_COLUMNS, columns or self.LIST_COLUMNS)
+        query = f"SELECT v.id AS _cursor_id, v.published_date AS _cursor_date, {select} FROM vulnerability_index v"
+        if needs_join:
+            query += self.SOURCE_JOIN
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY v.published_date DESC, v.id DESC LIMIT ?"
+        params.append(limit + 1)
+        
+        with self.connection() as conn:
+            cursor_db = conn.execute(query, params)
+            names = [col[0] for col in cursor_db.description]
+            rows = [dict(zip(names, row)) for row in cursor_db.fetchall()]
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = self.encode_cursor(last['_cursor_date'], last['_cursor_id'])
+        
+        for row in rows:
+            del row['_cursor_id'], row['_cursor_date']
+        
+        return {'items': rows, 'next_cursor': next_cursor}
+    
+    def get_vulnerability(self, vuln_id):
+        """
+        Détail d'une vulnérabilité, description comprise
+        
+        Args:
+            vuln_id: Identifiant renvoyé par les listes (id du package, -id de la CVE)
+        
+        Returns:
+            Dict ou None si l'identifiant est inconnu
+        """
+        select, _ = self._projection(self.DISPLAY_COLUMNS, list(self.DISPLAY_COLUMNS))
+        query = f"SELECT {select} FROM vulnerability_index v {self.SOURCE_JOIN} WHERE v.id = ?"
+        
+        with self.connection() as conn:
+            cursor = conn.execute(query, (vuln_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip([col[0] for col in cursor.description], row))
+    
+    def count_vulnerabilities(self, severity=None, ecosystem=None, use_cache=True):
+        """
+        Nombre de vulnérabilités correspondant aux filtres
+        
+        Sans filtre, le total vient de get_total_count(). Avec filtres, le
+        résultat est mis en cache Config.DB_COUNT_CACHE_TTL secondes.
+        """
+        if not severity and not ecosystem:
+            return self.get_total_count()['total']
+        
+        key = (severity, ecosystem)
+        now = time.monotonic()
+        if use_cache:
+            with self._count_cache_lock:
+                cached = self._count_cache.get(key)
+            if cached and cached[1] > now:
+                return cached[0]
+        
+        conditions = []
+        params = []
+        if severity:
+            conditions.append("severity = ?")
+            params.append(severity)
+        if ecosystem:
+            conditions.append("ecosystem = ?")
+            params.append(ecosystem)
+        query = "SELECT COUNT(*) FROM vulnerability_index WHERE " + " AND ".join(conditions)
+        
+        with self.connection() as conn:
+            total = conn.execute(query, params).fetchone()[0]
+        
+        with self._count_cache_lock:
+            self._count_cache[key] = (total, now + Config.DB_COUNT_CACHE_TTL)
+        return total
+    
+    # Marqueurs de surlignage FTS, remplacés par <mark> après échappement HTML
+    _HL_START = '\x02'
+    _HL_END = '\x03'
+    
+    @staticmethod
+    def _fts_query(text):
+        """
+        Transformer une saisie libre en requête FTS5 sûre
+        
+        Chaque mot devient une chaîne entre guillemets avec recherche par
+        préfixe ; les mots sont combinés en ET implicite.
+        """
+        tokens = re.findall(r'[\w][\w.\-]*', str(text or ''))
+        return ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+    
+    @classmethod
+    def _highlight_html(cls, text):
+        """Échapper un extrait FTS et convertir les marqueurs en balises <mark>"""
+        if not text:
+            return ''
+        escaped = html.escape(text)
+        return escaped.replace(cls._HL_START, '<mark>').replace(cls._HL_END, '</mark>')
+    
+    # Colonnes par défaut de search_fulltext (score et snippet sont toujours ajoutés)
+    FULLTEXT_COLUMNS = (
+        'cve_id', 'title', 'description', 'severity', 'cvss_score',
+        'affected_component', 'ecosystem', 'published_date', 'url'
+    )
+    
+    def search_fulltext(self, query, severity=None, limit=20, columns=None):
+        """
+        Recherche plein texte classée par pertinence (BM25)
+        
+        Porte sur les identifiants (CVE / avis), titres, descriptions et noms
+        de packages. Sans FTS5, repli sur une recherche LIKE non classée.
+        
+        Args:
+            query: Texte saisi par l'utilisateur
+            severity: Filtre optionnel de sévérité
+            limit: Nombre maximum de résultats
+            columns: Projection (clés de DISPLAY_COLUMNS), FULLTEXT_COLUMNS par défaut
+        
+        Returns:
+            List[Dict]: colonnes demandées, plus score (plus petit = plus
+                        pertinent) et snippet (HTML)
+        """
+        fts_query = self._fts_query(query)
+        if not fts_query:
+            return []
+        
+        columns = columns or self.FULLTEXT_COLUMNS
+        select, needs_join = self._projection(self.DISPLAY_COLUMNS, columns)
+        
+        if not self.fts_enabled:
+            return self._search_like(query, severity=severity, limit=limit, columns=columns)
+        
+        # Poids BM25 : identifiant > titre > package > description
+        sql = f'''
+        WITH hits AS (
+            SELECT rowid,
+                   bm25(vulnerabilities_fts, 10.0, 5.0, 1.0, 3.0) AS score,
+                   snippet(vulnerabilities_fts, -1, '{self._HL_START}', '{self._HL_END}', '…', 16) AS snippet
+            FROM vulnerabilities_fts
+            WHERE vulnerabilities_fts MATCH ?
+            ORDER BY score
+        )
+        SELECT {select}, h.score, h.snippet
+        FROM hits h
+        JOIN vulnerability_index v ON v.id = h.rowid
+        {self.SOURCE_JOIN if needs_join else ''}
+        WHERE (? IS NULL OR v.severity = ?)
+        ORDER BY h.score
+        LIMIT ?
+        '''
+        
+        with self.connection() as conn:
+            cursor = conn.execute(sql, (fts_query, severity, severity, limit))
+            columns = [col[0] for col in cursor.description]
+            rows = cursor.fetchall()
+        
+        results = []
+        for row in rows:
+            item = dict(zip(columns, row))
+            item['score'] = round(item['score'], 4)
+            item['snippet'] = self._highlight_html(item['snippet'])
+            results.append(item)
+        
+        return results
+    
+    def _search_like(self, query, severity=None, limit=20, columns=None):
+        """Repli sans FTS5 : LIKE sur titres et descriptions, sans classement"""
+        columns = list(columns or self.FULLTEXT_COLUMNS)
+        needed = ['cve_id', 'title', 'description', 'affected_component']
+        df = self.search_vulnerabilities(
+            severity=severity,
+            columns=columns + [col for col in needed if col not in columns]
+        )
+        terms = [t.lower() for t in re.findall(r'[\w][\w.\-]*', str(query))]
+        
+        results = []
+        for item in df.to_dict('records'):
+            text = f"{item['cve_id']} {item['title']} {item['description']} {item['affected_component']}".lower()
+            if all(term in text for term in terms):
+                snippet = html.escape(str(item['description'] or '')[:200])
+                item = {col: item[col] for col in columns}
+                item['score'] = 0.0
+                item['snippet'] = snippet
+                results.append(item)
+                if len(results) >= limit:
+                    break
+        
+        return results
+    
+    def get_supply_chain_impact(self, package_name):
+        """Trouver tous les packages qui dépendent d'un package donné"""
+        query = '''
+        SELECT sc.parent_package, sc.dependent_package, sc.ecosystem, 
+               pv.severity, pv.cvss_score, pv.description
+        FROM supply_chain sc
+        LEFT JOIN package_vulnerabilities pv ON sc.vulnerability_id = pv.id
+        WHERE sc.dependent_package = ?
+        '''
+        with self.connection() as conn:
+            df = pd.read_sql_query(query, conn, params=(package_name,))
+        return df
+    
+    # ========== VERSIONS AFFECTÉES ==========
+    
+    AFFECTED_RANGE_INSERT_SQL = '''
+    INSERT INTO affected_ranges
+    (vulnerability_id, ecosystem, package_name, introduced, introduced_key,
+     fixed, fixed_key, last_affected, last_affected_key)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
+    # Avis dont une plage contient la version (clé) demandée
+    AFFECTED_MATCH_SQL = '''
+    r.introduced_key <= {key}
+    AND (r.fixed_key IS NULL OR {key} < r.fixed_key)
+    AND (r.last_affected_key IS NULL OR {key} <= r.last_affected_key)
+    '''
+    
+    AFFECTED_COLUMNS = '''
+    p.id AS vulnerability_id, p.advisory_id, p.title, p.severity, p.cvss_score,
+    r.introduced, r.fixed, r.last_affected, p.url
+    '''
+    
+    @classmethod
+    def _affected_range_rows(cls, vuln_id, ecosystem, package_name, intervals):
+        """Lignes de AFFECTED_RANGE_INSERT_SQL pour les intervalles d'un package, sans doublons"""
+        package_name = normalize_package_name(ecosystem, package_name)
+        return list(dict.fromkeys(
+            (
+                vuln_id, ecosystem, package_name,
+                interval.get('introduced'), version_key(interval.get('introduced'), ecosystem) or '',
+                interval.get('fixed'), version_key(interval.get('fixed'), ecosystem),
+                interval.get('last_affected'), version_key(interval.get('last_affected'), ecosystem)
+            )
+            for interval in intervals
+        ))
+    
+    @classmethod
+    def _insert_affected_ranges(cls, conn, vuln_id, ecosystem, package_name, intervals):
+        """Insérer les intervalles d'un package pour un avis, clés de tri comprises"""
+        rows = cls._affected_range_rows(vuln_id, ecosystem, package_name, intervals)
+        conn.executemany(cls.AFFECTED_RANGE_INSERT_SQL, rows)
+        return len(rows)
+    
+    def bulk_replace_affected_ranges(self, packages, batch_size=None):
+        """
+        Remplacer les plages de versions des avis de packages par lots
+        
+        Chaque avis est retrouvé par sa clé naturelle (source, advisory_id,
+        package_name, ecosystem), ses anciennes plages sont supprimées puis
+        remplacées par celles de 'affected_ranges'. Les avis dont les plages
+        enregistrées sont déjà identiques (cas courant d'une collecte
+        incrémentale) ne sont pas réécrits.
+        
+        Args:
+            packages: Itérable de dictionnaires package (comme bulk_upsert_packages)
+                      portant 'affected_ranges' : [{'package', 'ecosystem',
+                      'introduced', 'fixed', 'last_affected'}]
+            batch_size: Avis par transaction (Config.DB_BULK_BATCH_SIZE)
+        
+        Returns:
+            int: Nombre de plages réécrites
+        """
+        batch_size = batch_size or Config.DB_BULK_BATCH_SIZE
+        packages = iter(packages)
+        written = 0
+        
+        while True:
+            batch = list(islice(packages, batch_size))
+            if not batch:
+                break
+            
+            with self.connection() as conn:
+                for package_data in batch:
+                    row = conn.execute(f'''
+                    SELECT id FROM package_vulnerabilities
+                    WHERE {self.PACKAGE_NATURAL_KEY_WHERE}
+                    ''', (
+                        package_data.get('source'), self._package_advisory_id(package_data),
+                        package_data.get('package_name'), package_data.get('ecosystem')
+                    )).fetchone()
+                    if row is None:
+                        continue
+                    
+                    # Un avis OSV peut lister plusieurs fois le même package
+                    # dans 'affected' : un intervalle n'est écrit qu'une fois
+                    ranges = list(dict.fromkeys(
+                        range_row
+                        for entry in package_data.get('affected_ranges') or []
+                        for range_row in self._affected_range_rows(
+                            row[0], entry.get('ecosystem') or package_data.get('ecosystem'),
+                            entry.get('package') or package_data.get('package_name'), [entry]
+                        )
+                    ))
+                    current = conn.execute('''
+                    SELECT vulnerability_id, ecosystem, package_name, introduced, introduced_key,
+                           fixed, fixed_key, last_affected, last_affected_key
+                    FROM affected_ranges WHERE vulnerability_id = ?
+                    ''', (row[0],)).fetchall()
+                    if Counter(current) == Counter(ranges):
+                        continue
+                    
+                    conn.execute("DELETE FROM affected_ranges WHERE vulnerability_id = ?", (row[0],))
+                    conn.executemany(self.AFFECTED_RANGE_INSERT_SQL, ranges)
+                    written += len(ranges)
+        
+        return written
+    
+    def is_affected(self, ecosystem, package, version):
+        """
+        Avis qui affectent une version précise d'un package
+        
+        Args:
+            ecosystem: Écosystème normalisé ('npm', 'pip', 'maven', ...)
+            package: Nom du package
+            version: Version installée
+        
+        Returns:
+            List[Dict]: Avis correspondants (vide si la version n'est pas affectée)
+        """
+        key = version_key(version, ecosystem)
+        if key is None:
+            return []
+        
+        query = f'''
+        SELECT DISTINCT {self.AFFECTED_COLUMNS}
+        FROM affected_ranges r
+        JOIN package_vulnerabilities p ON p.id = r.vulnerability_id
+        WHERE r.ecosystem = ? AND r.package_name = ?
+        AND {self.AFFECTED_MATCH_SQL.format(key='?')}
+        ORDER BY p.cvss_score DESC
+        '''
+        params = (ecosystem, normalize_package_name(ecosystem, package), key, key, key)
+        with self.connection() as conn:
+            cursor = conn.execute(query, params)
+            names = [col[0] for col in cursor.description]
+            return [dict(zip(names, row)) for row in cursor]
+    
+    def check_versions(self, ecosystem, packages):
+        """
+        Vérifier toutes les versions d'un lockfile en une requête
+        
+        Les paires (nom, version) sont placées dans une table temporaire
+        puis jointes à affected_ranges : une recherche d'index par package,
+        sans aller-retour Python.
+        
+        Args:
+            ecosystem: Écosystème normalisé
+            packages: Itérable de paires (nom, version)
+        
+        Returns:
+            List[Dict]: Un dictionnaire par (package, version, avis) affecté
+        """
+        rows = [
+            (name, normalize_package_name(ecosystem, name), version, version_key(version, ecosystem))
+            for name, version in packages
+        ]
+        
+        with self.connection() as conn:
+            conn.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS version_check (
+                package TEXT, package_key TEXT, version TEXT, version_key TEXT
+            )''')
+            conn.execute("DELETE FROM temp.version_check")
+            conn.executemany("INSERT INTO temp.version_check VALUES (?, ?, ?, ?)",
+                             [row for row in rows if row[3] is not None])
+            
+            cursor = conn.execute(f'''
+            SELECT DISTINCT c.package, c.version, {self.AFFECTED_COLUMNS}
+            FROM temp.version_check c
+            JOIN affected_ranges r ON r.ecosystem = ? AND r.package_name = c.package_key
+            JOIN package_vulnerabilities p ON p.id = r.vulnerability_id
+            WHERE {self.AFFECTED_MATCH_SQL.format(key='c.version_key')}
+            ORDER BY c.package, c.version, p.cvss_score DESC
+            ''', (ecosystem,))
+            names = [col[0] for col in cursor.description]
+            results = [dict(zip(names, row)) for row in cursor]
+            conn.execute("DELETE FROM temp.version_check")
+        
+        return results
+    
+    # ========== ÉTAT DES COLLECTEURS ==========
+    
+    def get_collector_state(self, source):
+        """
+        Filigranes enregistrés d'un collecteur
+        
+        Args:
+            source: Nom du collecteur
+        
+        Returns:
+            Dict: {clé: {'watermark', 'etag', 'seen_ids'}}
+        """
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT state_key, watermark, etag, seen_ids FROM collector_state WHERE source = ?",
+                (source,)
+            ).fetchall()
+        
+        return {
+            key: {'watermark': watermark, 'etag': etag, 'seen_ids': json.loads(seen_ids or '[]')}
+            for key, watermark, etag, seen_ids in rows
+        }
+    
+    def save_collector_state(self, source, states):
+        """
+        Enregistrer les filigranes d'un collecteur (une transaction)
+        
+        Args:
+            source: Nom du collecteur
+            states: {clé: {'watermark', 'etag', 'seen_ids'}}
+        
+        Returns:
+            int: Nombre de clés enregistrées
+        """
+        with self.connection() as conn:
+            conn.executemany('''
+            INSERT INTO collector_state (source, state_key, watermark, etag, seen_ids, updated_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(source, state_key) DO UPDATE SET
+                watermark = excluded.watermark,
+                etag = excluded.etag,
+                seen_ids = excluded.seen_ids,
+                updated_at = excluded.updated_at
+            ''', [
+                (source, key, state.get('watermark'), state.get('etag'),
+                 json.dumps(sorted(state.get('seen_ids') or ())))
+                for key, state in states.items()
+            ])
+        return len(states)
+    
+    def reset_collector_state(self, source=None):
+        """
+        Oublier les filigranes (prochaine collecte complète)
+        
+        Args:
+            source: Nom du collecteur (tous par défaut)
         
-        cursor.execute("SELECT COUNT(*) FROM package_vulnerabilities")
-        package_count = cursor.fetchone()[0]
+        Returns:
+            int: Nombre de clés supprimées
+        """
+        with self.connection() as conn:
+            if source is None:
+                return conn.execute("DELETE FROM collector_state").rowcount
+            return conn.execute("DELETE FROM collector_state WHERE source = ?", (source,)).rowcount
+    
+    # ========== FONCTIONS STATISTIQUES ==========
+    
+    def _get_rollup(self, dimension, limit=None):
+        """Lire les compteurs non nuls d'une dimension de stats_rollup"""
+        query = "SELECT key, count FROM stats_rollup WHERE dimension = ? AND count > 0 ORDER BY count DESC"
+        params = [dimension]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
         
-        conn.close()
+        with self.connection() as conn:
+            return conn.execute(query, params).fetchall()
+    
+    def get_total_count(self):
+        """Compter total de vulnérabilités (lu dans stats_rollup)"""
+        counts = dict(self._get_rollup('table'))
+        cve_count = counts.get('cve', 0)
+        package_count = counts.get('package', 0)
         
         return {
             'cve_count': cve_count,
@@ -447,23 +2237,8 @@ class VulnerabilityDB:
         }
     
     def get_severity_stats(self):
-        """Statistiques par sévérité"""
-        conn = sqlite3.connect(self.db_name)
-        
-        query = '''
-        SELECT severity, COUNT(*) as count
-        FROM (
-            SELECT severity FROM cve_vulnerabilities
-            UNION ALL
-            SELECT severity FROM package_vulnerabilities
-        )
-        GROUP BY severity
-        '''
-        
-        cursor = conn.cursor()
-        cursor.execute(query)
-        results = cursor.fetchall()
-        conn.close()
+        """Statistiques par sévérité (lues dans stats_rollup)"""
+        results = self._get_rollup('severity')
         
         stats = {}
         total = sum(r[1] for r in results)
@@ -478,70 +2253,48 @@ class VulnerabilityDB:
         
         return stats
     
+    def get_ecosystem_stats(self):
+        """Nombre de vulnérabilités de packages par écosystème"""
+        return {key: count for key, count in self._get_rollup('ecosystem') if key}
+    
+    def get_daily_counts(self):
+        """Nombre de vulnérabilités publiées par jour (YYYY-MM-DD)"""
+        return {key: count for key, count in self._get_rollup('day') if key}
+    
     def get_top_components(self, limit=5):
-        """Top composants affectés"""
-        conn = sqlite3.connect(self.db_name)
-        
-        query = '''
-        SELECT package_name as component, COUNT(*) as count
-        FROM package_vulnerabilities
-        WHERE package_name IS NOT NULL
-        GROUP BY package_name
-        ORDER BY count DESC
-        LIMIT ?
-        '''
-        
-        cursor = conn.cursor()
-        cursor.execute(query, (limit,))
-        results = cursor.fetchall()
-        conn.close()
-        
+        """Top composants affectés (lus dans stats_rollup)"""
+        results = self._get_rollup('package', limit=limit)
         return [{'component': r[0], 'count': r[1]} for r in results]
     
     def get_trends(self, days=30):
         """Tendances des derniers X jours"""
-        conn = sqlite3.connect(self.db_name)
-        
         query = '''
         SELECT package_name, COUNT(*) as count
         FROM package_vulnerabilities
-        WHERE julianday('now') - julianday(discovered_date) <= ?
+        WHERE discovered_ts >= ?
         AND package_name IS NOT NULL
         GROUP BY package_name
         ORDER BY count DESC
         '''
         
-        cursor = conn.cursor()
-        cursor.execute(query, (days,))
-        results = cursor.fetchall()
-        conn.close()
+        with self.connection() as conn:
+            results = conn.execute(query, (self.since_timestamp(days),)).fetchall()
         
         return dict(results)
     
     def get_critical_vulnerabilities(self, limit=10):
         """Vulnérabilités critiques (CVSS >= 9.0)"""
-        conn = sqlite3.connect(self.db_name)
-        
         query = '''
-        SELECT * FROM (
-            SELECT cve_id, title, cvss_score, published_date, url
-            FROM cve_vulnerabilities
-            WHERE cvss_score >= 9.0
-            
-            UNION ALL
-            
-            SELECT 'PKG-' || package_name as cve_id, title, cvss_score, published_date, url
-            FROM package_vulnerabilities
-            WHERE cvss_score >= 9.0
-        )
+        SELECT COALESCE(cve_id, 'PKG-' || package_name) as cve_id, title, cvss_score,
+               NULLIF(published_date, '') as published_date, url
+        FROM vulnerability_index
+        WHERE cvss_score >= 9.0
         ORDER BY cvss_score DESC, published_date DESC
         LIMIT ?
         '''
         
-        cursor = conn.cursor()
-        cursor.execute(query, (limit,))
-        results = cursor.fetchall()
-        conn.close()
+        with self.connection() as conn:
+            results = conn.execute(query, (limit,)).fetchall()
         
         return [
             {
@@ -554,35 +2307,525 @@ class VulnerabilityDB:
             for r in results
         ]
     
+    # ========== SAUVEGARDE ==========
+    
+    def backup(self, dest_path, pages=None, sleep=None, progress=None):
+        """
+        Copier la base en ligne avec l'API de sauvegarde SQLite
+        
+        La copie avance par étapes de `pages` pages avec une pause entre
+        deux étapes : les verrous sont relâchés entre les étapes et les
+        collecteurs continuent d'écrire pendant la sauvegarde. Le fichier
+        est écrit à côté de la destination puis renommé, une sauvegarde
+        interrompue ne remplace jamais la précédente.
+        
+        Args:
+            dest_path: Fichier de destination
+            pages: Pages copiées par étape (Config.DB_BACKUP_PAGES, -1 = tout d'un coup)
+            sleep: Pause en secondes entre deux étapes (Config.DB_BACKUP_SLEEP)
+            progress: Callable(status, remaining, total) appelé après chaque étape
+        
+        Returns:
+            dict: {'path', 'bytes', 'seconds'}
+        """
+        pages = Config.DB_BACKUP_PAGES if pages is None else pages
+        sleep = Config.DB_BACKUP_SLEEP if sleep is None else sleep
+        
+        def copy(tmp_path):
+            target = sqlite3.connect(tmp_path)
+            try:
+                with self.connection() as conn:
+                    conn.backup(target, pages=pages, progress=progress, sleep=sleep)
+            finally:
+                target.close()
+        
+        return self._write_copy(dest_path, copy)
+    
+    def vacuum_into(self, dest_path):
+        """
+        Écrire une copie compactée de la base (VACUUM INTO)
+        
+        Les pages libres sont supprimées et les index reconstruits dans la
+        copie ; la base source n'est pas modifiée. La lecture se fait dans
+        une seule transaction, les écritures WAL ne sont pas bloquées.
+        
+        Returns:
+            dict: {'path', 'bytes', 'seconds'}
+        """
+        def copy(tmp_path):
+            with self.connection() as conn:
+                conn.execute("VACUUM INTO ?", (tmp_path,))
+        
+        return self._write_copy(dest_path, copy)
+    
+    def snapshot(self, dest_path=None, compact=False):
+        """
+        Publier un snapshot en lecture seule pour les rapports
+        
+        Args:
+            dest_path: Fichier du snapshot (Config.DB_SNAPSHOT_PATH par défaut)
+            compact: True pour passer par VACUUM INTO (fichier plus petit)
+        
+        Returns:
+            dict: {'path', 'bytes', 'seconds'}
+        """
+        dest_path = dest_path or Config.DB_SNAPSHOT_PATH
+        if compact:
+            return self.vacuum_into(dest_path)
+        return self.backup(dest_path)
+    
+    @classmethod
+    def open_snapshot(cls, path=None):
+        """Ouvrir un snapshot en lecture seule (mmap, aucune écriture possible)"""
+        return cls(path or Config.DB_SNAPSHOT_PATH, read_only=True)
+    
+    @staticmethod
+    def _write_copy(dest_path, copy):
+        """
+        Produire une copie dans un fichier temporaire puis la renommer
+        
+        La copie repasse en journal DELETE : le fichier se suffit à lui-même
+        (pas de -wal / -shm) et s'ouvre en lecture seule sans droit d'écriture
+        sur le dossier.
+        """
+        dest_path = os.path.abspath(dest_path)
+        tmp_path = f"{dest_path}.tmp"
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        
+        start = time.perf_counter()
+        try:
+            copy(tmp_path)
+            conn = sqlite3.connect(tmp_path)
+            try:
+                conn.execute("PRAGMA journal_mode = DELETE")
+            finally:
+                conn.close()
+            os.replace(tmp_path, dest_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        result = {
+            'path': dest_path,
+            'bytes': os.path.getsize(dest_path),
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+        print(f"✅ Copie de la base créée : {dest_path} "
+              f"({result['bytes'] / 1024 / 1024:.1f} Mo en {result['seconds']} s)")
+        return result
+    
+    # ========== RÉTENTION ET ARCHIVE ==========
+    
+    # Tables recopiées dans la base d'archive (même schéma, mêmes id)
+    ARCHIVE_TABLES = (
+        'vulnerability_index', 'cve_vulnerabilities', 'package_vulnerabilities',
+        'supply_chain', 'affected_ranges', 'articles', 'trends'
+    )
+    
+    ARCHIVE_INDEXES = (
+        'CREATE INDEX IF NOT EXISTS archive.idx_vi_published ON vulnerability_index(published_date, id)',
+        'CREATE INDEX IF NOT EXISTS archive.idx_vi_published_ts ON vulnerability_index(published_ts)',
+        'CREATE INDEX IF NOT EXISTS archive.idx_vi_severity_published ON vulnerability_index(severity, published_date, id)',
+        'CREATE INDEX IF NOT EXISTS archive.idx_vi_ecosystem_published ON vulnerability_index(ecosystem, published_date, id)',
+        'CREATE INDEX IF NOT EXISTS archive.idx_sc_vulnerability ON supply_chain(vulnerability_id)',
+    )
+    
+    # Déplacement d'un lot de vulnérabilités (id signés de temp.retention_batch)
+    VULNERABILITY_ARCHIVE_MOVES = (
+        ('vulnerability_index', 'id IN (SELECT id FROM temp.retention_batch)'),
+        ('supply_chain', 'vulnerability_id IN (SELECT id FROM temp.retention_batch WHERE id > 0)'),
+        ('cve_vulnerabilities', 'id IN (SELECT -id FROM temp.retention_batch WHERE id < 0)'),
+        ('affected_ranges', 'vulnerability_id IN (SELECT id FROM temp.retention_batch WHERE id > 0)'),
+        ('package_vulnerabilities', 'id IN (SELECT id FROM temp.retention_batch WHERE id > 0)'),
+    )
+    
+    # Clés des CVE et des packages d'une base ({source} : main ou archive),
+    # avec le contenu archivé en dernier
+    ARCHIVED_CVES_SQL = '''
+    INSERT INTO main.archived_cves (cve_id, modified_date)
+    SELECT cve_id, modified_date FROM {source}.cve_vulnerabilities
+    WHERE 1 {where}
+    ON CONFLICT(cve_id) DO UPDATE SET modified_date = excluded.modified_date
+    '''
+    ARCHIVED_PACKAGES_SQL = '''
+    INSERT INTO main.archived_packages (source, advisory_id, package_name, ecosystem, content_hash)
+    SELECT IFNULL(source, ''), advisory_id, package_name, IFNULL(ecosystem, ''), content_hash
+    FROM {source}.package_vulnerabilities
+    WHERE 1 {where}
+    ON CONFLICT(source, advisory_id, package_name, ecosystem) DO UPDATE SET
+        content_hash = excluded.content_hash
+    '''
+    
+    # Clés inscrites avant le déplacement d'un lot de vulnérabilités
+    VULNERABILITY_TOMBSTONES = (
+        ARCHIVED_CVES_SQL.format(
+            source='main', where='AND id IN (SELECT -id FROM temp.retention_batch WHERE id < 0)'
+        ),
+        ARCHIVED_PACKAGES_SQL.format(
+            source='main', where='AND id IN (SELECT id FROM temp.retention_batch WHERE id > 0)'
+        ),
+    )
+    
+    def _ensure_archive_schema(self, conn):
+        """
+        Créer les tables de la base d'archive sur le modèle des tables chaudes
+        
+        Une table déjà archivée reçoit les colonnes ajoutées depuis par les
+        migrations de la base principale.
+        """
+        for table in self.ARCHIVE_TABLES:
+            row = conn.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()
+            if row is None:
+                continue
+            
+            archived = {col[1] for col in conn.execute(f"PRAGMA archive.table_info({table})")}
+            if not archived:
+                conn.execute(re.sub(
+                    r'^\s*CREATE TABLE\s+(IF NOT EXISTS\s+)?', 'CREATE TABLE IF NOT EXISTS archive.', row[0], count=1
+                ))
+                continue
+            
+            for _, name, col_type, notnull, default, _ in conn.execute(f"PRAGMA main.table_info({table})").fetchall():
+                if name in archived:
+                    continue
+                definition = f"{name} {col_type}"
+                if default is not None:
+                    definition += f" {'NOT NULL ' if notnull else ''}DEFAULT {default}"
+                conn.execute(f"ALTER TABLE archive.{table} ADD COLUMN {definition}")
+        
+        for sql in self.ARCHIVE_INDEXES:
+            conn.execute(sql)
+    
+    def _attach_archive(self, conn, create=False):
+        """
+        Attacher la base d'archive à une connexion du pool, si ce n'est déjà fait
+        
+        À appeler avant toute écriture dans le bloc `with` (ATTACH est
+        interdit dans une transaction). La connexion reste attachée tant
+        qu'elle vit dans le pool.
+        
+        Args:
+            create: True pour créer le fichier d'archive s'il n'existe pas
+        
+        Returns:
+            bool: True si `archive` est attachée
+        """
+        if self.archive_path is None:
+            return False
+        if any(row[1] == 'archive' for row in conn.execute("PRAGMA database_list")):
+            return True
+        if not create and not os.path.exists(self.archive_path):
+            return False
+        conn.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+        return True
+    
+    def _has_archive(self, conn):
+        """Vérifier que la base d'archive existe et contient déjà des tables"""
+        return self._attach_archive(conn) and conn.execute(
+            "SELECT 1 FROM archive.sqlite_master WHERE type = 'table' AND name = 'vulnerability_index'"
+        ).fetchone() is not None
+    
+    @staticmethod
+    def _move_to_archive(conn, table, condition, params=()):
+        """
+        Copier dans l'archive puis supprimer les lignes de `table` qui vérifient `condition`
+        
+        Les triggers de suppression retirent les lignes de vulnerabilities_fts,
+        vulnerability_index et stats_rollup. INSERT OR REPLACE rend la copie
+        rejouable après une interruption.
+        
+        Returns:
+            int: Nombre de lignes déplacées
+        """
+        columns = ', '.join(col[1] for col in conn.execute(f"PRAGMA main.table_info({table})"))
+        conn.execute(f'''
+        INSERT OR REPLACE INTO archive.{table} ({columns})
+        SELECT {columns} FROM main.{table} WHERE {condition}
+        ''', params)
+        return conn.execute(f"DELETE FROM main.{table} WHERE {condition}", params).rowcount
+    
+    def _archive_in_batches(self, select_ids, params, moves, batch_size, tombstones=()):
+        """
+        Déplacer par lots validés un par un les lignes désignées par `select_ids`
+        
+        Chaque lot d'id est placé dans temp.retention_batch puis les requêtes
+        `tombstones` et les déplacements `moves` ((table, condition), ...)
+        sont appliqués dans la même transaction : les collecteurs ne sont
+        bloqués que le temps d'un lot.
+        
+        Returns:
+            int: Nombre d'id traités
+        """
+        moved = 0
+        while True:
+            with self.connection() as conn:
+                self._attach_archive(conn, create=True)
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS retention_batch (id INTEGER PRIMARY KEY)")
+                conn.execute("DELETE FROM temp.retention_batch")
+                count = conn.execute(
+                    f"INSERT INTO temp.retention_batch (id) {select_ids} LIMIT {int(batch_size)}", params
+                ).rowcount
+                for sql in tombstones if count else ():
+                    conn.execute(sql)
+                for table, condition in moves if count else ():
+                    self._move_to_archive(conn, table, condition)
+            
+            moved += count
+            if count < batch_size:
+                return moved
+    
+    @staticmethod
+    def _retention_rules(policy, default_days):
+        """
+        Règles actives de la politique : [(condition sur source, paramètres, jours)]
+        
+        Une source listée avec 0 jour est conservée, même si une durée par
+        défaut est définie pour les autres sources.
+        """
+        rules = [("source = ?", [source], days) for source, days in policy.items() if days and days > 0]
+        if default_days and default_days > 0:
+            placeholders = ', '.join('?' * len(policy))
+            rules.append((f"(source IS NULL OR source NOT IN ({placeholders}))", list(policy), default_days))
+        return rules
+    
+    def apply_retention(self, policy=None, default_days=None, trends_days=None, batch_size=None):
+        """
+        Déplacer les lignes froides vers la base d'archive attachée
+        
+        Les vulnérabilités (avec leurs liens supply_chain) et les articles
+        plus anciens que la durée de leur source quittent les tables chaudes :
+        index, FTS et statistiques ne portent plus que sur les lignes récentes.
+        Les clés des vulnérabilités archivées (archived_cves, archived_packages)
+        empêchent les collecteurs de les réinsérer.
+        search_vulnerabilities(include_archive=True) relit aussi l'archive.
+        
+        Args:
+            policy: {source: jours} (Config.RETENTION_DAYS par défaut)
+            default_days: Durée des autres sources (Config.RETENTION_DEFAULT_DAYS, 0 = conservées)
+            trends_days: Durée des tendances (Config.RETENTION_TRENDS_DAYS, 0 = conservées)
+            batch_size: Lignes par transaction (Config.DB_BULK_BATCH_SIZE)
+        
+        Returns:
+            Dict: {'vulnerabilities': n, 'articles': n, 'trends': n}
+        """
+        if self.archive_path is None:
+            raise RuntimeError("Aucune base d'archive attachée (instance en lecture seule)")
+        
+        policy = Config.RETENTION_DAYS if policy is None else policy
+        default_days = Config.RETENTION_DEFAULT_DAYS if default_days is None else default_days
+        trends_days = Config.RETENTION_TRENDS_DAYS if trends_days is None else trends_days
+        batch_size = batch_size or Config.DB_BULK_BATCH_SIZE
+        
+        with self.connection() as conn:
+            self._attach_archive(conn, create=True)
+            self._ensure_archive_schema(conn)
+        
+        stats = {'vulnerabilities': 0, 'articles': 0, 'trends': 0}
+        for condition, params, days in self._retention_rules(policy, default_days):
+            cutoff = self.since_timestamp(days)
+            stats['vulnerabilities'] += self._archive_in_batches(
+                f"SELECT id FROM main.vulnerability_index WHERE {condition} AND published_ts < ?",
+                params + [cutoff], self.VULNERABILITY_ARCHIVE_MOVES, batch_size,
+                tombstones=self.VULNERABILITY_TOMBSTONES
+            )
+            stats['articles'] += self._archive_in_batches(
+                f"SELECT id FROM main.articles WHERE {condition} "
+                f"AND COALESCE(published_date, collected_date) < ?",
+                params + [time.strftime('%Y-%m-%d', time.gmtime(cutoff))],
+                [('articles', 'id IN (SELECT id FROM temp.retention_batch)')], batch_size
+            )
+        
+        if trends_days and trends_days > 0:
+            stats['trends'] = self._archive_in_batches(
+                "SELECT id FROM main.trends WHERE last_updated < ?",
+                [time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(self.since_timestamp(trends_days)))],
+                [('trends', 'id IN (SELECT id FROM temp.retention_batch)')], batch_size
+            )
+        
+        with self._count_cache_lock:
+            self._count_cache.clear()
+        
+        print(f"✅ Rétention appliquée : {stats['vulnerabilities']} vulnérabilités, "
+              f"{stats['articles']} articles, {stats['trends']} tendances archivés")
+        return stats
+    
+    @staticmethod
+    def _archive_sql(sql):
+        """Réécrire une clause FROM/JOIN pour lire les tables de l'archive"""
+        return re.sub(r'\b(vulnerability_index|cve_vulnerabilities|package_vulnerabilities)\b', r'archive.\1', sql)
+    
     # ========== FONCTIONS UTILITAIRES ==========
     
+    def _fill_package_advisory_ids(self, conn, low, high):
+        """
+        Donner l'URL comme advisory_id aux lignes qui n'en ont pas
+        
+        Sans URL, l'identifiant est propre à la ligne ('legacy-<id>') : les
+        anciens titres par défaut ('Vulnerability in <composant>') sont
+        partagés par des avis distincts, qui ne doivent pas être fusionnés.
+        
+        Args:
+            low, high: Bornes exclusive / inclusive des id traités
+        
+        Returns:
+            int: Nombre de lignes modifiées
+        """
+        return conn.execute('''
+        UPDATE package_vulnerabilities
+        SET advisory_id = COALESCE(NULLIF(url, ''), 'legacy-' || id)
+        WHERE id > ? AND id <= ?
+        AND (advisory_id IS NULL OR advisory_id = '')
+        ''', (low, high)).rowcount
+    
+    def _merge_package_duplicates(self, conn, low, high):
+        """
+        Supprimer les doublons (clé naturelle) d'une plage d'id
+        
+        La ligne la plus récente (id maximal) de chaque clé est conservée,
+        même hors de la plage, et les références supply_chain sont reportées
+        sur elle. Un index sur la clé naturelle évite un parcours de la table
+        par ligne.
+        
+        Args:
+            low, high: Bornes exclusive / inclusive des id traités
+        
+        Returns:
+            int: Nombre de lignes supprimées
+        """
+        conn.execute("DROP TABLE IF EXISTS temp.pkg_duplicates")
+        conn.execute('''
+        CREATE TEMP TABLE pkg_duplicates AS
+        SELECT old_id, keep_id FROM (
+            SELECT p.id AS old_id, (
+                SELECT MAX(k.id) FROM package_vulnerabilities k
+                WHERE IFNULL(k.source, '') = IFNULL(p.source, '')
+                AND k.advisory_id = p.advisory_id
+                AND k.package_name = p.package_name
+                AND IFNULL(k.ecosystem, '') = IFNULL(p.ecosystem, '')
+            ) AS keep_id
+            FROM package_vulnerabilities p
+            WHERE p.id > ? AND p.id <= ?
+        )
+        WHERE keep_id <> old_id
+        ''', (low, high))
+        
+        conn.execute('''
+        UPDATE supply_chain
+        SET vulnerability_id = (
+            SELECT keep_id FROM pkg_duplicates WHERE old_id = supply_chain.vulnerability_id
+        )
+        WHERE vulnerability_id IN (SELECT old_id FROM pkg_duplicates)
+        ''')
+        
+        removed = conn.execute(
+            "DELETE FROM package_vulnerabilities WHERE id IN (SELECT old_id FROM pkg_duplicates)"
+        ).rowcount
+        conn.execute("DROP TABLE temp.pkg_duplicates")
+        return removed
+    
+    def _compact_package_vulnerabilities(self, conn):
+        """
+        Fusionner les doublons de package_vulnerabilities sur la clé naturelle
+        
+        Les lignes sans advisory_id reçoivent l'URL (ou 'legacy-<id>') comme
+        identifiant, la ligne la plus récente de chaque groupe est conservée
+        et les références supply_chain sont reportées sur elle.
+        
+        Returns:
+            int: Nombre de lignes supprimées
+        """
+        high = conn.execute("SELECT COALESCE(MAX(id), 0) FROM package_vulnerabilities").fetchone()[0]
+        self._fill_package_advisory_ids(conn, 0, high)
+        return self._merge_package_duplicates(conn, 0, high)
+    
+    def compact_package_vulnerabilities(self):
+        """
+        Commande ponctuelle : fusionner les doublons existants de packages
+        
+        Returns:
+            int: Nombre de lignes supprimées
+        """
+        with self.connection() as conn:
+            removed = self._compact_package_vulnerabilities(conn)
+        
+        print(f"✅ Compactage terminé : {removed} doublons supprimés")
+        return removed
+    
     def clear_all_data(self):
         """ATTENTION : Supprimer TOUTES les données"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM cve_vulnerabilities")
-        cursor.execute("DELETE FROM package_vulnerabilities")
-        cursor.execute("DELETE FROM supply_chain")
-        cursor.execute("DELETE FROM articles")
-        cursor.execute("DELETE FROM trends")
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("DELETE FROM cve_vulnerabilities")
+            cursor.execute("DELETE FROM package_vulnerabilities")
+            cursor.execute("DELETE FROM supply_chain")
+            cursor.execute("DELETE FROM dependency_edges")
+            cursor.execute("DELETE FROM packages")
+            cursor.execute("DELETE FROM articles")
+            cursor.execute("DELETE FROM trends")
+            cursor.execute("DELETE FROM collector_state")
+            cursor.execute("DELETE FROM archived_cves")
+            cursor.execute("DELETE FROM archived_packages")
         
-        conn.commit()
-        conn.close()
         print(" Toutes les données supprimées")
     
     def close(self):
-        """Fermer la connexion"""
-        pass  # SQLite n'a pas besoin de fermeture permanente
+        """Fermer les connexions du pool"""
+        if self.checkpointer:
+            self.checkpointer.stop()
+        self.pool.close_all()
+
+
+# ========== INSTANCE PARTAGÉE ==========
+
+_shared_db = None
+_shared_db_lock = threading.Lock()
+
+
+def get_db():
+    """
+    Instance VulnerabilityDB partagée par tout le processus
+    
+    Créée au premier appel sur Config.DB_PATH ; l'analyseur, les graphiques
+    et les collecteurs l'utilisent au lieu d'ouvrir leur propre instance.
+    """
+    global _shared_db
+    if _shared_db is None:
+        with _shared_db_lock:
+            if _shared_db is None:
+                _shared_db = VulnerabilityDB()
+    return _shared_db
+
+
+def set_db(instance):
+    """
+    Remplacer l'instance partagée (tests, base alternative)
+    
+    Returns:
+        L'instance précédente (None si aucune n'avait été créée)
+    """
+    global _shared_db
+    with _shared_db_lock:
+        previous, _shared_db = _shared_db, instance
+    return previous
 
 
-# Instance globale
-db = VulnerabilityDB()
+def __getattr__(name):
+    """Instance globale `database.db`, créée au premier accès (get_db)"""
+    if name == 'db':
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     """Tests de la base de données"""
     print("=== TEST DATABASE.PY ===\n")
+    db = get_db()
     
     # Test 1 : Création
     print(" Base de données créée")
@@ -1,6 +1,13 @@
 """
 Script de migration pour convertir les anciennes données Flask-SQLAlchemy vers SQLite pur
-Usage: python migrate_to_sqlite.py
+Usage: python migrate_to_sqlite.py [--chunk-size N]
+       python migrate_to_sqlite.py --compact         (fusionner les doublons de packages)
+       python migrate_to_sqlite.py --rebuild-stats   (reconstruire stats_rollup)
+       python migrate_to_sqlite.py --retention       (archiver les lignes froides)
+
+Les lignes sont traitées par lots validés un par un ; la position atteinte
+est enregistrée dans migration_progress. Relancer le script après une
+interruption reprend au dernier lot validé.
 """
 
 import os
@@ -8,6 +15,11 @@ import sys
 import sqlite3
 from datetime import datetime
 
+from migrations import ChunkedStep, MigrationRunner, ensure_progress_table, has_table
+
+# Clé des positions de cette migration dans migration_progress
+LEGACY_VERSION = 0
+
 
 def check_old_database():
     """Vérifier si l'ancienne base de données existe"""
@@ -20,14 +32,12 @@ def check_old_database():
     return True
 
 
-def backup_database():
-    """Créer une sauvegarde de l'ancienne base"""
-    old_db = 'data/vulnerabilities.db'
+def backup_database(db):
+    """Créer une sauvegarde cohérente de l'ancienne base (API de sauvegarde SQLite)"""
     backup_db = f'data/vulnerabilities_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db'
     
     try:
-        import shutil
-        shutil.copy2(old_db, backup_db)
+        db.backup(backup_db)
         print(f"Sauvegarde creee: {backup_db}")
         return True
     except Exception as e:
@@ -65,64 +75,88 @@ def analyze_old_structure():
     return tables
 
 
-def migrate_vulnerabilities_table():
+def open_database():
+    """Ouvrir la base sans appliquer les migrations de schéma de l'application"""
+    from database import VulnerabilityDB
+    db = VulnerabilityDB('data/vulnerabilities.db', init_schema=False)
+    db._configure_journal_mode()
+    return db
+
+
+def has_pending_progress(db):
+    """Vérifier si une migration précédente a été interrompue"""
+    with db.connection() as conn:
+        if not has_table(conn, 'migration_progress'):
+            return False
+        return conn.execute(
+            "SELECT 1 FROM migration_progress WHERE version = ?", (LEGACY_VERSION,)
+        ).fetchone() is not None
+
+
+def run_steps(db, steps, chunk_size=None):
+    """Exécuter des étapes découpées, position enregistrée à chaque lot"""
+    runner = MigrationRunner(db, chunk_size=chunk_size)
+    with db.connection() as conn:
+        ensure_progress_table(conn)
+    
+    total = 0
+    for step in steps:
+        start = datetime.now()
+        rows = step.run(runner, LEGACY_VERSION)
+        elapsed = max((datetime.now() - start).total_seconds(), 1e-6)
+        print(f"  {step.name}: {rows} lignes en {elapsed:.2f}s ({rows / elapsed:.0f} lignes/s)")
+        total += rows
+    return total
+
+
+def migrate_vulnerabilities_table(db, chunk_size=None):
     """Migrer la table des vulnérabilités"""
     print("\nMigration de la table 'vulnerabilities'...")
     
-    conn = sqlite3.connect('data/vulnerabilities.db')
-    cursor = conn.cursor()
-    
     try:
-        # Vérifier si la table existe
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='vulnerabilities'")
-        if not cursor.fetchone():
-            print("Table 'vulnerabilities' non trouvee, passage a l'etape suivante.")
-            return
-        
-        # Vérifier les colonnes existantes
-        cursor.execute("PRAGMA table_info(vulnerabilities)")
-        columns = {col[1]: col[2] for col in cursor.fetchall()}
-        
-        print(f"Colonnes trouvees: {list(columns.keys())}")
-        
-        # Ajouter les colonnes manquantes si nécessaire
-        if 'title' not in columns:
-            print("Ajout de la colonne 'title'...")
-            cursor.execute("ALTER TABLE vulnerabilities ADD COLUMN title TEXT")
-        
-        if 'description' not in columns:
-            print("Ajout de la colonne 'description'...")
-            cursor.execute("ALTER TABLE vulnerabilities ADD COLUMN description TEXT")
+        with db.connection() as conn:
+            # Vérifier si la table existe
+            if not has_table(conn, 'vulnerabilities'):
+                print("Table 'vulnerabilities' non trouvee, passage a l'etape suivante.")
+                return
+            
+            # Vérifier les colonnes existantes
+            columns = {col[1]: col[2] for col in conn.execute("PRAGMA table_info(vulnerabilities)")}
+            print(f"Colonnes trouvees: {list(columns.keys())}")
+            
+            # Ajouter les colonnes manquantes si nécessaire
+            if 'title' not in columns:
+                print("Ajout de la colonne 'title'...")
+                conn.execute("ALTER TABLE vulnerabilities ADD COLUMN title TEXT")
+            
+            if 'description' not in columns:
+                print("Ajout de la colonne 'description'...")
+                conn.execute("ALTER TABLE vulnerabilities ADD COLUMN description TEXT")
         
-        # Mettre à jour les enregistrements sans titre/description
+        # Mettre à jour les enregistrements sans titre/description, par lots
         print("Mise a jour des enregistrements...")
+        run_steps(db, [
+            ChunkedStep('legacy.title', 'vulnerabilities', """
+                UPDATE vulnerabilities 
+                SET title = 'Vulnerability in ' || affected_component
+                WHERE rowid > :low AND rowid <= :high
+                AND (title IS NULL OR title = '')
+            """),
+            ChunkedStep('legacy.description', 'vulnerabilities', """
+                UPDATE vulnerabilities 
+                SET description = 'Vulnerability of type ' || vulnerability_type || ' affecting ' || affected_component
+                WHERE rowid > :low AND rowid <= :high
+                AND (description IS NULL OR description = '')
+            """),
+        ], chunk_size=chunk_size)
         
-        cursor.execute("""
-            UPDATE vulnerabilities 
-            SET title = COALESCE(title, 'Vulnerability in ' || affected_component)
-            WHERE title IS NULL OR title = ''
-        """)
-        
-        cursor.execute("""
-            UPDATE vulnerabilities 
-            SET description = COALESCE(
-                description, 
-                'Vulnerability of type ' || vulnerability_type || ' affecting ' || affected_component
-            )
-            WHERE description IS NULL OR description = ''
-        """)
-        
-        conn.commit()
         print("Table 'vulnerabilities' migree avec succes!")
         
     except Exception as e:
         print(f"Erreur lors de la migration: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
 
 
-def split_vulnerabilities_to_new_structure():
+def split_vulnerabilities_to_new_structure(db, chunk_size=None):
     """
     Diviser la table 'vulnerabilities' en deux tables distinctes:
     - cve_vulnerabilities (CVE générales)
@@ -130,7 +164,7 @@ def split_vulnerabilities_to_new_structure():
     """
     print("\nDivision des vulnerabilites en CVE et Packages...")
     
-    conn = sqlite3.connect('data/vulnerabilities.db')
+    conn = sqlite3.connect(db.db_name)
     cursor = conn.cursor()
     
     try:
@@ -177,71 +211,72 @@ def split_vulnerabilities_to_new_structure():
             )
             ''')
         
-        # Migrer les données de l'ancienne table vers les nouvelles
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='vulnerabilities'")
-        if cursor.fetchone():
-            print("Migration des donnees existantes...")
-            
-            # Récupérer toutes les vulnérabilités
-            cursor.execute("SELECT * FROM vulnerabilities")
-            old_vulns = cursor.fetchall()
-            
-            # Récupérer les noms de colonnes
-            cursor.execute("PRAGMA table_info(vulnerabilities)")
-            columns = [col[1] for col in cursor.fetchall()]
-            
-            migrated_cve = 0
-            migrated_pkg = 0
-            
-            for row in old_vulns:
-                data = dict(zip(columns, row))
-                
-                # Décider si c'est une CVE ou un package
-                if data.get('cve_id') and data['cve_id'].startswith('CVE-'):
-                    # C'est une CVE
-                    cursor.execute('''
-                    INSERT OR IGNORE INTO cve_vulnerabilities 
-                    (cve_id, title, description, cvss_score, severity, published_date, url)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        data.get('cve_id'),
-                        data.get('title', 'No title'),
-                        data.get('description', 'No description available'),
-                        data.get('cvss_score'),
-                        data.get('severity'),
-                        data.get('published_date'),
-                        data.get('url')
-                    ))
-                    migrated_cve += 1
-                else:
-                    # C'est un package
-                    cursor.execute('''
-                    INSERT INTO package_vulnerabilities 
-                    (package_name, ecosystem, vulnerability_type, cvss_score, severity, 
-                     title, description, published_date, discovered_date, url)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        data.get('affected_component', 'Unknown'),
-                        data.get('ecosystem'),
-                        data.get('vulnerability_type'),
-                        data.get('cvss_score'),
-                        data.get('severity'),
-                        data.get('title', 'No title'),
-                        data.get('description', 'No description available'),
-                        data.get('published_date'),
-                        data.get('discovered_date'),
-                        data.get('url')
-                    ))
-                    migrated_pkg += 1
-            
-            conn.commit()
-            print(f"Migration terminee: {migrated_cve} CVE, {migrated_pkg} packages")
+        conn.commit()
         
     except Exception as e:
         print(f"Erreur lors de la division: {e}")
         conn.rollback()
+        return
     finally:
         conn.close()
+    
+    # Migrer les données de l'ancienne table vers les nouvelles, par lots
+    with db.connection() as conn:
+        if not has_table(conn, 'vulnerabilities'):
+            return
+        columns = {col[1] for col in conn.execute("PRAGMA table_info(vulnerabilities)")}
+        cve_columns = {col[1] for col in conn.execute("PRAGMA table_info(cve_vulnerabilities)")}
+        package_columns = {col[1] for col in conn.execute("PRAGMA table_info(package_vulnerabilities)")}
+    
+    def col(name, default='NULL'):
+        # Colonne absente de l'ancienne table : valeur par défaut
+        return f"COALESCE({name}, {default})" if name in columns else default
+    
+    def timestamp(date_column):
+        return f"CAST(strftime('%s', substr({col(date_column)}, 1, 10)) AS INTEGER)"
+    
+    def extra(target_columns, values):
+        # Colonnes ajoutées par les migrations de schéma : remplies seulement
+        # si la table cible existe déjà dans sa version récente
+        present = [(name, expr) for name, expr in values if name in target_columns]
+        return (''.join(f", {name}" for name, _ in present),
+                ''.join(f", {expr}" for _, expr in present))
+    
+    is_cve = "substr(cve_id, 1, 4) = 'CVE-'" if 'cve_id' in columns else "0"
+    cve_extra = extra(cve_columns, [('published_ts', timestamp('published_date'))])
+    # Sans URL, chaque ligne héritée reste un avis distinct : la clé naturelle
+    # ne doit pas fusionner des avis qui partagent le titre par défaut
+    package_extra = extra(package_columns, [
+        ('advisory_id', f"COALESCE(NULLIF({col('url')}, ''), 'legacy-' || rowid)"),
+        ('published_ts', timestamp('published_date')),
+        ('discovered_ts', timestamp('discovered_date')),
+    ])
+    
+    print("Migration des donnees existantes...")
+    try:
+        run_steps(db, [
+            ChunkedStep('legacy.split_cve', 'vulnerabilities', f"""
+                INSERT OR IGNORE INTO cve_vulnerabilities 
+                (cve_id, title, description, cvss_score, severity, published_date, url{cve_extra[0]})
+                SELECT cve_id, {col('title', "'No title'")}, {col('description', "'No description available'")},
+                       {col('cvss_score')}, {col('severity')}, {col('published_date')}, {col('url')}{cve_extra[1]}
+                FROM vulnerabilities
+                WHERE rowid > :low AND rowid <= :high AND {is_cve}
+            """),
+            ChunkedStep('legacy.split_packages', 'vulnerabilities', f"""
+                INSERT OR IGNORE INTO package_vulnerabilities 
+                (package_name, ecosystem, vulnerability_type, cvss_score, severity, 
+                 title, description, published_date, discovered_date, url{package_extra[0]})
+                SELECT {col('affected_component', "'Unknown'")}, {col('ecosystem')}, {col('vulnerability_type')},
+                       {col('cvss_score')}, {col('severity')}, {col('title', "'No title'")},
+                       {col('description', "'No description available'")}, {col('published_date')},
+                       {col('discovered_date')}, {col('url')}{package_extra[1]}
+                FROM vulnerabilities
+                WHERE rowid > :low AND rowid <= :high AND NOT ({is_cve})
+            """),
+        ], chunk_size=chunk_size)
+    except Exception as e:
+        print(f"Erreur lors de la division (relancer pour reprendre): {e}")
 
 
 def verify_migration():
@@ -277,7 +312,45 @@ def verify_migration():
     conn.close()
 
 
-def main():
+def compact_duplicates():
+    """Fusionner les doublons de package_vulnerabilities sur la clé naturelle"""
+    print("\nCompactage des vulnerabilites de packages...")
+    
+    from database import get_db
+    db = get_db()
+    
+    before = db.get_total_count()['package_count']
+    removed = db.compact_package_vulnerabilities()
+    print(f"Packages: {before} -> {before - removed}")
+    return removed
+
+
+def rebuild_statistics():
+    """Reconstruire les statistiques matérialisées (stats_rollup)"""
+    print("\nReconstruction des statistiques...")
+    
+    from database import get_db
+    db = get_db()
+    return db.rebuild_stats_rollup()
+
+
+def archive_cold_rows():
+    """Déplacer les lignes froides vers la base d'archive (Config.RETENTION_DAYS)"""
+    print("\nApplication de la politique de retention...")
+    
+    from database import get_db
+    db = get_db()
+    return db.apply_retention()
+
+
+def finish_migration(db):
+    """Effacer les positions de reprise une fois la migration terminée"""
+    with db.connection() as conn:
+        if has_table(conn, 'migration_progress'):
+            conn.execute("DELETE FROM migration_progress WHERE version = ?", (LEGACY_VERSION,))
+
+
+def main(chunk_size=None):
     """Fonction principale de migration"""
     print("=" * 60)
     print("SCRIPT DE MIGRATION SQLITE")
@@ -288,15 +361,21 @@ def main():
         print("La base de donnees sera creee lors du premier lancement de l'application.")
         return
     
-    print("\nCe script va migrer votre base de donnees vers la nouvelle structure.")
+    db = open_database()
+    resuming = has_pending_progress(db)
+    
+    if resuming:
+        print("\nUne migration interrompue a ete detectee : reprise au dernier lot valide.")
+    else:
+        print("\nCe script va migrer votre base de donnees vers la nouvelle structure.")
     response = input("Continuer ? (o/N): ")
     
     if response.lower() not in ['o', 'oui', 'yes', 'y']:
         print("Migration annulee.")
         return
     
-    # Étape 1: Sauvegarde
-    if not backup_database():
+    # Étape 1: Sauvegarde (déjà faite avant l'interruption en cas de reprise)
+    if not resuming and not backup_database(db):
         print("Erreur lors de la sauvegarde. Migration annulee.")
         return
     
@@ -304,13 +383,15 @@ def main():
     analyze_old_structure()
     
     # Étape 3: Migrer la table principale
-    migrate_vulnerabilities_table()
+    migrate_vulnerabilities_table(db, chunk_size=chunk_size)
     
     # Étape 4: Diviser en CVE et Packages
-    split_vulnerabilities_to_new_structure()
+    split_vulnerabilities_to_new_structure(db, chunk_size=chunk_size)
     
     # Étape 5: Vérifier
     verify_migration()
+    finish_migration(db)
+    db.close()
     
     print("\n" + "=" * 60)
     print("MIGRATION TERMINEE!")
@@ -319,4 +400,14 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    if '--compact' in sys.argv:
+        compact_duplicates()
+    elif '--rebuild-stats' in sys.argv:
+        rebuild_statistics()
+    elif '--retention' in sys.argv:
+        archive_cold_rows()
+    else:
+        chunk_size = None
+        if '--chunk-size' in sys.argv:
+            chunk_size = int(sys.argv[sys.argv.index('--chunk-size') + 1])
+        main(chunk_size=chunk_size)
\ No newline at end of file
@@ -0,0 +1,576 @@
+"""
+Migrations de schéma versionnées (PRAGMA user_version)
+
+Chaque migration porte un numéro de version et une liste d'étapes
+exécutées dans l'ordre. Les étapes volumineuses sont découpées par plages
+de rowid : chaque lot est validé dans sa propre transaction, le verrou
+d'écriture est donc relâché entre deux lots, et la position atteinte est
+enregistrée dans migration_progress avec le lot lui-même. Une migration
+interrompue reprend au dernier lot validé.
+
+Usage : python migrations.py [--dry-run] [--chunk-size N]
+"""
+
+import sqlite3
+import time
+
+from config import Config
+
+
+# ========== ÉTAPES ==========
+
+class Step:
+    """
+    Étape de migration exécutée en une transaction (DDL, traitement ensembliste)
+
+    Args:
+        name: Nom de l'étape (unique dans la migration)
+        action: Fonction action(db, conn)
+        estimate: Fonction estimate(db, conn) -> lignes touchées (0 par défaut)
+        caps: [(étape découpée, table)] : MAX(rowid) de la table est enregistré
+              comme plafond de l'étape dans la transaction de l'action (qui ne
+              doit donc pas passer par executescript) ; les lignes au-delà
+              sont comptées par les triggers que l'action crée
+    """
+
+    def __init__(self, name, action, estimate=None, caps=()):
+        self.name = name
+        self.action = action
+        self._estimate = estimate
+        self.caps = caps
+
+    def estimate(self, runner, version, conn):
+        """Nombre estimé de lignes touchées"""
+        return self._estimate(runner.db, conn) if self._estimate else 0
+
+    def run(self, runner, version):
+        """Exécuter l'étape, retourne le nombre de lignes touchées"""
+        with runner.db.connection() as conn:
+            if self.caps:
+                conn.execute("BEGIN IMMEDIATE")
+            result = self.action(runner.db, conn)
+            for step, table in self.caps:
+                runner.save_cap(conn, version, step, conn.execute(
+                    f"SELECT COALESCE(MAX(rowid), 0) FROM {table}"
+                ).fetchone()[0])
+        return result if isinstance(result, int) else 0
+
+
+class ChunkedStep(Step):
+    """
+    Étape découpée par plages de rowid d'une table
+
+    Args:
+        name: Nom de l'étape (clé de reprise dans migration_progress)
+        table: Table parcourue par rowid croissant
+        sql: Requête (ou fonction sql(db)) utilisant les paramètres :low et :high,
+             bornes exclusive / inclusive des rowid du lot
+        when: Fonction when(db, conn) -> False pour sauter l'étape
+        chunk: Fonction chunk(db, conn, low, high) -> lignes touchées, à la place
+               de sql pour un lot de plusieurs requêtes ou traité en Python
+    """
+
+    def __init__(self, name, table, sql=None, when=None, chunk=None):
+        super().__init__(name, action=None)
+        self.table = table
+        self.sql = sql
+        self.when = when
+        self.chunk = chunk
+
+    def _applies(self, runner, conn):
+        return self.when is None or self.when(runner.db, conn)
+
+    def estimate(self, runner, version, conn):
+        """Lignes de la table au-delà de la position enregistrée"""
+        high_water = runner.get_high_water(conn, version, self.name)
+        return conn.execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE rowid > ?", (high_water,)
+        ).fetchone()[0]
+
+    def run(self, runner, version):
+        db = runner.db
+        with db.connection() as conn:
+            if not self._applies(runner, conn):
+                return 0
+
+        sql = self.sql(db) if callable(self.sql) else self.sql
+        touched = 0
+        high_water = 0
+        start = last_report = time.perf_counter()
+        while True:
+            with db.connection() as conn:
+                # Position relue sous le verrou d'écriture : deux processus qui
+                # migrent en même temps se partagent les lots sans les rejouer
+                conn.execute("BEGIN IMMEDIATE")
+                # Version 0 : positions du script de migration hérité, sans
+                # version de schéma associée
+                if version and conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    break
+                high_water = runner.get_high_water(conn, version, self.name)
+                cap = runner.get_cap(conn, version, self.name)
+
+                # Borne haute : rowid du chunk_size-ième enregistrement suivant,
+                # sans dépasser le plafond de l'étape
+                row = conn.execute(
+                    f"SELECT rowid FROM {self.table} WHERE rowid > ? ORDER BY rowid LIMIT 1 OFFSET ?",
+                    (high_water, runner.chunk_size - 1)
+                ).fetchone()
+                upper = row[0] if row else conn.execute(
+                    f"SELECT MAX(rowid) FROM {self.table}"
+                ).fetchone()[0]
+                if upper is not None and cap is not None:
+                    upper = min(upper, cap)
+                if upper is None or upper <= high_water:
+                    break
+
+                if self.chunk:
+                    touched += self.chunk(db, conn, high_water, upper)
+                else:
+                    touched += max(conn.execute(sql, {'low': high_water, 'high': upper}).rowcount, 0)
+                # Position enregistrée dans la même transaction que le lot
+                runner.save_high_water(conn, version, self.name, upper)
+            high_water = upper
+
+            now = time.perf_counter()
+            if now - last_report >= runner.report_interval:
+                runner.report(self.name, touched, now - start, high_water)
+                last_report = now
+
+        elapsed = time.perf_counter() - start
+        if elapsed >= runner.report_interval:
+            runner.report(self.name, touched, elapsed, high_water)
+        return touched
+
+
+# ========== ACTIONS ==========
+
+def add_column(conn, table, column, definition):
+    """Ajouter une colonne à une table existante si elle est absente"""
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def ensure_progress_table(conn):
+    """Créer migration_progress (positions des étapes découpées)"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS migration_progress (
+        version INTEGER NOT NULL,
+        step TEXT NOT NULL,
+        high_water INTEGER NOT NULL,
+        updated_at TEXT,
+        PRIMARY KEY (version, step)
+    )
+    ''')
+
+
+def has_table(conn, name):
+    """Vérifier l'existence d'une table (ou table virtuelle)"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def has_index(conn, name):
+    """Vérifier l'existence d'un index"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def count_rows(table):
+    """Estimation : nombre de lignes de `table`"""
+    def estimate(db, conn):
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] if has_table(conn, table) else 0
+    return estimate
+
+
+def add_natural_key_columns(db, conn):
+    add_column(conn, 'package_vulnerabilities', 'advisory_id', "TEXT NOT NULL DEFAULT ''")
+    add_column(conn, 'package_vulnerabilities', 'content_hash', 'TEXT')
+
+
+def add_tombstone_content_columns(db, conn):
+    add_column(conn, 'archived_cves', 'modified_date', 'TEXT')
+    add_column(conn, 'archived_packages', 'content_hash', 'TEXT')
+
+
+def natural_key_missing(db, conn):
+    """Index unique de la clé naturelle absent ou encore sur les colonnes brutes (NULL distincts)"""
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'uq_pkg_natural_key'"
+    ).fetchone()
+    return row is None or 'IFNULL' not in row[0]
+
+
+def create_natural_key_work_index(db, conn):
+    """Index non unique de la clé naturelle, utilisé par la fusion des doublons"""
+    if natural_key_missing(db, conn):
+        conn.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_pkg_natural_key_work
+        ON package_vulnerabilities({db.PACKAGE_NATURAL_KEY})
+        ''')
+
+
+def create_natural_key_index(db, conn):
+    """(Re)poser l'index unique de la clé naturelle une fois les doublons fusionnés"""
+    if natural_key_missing(db, conn):
+        conn.execute("DROP INDEX IF EXISTS uq_pkg_natural_key")
+        conn.execute(f'''
+        CREATE UNIQUE INDEX uq_pkg_natural_key
+        ON package_vulnerabilities({db.PACKAGE_NATURAL_KEY})
+        ''')
+    conn.execute("DROP INDEX IF EXISTS idx_pkg_natural_key_work")
+
+
+def natural_key_steps():
+    """Étapes de fusion des doublons puis de pose de l'index unique de la clé naturelle"""
+    return [
+        ChunkedStep('identifiants d\'avis', 'package_vulnerabilities',
+                    chunk=lambda db, conn, low, high: db._fill_package_advisory_ids(conn, low, high),
+                    when=natural_key_missing),
+        Step('index de travail', create_natural_key_work_index),
+        # Par plages d'id, avant l'index unique : les lots suivants voient les doublons restants
+        ChunkedStep('fusion des doublons', 'package_vulnerabilities',
+                    chunk=lambda db, conn, low, high: db._merge_package_duplicates(conn, low, high),
+                    when=natural_key_missing),
+        Step('index unique', create_natural_key_index),
+    ]
+
+
+def add_timestamp_columns(db, conn):
+    for table, ts_column, _ in db.TIMESTAMP_COLUMNS:
+        add_column(conn, table, ts_column, 'INTEGER')
+
+
+def timestamp_backfill(table, ts_column, date_column):
+    """Étape de calcul des timestamps depuis les dates texte"""
+    return ChunkedStep(
+        f'{table}.{ts_column}',
+        table,
+        f'''
+        UPDATE {table}
+        SET {ts_column} = CAST(strftime('%s', substr({date_column}, 1, 10)) AS INTEGER)
+        WHERE rowid > :low AND rowid <= :high
+        AND {ts_column} IS NULL AND {date_column} IS NOT NULL
+        '''
+    )
+
+
+def stats_rollup_backfill(table):
+    """Étape de calcul initial de stats_rollup depuis une table source"""
+    return ChunkedStep(
+        f'stats_rollup.{table}', table,
+        chunk=lambda db, conn, low, high: db._count_stats_rollup(conn, table, low, high)
+    )
+
+
+def fts_available(db, conn):
+    return has_table(conn, 'vulnerabilities_fts')
+
+
+def vulnerability_index_backfill(table):
+    """Étape de remplissage de vulnerability_index depuis une table source"""
+    def sql(db):
+        columns = ', '.join(db.VULNERABILITY_INDEX_COLUMNS)
+        select = ', '.join(v.format(row=table) for v in db.VULNERABILITY_INDEX_SOURCES[table])
+        return f'''
+        INSERT OR REPLACE INTO vulnerability_index({columns})
+        SELECT {select} FROM {table}
+        WHERE {table}.rowid > :low AND {table}.rowid <= :high
+        '''
+    return ChunkedStep(f'vulnerability_index.{table}', table, sql)
+
+
+# ========== MIGRATIONS ==========
+
+class Migration:
+    """Migration numérotée : étapes appliquées dans l'ordre"""
+
+    def __init__(self, version, name, steps):
+        self.version = version
+        self.name = name
+        self.steps = steps
+
+
+MIGRATIONS = [
+    Migration(1, "Schéma initial", [
+        Step('tables', lambda db, conn: db._create_base_tables(conn)),
+    ]),
+    Migration(2, "Clé naturelle des packages", [
+        Step('colonnes', add_natural_key_columns),
+    ] + natural_key_steps()),
+    Migration(3, "Dates en timestamps UTC", [
+        Step('colonnes', add_timestamp_columns),
+        timestamp_backfill('cve_vulnerabilities', 'published_ts', 'published_date'),
+        timestamp_backfill('package_vulnerabilities', 'published_ts', 'published_date'),
+        timestamp_backfill('package_vulnerabilities', 'discovered_ts', 'discovered_date'),
+        Step('index', lambda db, conn: conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_pkg_discovered_ts ON package_vulnerabilities(discovered_ts, package_name)'
+        )),
+    ]),
+    Migration(4, "Index plein texte FTS5", [
+        Step('table et triggers', lambda db, conn: db._create_fts_index(conn) and 0),
+        ChunkedStep('fts.cve_vulnerabilities', 'cve_vulnerabilities', '''
+        INSERT INTO vulnerabilities_fts(rowid, cve_id, title, description, package_name)
+        SELECT -c.id, c.cve_id, c.title, c.description, NULL FROM cve_vulnerabilities c
+        WHERE c.id > :low AND c.id <= :high
+        AND NOT EXISTS (SELECT 1 FROM vulnerabilities_fts f WHERE f.rowid = -c.id)
+        ''', when=fts_available),
+        ChunkedStep('fts.package_vulnerabilities', 'package_vulnerabilities', '''
+        INSERT INTO vulnerabilities_fts(rowid, cve_id, title, description, package_name)
+        SELECT p.id, p.advisory_id, p.title, p.description, p.package_name FROM package_vulnerabilities p
+        WHERE p.id > :low AND p.id <= :high
+        AND NOT EXISTS (SELECT 1 FROM vulnerabilities_fts f WHERE f.rowid = p.id)
+        ''', when=fts_available),
+    ]),
+    Migration(5, "Statistiques matérialisées", [
+        # Plafond lu avec la création des triggers : les lignes insérées
+        # ensuite sont comptées par les triggers, pas une seconde fois par lot
+        Step('table et triggers', lambda db, conn: db._create_stats_rollup(conn),
+             caps=[('stats_rollup.cve_vulnerabilities', 'cve_vulnerabilities'),
+                   ('stats_rollup.package_vulnerabilities', 'package_vulnerabilities')]),
+        # Agrégat ensembliste par lot : une passe GROUP BY par dimension
+        stats_rollup_backfill('cve_vulnerabilities'),
+        stats_rollup_backfill('package_vulnerabilities'),
+    ]),
+    Migration(6, "Vue unifiée vulnerability_index", [
+        Step('table, index et triggers', lambda db, conn: db._create_vulnerability_index(conn)),
+        vulnerability_index_backfill('cve_vulnerabilities'),
+        vulnerability_index_backfill('package_vulnerabilities'),
+    ]),
+    Migration(7, "Version du graphe supply-chain", [
+        Step('table et triggers', lambda db, conn: db._create_supply_chain_state(conn)),
+    ]),
+    Migration(8, "Graphe de dépendances compact", [
+        Step('tables, index et triggers', lambda db, conn: db._create_dependency_graph(conn)),
+        Step('arêtes de supply_chain', lambda db, conn: db._sync_dependency_edges(conn),
+             estimate=count_rows('supply_chain')),
+    ]),
+    Migration(9, "Plages de versions affectées", [
+        Step('table, index et trigger', lambda db, conn: db._create_affected_ranges(conn)),
+        ChunkedStep('ancien texte affected_versions', 'package_vulnerabilities',
+                    chunk=lambda db, conn, low, high: db._backfill_affected_ranges(conn, low, high)),
+    ]),
+    Migration(10, "Filigranes des collecteurs", [
+        Step('table', lambda db, conn: db._create_collector_state(conn)),
+    ]),
+    # Index de la migration 2 sur les colonnes brutes : les NULL de source /
+    # ecosystem n'y entraient jamais en conflit
+    Migration(11, "Clé naturelle sans NULL", natural_key_steps()),
+    Migration(12, "Clés des avis archivés", [
+        Step('tables et triggers', lambda db, conn: db._create_archive_tombstones(conn)),
+        Step('avis déjà archivés', lambda db, conn: db._backfill_archive_tombstones(conn)),
+    ]),
+    # '1.0.0-1' : pré-version en semver (npm...), post-version pour PyPI / Maven
+    Migration(13, "Clés de version par écosystème", [
+        ChunkedStep('affected_ranges', 'affected_ranges',
+                    chunk=lambda db, conn, low, high: db._rekey_affected_ranges(conn, low, high)),
+    ]),
+    # Clés de la migration 12 sans contenu : elles bloquaient aussi les mises
+    # à jour réelles des avis archivés
+    Migration(14, "Contenu des avis archivés", [
+        Step('colonnes', add_tombstone_content_columns),
+        Step('triggers', lambda db, conn: db._create_archive_tombstones(conn)),
+        Step('avis déjà archivés', lambda db, conn: db._backfill_archive_tombstones(conn)),
+    ]),
+    # Pages filtrées par écosystème (get_vulnerabilities_page) : lecture
+    # dans l'ordre (published_date, id) sans tri
+    Migration(15, "Index des pages par écosystème", [
+        Step('index', lambda db, conn: conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_vi_ecosystem_published ON vulnerability_index(ecosystem, published_date, id)'
+        )),
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# ========== EXÉCUTION ==========
+
+class MigrationRunner:
+    """
+    Appliquer les migrations en attente d'une base VulnerabilityDB
+
+    Args:
+        db: Instance VulnerabilityDB
+        chunk_size: Lignes par lot des étapes découpées (Config.DB_MIGRATION_CHUNK_SIZE)
+        migrations: Liste de migrations (MIGRATIONS par défaut)
+        report_interval: Secondes entre deux affichages du débit d'une étape découpée
+    """
+
+    def __init__(self, db, chunk_size=None, migrations=None, report_interval=5.0):
+        self.db = db
+        self.chunk_size = max(int(chunk_size or Config.DB_MIGRATION_CHUNK_SIZE), 1)
+        self.migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+        self.report_interval = report_interval
+
+    def current_version(self):
+        with self.db.connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def pending(self):
+        """Migrations dont la version dépasse PRAGMA user_version"""
+        version = self.current_version()
+        return [m for m in self.migrations if m.version > version]
+
+    # ----- Position des étapes découpées -----
+
+    @staticmethod
+    def get_high_water(conn, version, step):
+        """Dernier rowid traité par une étape (0 si jamais commencée)"""
+        if not has_table(conn, 'migration_progress'):
+            return 0
+        row = conn.execute(
+            "SELECT high_water FROM migration_progress WHERE version = ? AND step = ?",
+            (version, step)
+        ).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def get_cap(conn, version, step):
+        """Plafond de rowid d'une étape découpée (None si elle n'en a pas)"""
+        if not has_table(conn, 'migration_progress'):
+            return None
+        row = conn.execute(
+            "SELECT high_water FROM migration_progress WHERE version = ? AND step = ?",
+            (version, f'{step}:plafond')
+        ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def save_cap(conn, version, step, cap):
+        """Enregistrer le plafond d'une étape ; une reprise conserve le premier"""
+        conn.execute('''
+        INSERT OR IGNORE INTO migration_progress(version, step, high_water, updated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (version, f'{step}:plafond', cap))
+
+    @staticmethod
+    def save_high_water(conn, version, step, high_water):
+        conn.execute('''
+        INSERT INTO migration_progress(version, step, high_water, updated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(version, step) DO UPDATE SET
+            high_water = excluded.high_water,
+            updated_at = excluded.updated_at
+        ''', (version, step, high_water))
+
+    def _ensure_progress_table(self):
+        with self.db.connection() as conn:
+            ensure_progress_table(conn)
+
+    @staticmethod
+    def report(step, rows, seconds, high_water):
+        """Afficher l'avancement d'une étape découpée (lignes/s)"""
+        rate = rows / seconds if seconds > 0 else 0
+        print(f"   • {step}: {rows} lignes en {seconds:.1f}s ({rate:.0f} lignes/s, rowid {high_water})")
+
+    # ----- Plan et exécution -----
+
+    def plan(self):
+        """
+        Migrations en attente et lignes estimées, sans rien modifier
+
+        Returns:
+            List[Dict]: version, name, estimated_rows, steps [{name, estimated_rows}]
+        """
+        plan = []
+        with self.db.connection() as conn:
+            for migration in self.pending():
+                steps = []
+                for step in migration.steps:
+                    try:
+                        estimated = step.estimate(self, migration.version, conn)
+                    except sqlite3.OperationalError:
+                        # Table pas encore créée par une migration précédente
+                        estimated = 0
+                    steps.append({'name': step.name, 'estimated_rows': estimated})
+                plan.append({
+                    'version': migration.version,
+                    'name': migration.name,
+                    'estimated_rows': sum(s['estimated_rows'] for s in steps),
+                    'steps': steps
+                })
+        return plan
+
+    def run(self, dry_run=False):
+        """
+        Appliquer les migrations en attente dans l'ordre
+
+        Args:
+            dry_run: True pour seulement retourner plan()
+
+        Returns:
+            List[Dict]: version, name, rows, seconds pour chaque migration appliquée
+                        (le plan en mode dry_run)
+        """
+        if dry_run:
+            return self.plan()
+
+        pending = self.pending()
+        if not pending:
+            return []
+
+        self._ensure_progress_table()
+        applied = []
+        for migration in pending:
+            if self.current_version() >= migration.version:
+                # Appliquée entre-temps par un autre processus
+                continue
+            start = time.perf_counter()
+            rows = 0
+            for step in migration.steps:
+                rows += step.run(self, migration.version)
+
+            with self.db.connection() as conn:
+                conn.execute("DELETE FROM migration_progress WHERE version = ?", (migration.version,))
+                conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+
+            elapsed = time.perf_counter() - start
+            applied.append({
+                'version': migration.version,
+                'name': migration.name,
+                'rows': rows,
+                'seconds': round(elapsed, 3)
+            })
+            print(f"✅ Migration {migration.version} ({migration.name}) : {rows} lignes en {elapsed:.2f}s")
+
+        return applied
+
+
+def print_plan(plan):
+    """Afficher le plan d'un dry-run"""
+    if not plan:
+        print("✅ Schéma à jour, aucune migration en attente")
+        return
+
+    for migration in plan:
+        print(f"📋 Migration {migration['version']} - {migration['name']} (~{migration['estimated_rows']} lignes)")
+        for step in migration['steps']:
+            print(f"   • {step['name']}: ~{step['estimated_rows']} lignes")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migrations du schéma SQLite")
+    parser.add_argument('--db', default=Config.DB_PATH, help="Fichier SQLite à migrer")
+    parser.add_argument('--dry-run', action='store_true', help="Afficher le plan sans rien modifier")
+    parser.add_argument('--chunk-size', type=int, default=None, help="Lignes par lot")
+    args = parser.parse_args()
+
+    from database import VulnerabilityDB
+
+    # Sans ensure_schema : le plan doit refléter l'état réel du fichier
+    target = VulnerabilityDB(args.db, init_schema=False)
+    runner = MigrationRunner(target, chunk_size=args.chunk_size)
+
+    print(f"📦 {args.db} : version {runner.current_version()} / {LATEST_VERSION}")
+    if args.dry_run:
+        print_plan(runner.plan())
+    else:
+        # Mode WAL avant les lots : validations sans fsync, lectures non bloquées
+        target._configure_journal_mode()
+        runner.run()
+    target.close()
@@ -0,0 +1,368 @@
+"""
+Moteur de graphe supply-chain : impact transitif d'un package vulnérable
+
+Sens des arêtes : un package (parent_id) dépend de dependency_id. Les
+relations de la table supply_chain sont reportées dans dependency_edges
+par trigger, les lockfiles y sont chargés par bulk_load_dependency_edges.
+L'impact d'un package est l'ensemble des packages qui en dépendent,
+directement (profondeur 1) ou par transitivité.
+
+Deux chemins de calcul :
+- impact() : index d'adjacence en mémoire (ids entiers de la table
+  packages) et cache des clôtures, rechargé quand la version du graphe
+  change en base
+- impact_sql() : requête récursive (WITH RECURSIVE), sans état
+
+Usage : python supply_chain.py --lockfile package-lock.json
+        python supply_chain.py --impact lodash [--depth 3]
+"""
+
+import argparse
+import json
+import threading
+from collections import OrderedDict
+
+from config import Config
+from database import get_db
+
+
+# Packages atteints en remontant les arêtes (dépendance -> dépendants)
+IMPACT_QUERY = '''
+WITH RECURSIVE impacted(id, depth) AS (
+    SELECT id, 0 FROM packages WHERE name = :name AND (:ecosystem IS NULL OR ecosystem = :ecosystem)
+    UNION
+    SELECT e.parent_id, i.depth + 1
+    FROM impacted i
+    JOIN dependency_edges e ON e.dependency_id = i.id
+    WHERE i.depth < :depth
+)
+SELECT p.name, p.ecosystem, MIN(i.depth) AS depth
+FROM impacted i
+JOIN packages p ON p.id = i.id
+GROUP BY i.id
+HAVING MIN(i.depth) > 0
+ORDER BY depth, p.name, p.ecosystem
+'''
+
+# Sections de dépendances lues dans un package-lock.json
+LOCK_DEPENDENCY_KEYS = ('dependencies', 'devDependencies', 'optionalDependencies', 'peerDependencies')
+
+
+class SupplyChainGraph:
+    """
+    Graphe des dépendances en mémoire
+
+    Chaque package de la table packages occupe une position entière ;
+    `_dependents[position]` contient les positions des packages qui en
+    dépendent. La clôture d'un package (positions atteintes et distance)
+    est calculée une fois jusqu'à Config.SUPPLY_CHAIN_MAX_DEPTH puis
+    filtrée selon la profondeur demandée. Le graphe et le cache sont
+    rechargés dès que supply_chain_state.version change.
+    """
+
+    def __init__(self, db=None, max_depth=None, cache_size=None):
+        """
+        Args:
+            db: Instance VulnerabilityDB (instance partagée par défaut)
+            max_depth: Profondeur maximale (Config.SUPPLY_CHAIN_MAX_DEPTH)
+            cache_size: Nombre de clôtures gardées en cache (Config.SUPPLY_CHAIN_CACHE_SIZE)
+        """
+        self.db = db or get_db()
+        self.max_depth = max_depth or Config.SUPPLY_CHAIN_MAX_DEPTH
+        self.cache_size = cache_size or Config.SUPPLY_CHAIN_CACHE_SIZE
+
+        self._lock = threading.Lock()
+        self._version = None
+        self._by_name = {}
+        self._packages = []
+        self._dependents = []
+        self._closures = OrderedDict()
+
+        # Métriques
+        self._loads = 0
+        self._hits = 0
+        self._misses = 0
+
+    # ========== CHARGEMENT ==========
+
+    def _load(self):
+        """
+        Recharger les packages et les arêtes depuis la base
+
+        Version, packages et arêtes sont lus dans une même transaction de
+        lecture : un chargement de lockfile concurrent ne peut pas ajouter
+        entre deux SELECT une arête vers un package encore inconnu.
+        """
+        positions = {}
+        by_name = {}
+        packages = []
+
+        with self.db.connection() as conn:
+            conn.execute("BEGIN")
+            row = conn.execute("SELECT version FROM supply_chain_state WHERE id = 1").fetchone()
+            version = row[0] if row else 0
+
+            for package_id, name, ecosystem in conn.execute(
+                "SELECT id, name, ecosystem FROM packages ORDER BY id"
+            ):
+                positions[package_id] = len(packages)
+                by_name.setdefault(name, []).append(len(packages))
+                packages.append((name, ecosystem))
+
+            dependents = [[] for _ in packages]
+            for parent_id, dependency_id in conn.execute(
+                "SELECT parent_id, dependency_id FROM dependency_edges"
+            ):
+                dependents[positions[dependency_id]].append(positions[parent_id])
+            conn.execute("COMMIT")
+
+        self._by_name = by_name
+        self._packages = packages
+        self._dependents = [tuple(parents) for parents in dependents]
+        self._closures.clear()
+        self._version = version
+        self._loads += 1
+
+    def refresh(self):
+        """
+        Recharger le graphe si les arêtes ont changé depuis le dernier chargement
+
+        Returns:
+            bool: True si le graphe a été rechargé
+        """
+        version = self.db.get_supply_chain_version()
+        if version == self._version:
+            return False
+
+        with self._lock:
+            if version == self._version:
+                return False
+            self._load()
+        return True
+
+    # ========== REQUÊTES ==========
+
+    def _closure(self, start):
+        """
+        Parcours en largeur depuis `start` jusqu'à max_depth
+
+        Returns:
+            Tuple: ((position, distance), ...) hors point de départ
+        """
+        distances = {start: 0}
+        frontier = [start]
+        depth = 0
+        while frontier and depth < self.max_depth:
+            depth += 1
+            next_frontier = []
+            for node in frontier:
+                for parent in self._dependents[node]:
+                    if parent not in distances:
+                        distances[parent] = depth
+                        next_frontier.append(parent)
+            frontier = next_frontier
+
+        del distances[start]
+        return tuple(distances.items())
+
+    def _cached_closure(self, start):
+        """Clôture d'un package, depuis le cache LRU si possible (verrou tenu)"""
+        closure = self._closures.get(start)
+        if closure is None:
+            self._misses += 1
+            closure = self._closures[start] = self._closure(start)
+            if len(self._closures) > self.cache_size:
+                self._closures.popitem(last=False)
+        else:
+            self._hits += 1
+            self._closures.move_to_end(start)
+        return closure
+
+    def impact(self, package, depth=None, ecosystem=None):
+        """
+        Packages qui dépendent de `package`, directement ou non
+
+        Args:
+            package: Nom du package vulnérable
+            depth: Profondeur maximale (1 = dépendants directs), max_depth par défaut
+            ecosystem: Limiter le point de départ à un écosystème (tous par défaut)
+
+        Returns:
+            List[Dict]: [{'package', 'ecosystem', 'depth'}] triés par distance puis par nom
+        """
+        depth = min(depth or self.max_depth, self.max_depth)
+        self.refresh()
+
+        with self._lock:
+            starts = [
+                node for node in self._by_name.get(package, ())
+                if ecosystem is None or self._packages[node][1] == ecosystem
+            ]
+            reached = {}
+            for start in starts:
+                for node, distance in self._cached_closure(start):
+                    if distance <= depth and distance < reached.get(node, depth + 1):
+                        reached[node] = distance
+            for start in starts:
+                reached.pop(start, None)
+            packages = self._packages
+
+        results = [
+            {'package': packages[node][0], 'ecosystem': packages[node][1], 'depth': distance}
+            for node, distance in reached.items()
+        ]
+        results.sort(key=lambda item: (item['depth'], item['package'], item['ecosystem']))
+        return results
+
+    def impact_sql(self, package, depth=None, ecosystem=None):
+        """
+        Même résultat que impact(), calculé par requête récursive en base
+
+        Returns:
+            List[Dict]: [{'package', 'ecosystem', 'depth'}] triés par distance puis par nom
+        """
+        depth = min(depth or self.max_depth, self.max_depth)
+        with self.db.connection() as conn:
+            rows = conn.execute(IMPACT_QUERY, {
+                'name': package, 'ecosystem': ecosystem, 'depth': depth
+            }).fetchall()
+        return [{'package': name, 'ecosystem': eco, 'depth': distance} for name, eco, distance in rows]
+
+    def stats(self):
+        """Métriques du graphe (taille, chargements, cache des clôtures)"""
+        with self._lock:
+            return {
+                'version': self._version,
+                'packages': len(self._packages),
+                'edges': sum(len(parents) for parents in self._dependents),
+                'loads': self._loads,
+                'cached_closures': len(self._closures),
+                'cache_hits': self._hits,
+                'cache_misses': self._misses
+            }
+
+
+# ========== LOCKFILES ==========
+
+def _lock_dependency_name(name, spec):
+    """Nom réel d'une dépendance (alias 'npm:paquet@version' compris)"""
+    if isinstance(spec, str) and spec.startswith('npm:'):
+        target = spec[4:]
+        at = target.rfind('@')
+        return target[:at] if at > 0 else target
+    return name
+
+
+def _read_lock(lock):
+    """Contenu d'un package-lock.json (chemin ou dict déjà décodé)"""
+    if isinstance(lock, dict):
+        return lock
+    with open(lock, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _lock_package_name(path, entry):
+    """Nom d'une entrée "packages" (alias résolu par le champ name)"""
+    return entry.get('name') or path.rsplit('node_modules/', 1)[-1]
+
+
+def parse_package_lock(lock):
+    """
+    Arêtes (package, dépendance) d'un package-lock.json npm
+
+    Les formats 2 et 3 (section "packages") donnent aussi les dépendances
+    directes du projet ; le format 1 (arbre "dependencies") ne donne que
+    les dépendances entre packages ("requires").
+
+    Args:
+        lock: Chemin du fichier ou contenu déjà décodé (dict)
+
+    Returns:
+        List[Tuple]: Paires (package, dépendance) triées, sans doublon
+    """
+    lock = _read_lock(lock)
+    root = lock.get('name') or 'root'
+    edges = set()
+
+    if 'packages' in lock:
+        for path, entry in lock['packages'].items():
+            name = root if path == '' else _lock_package_name(path, entry)
+            for key in LOCK_DEPENDENCY_KEYS:
+                for dependency, spec in (entry.get(key) or {}).items():
+                    edges.add((name, _lock_dependency_name(dependency, spec)))
+    else:
+        pending = [lock.get('dependencies') or {}]
+        while pending:
+            for name, entry in pending.pop().items():
+                for dependency, spec in (entry.get('requires') or {}).items():
+                    edges.add((name, _lock_dependency_name(dependency, spec)))
+                pending.append(entry.get('dependencies') or {})
+
+    edges.discard((root, root))
+    return sorted(edges)
+
+
+def parse_package_lock_versions(lock):
+    """
+    Versions installées d'un package-lock.json npm (formats 1 à 3)
+
+    Returns:
+        List[Tuple]: Paires (package, version) triées, sans doublon
+    """
+    lock = _read_lock(lock)
+    versions = set()
+
+    if 'packages' in lock:
+        for path, entry in lock['packages'].items():
+            if path and entry.get('version') and not entry.get('link'):
+                versions.add((_lock_package_name(path, entry), entry['version']))
+    else:
+        pending = [lock.get('dependencies') or {}]
+        while pending:
+            for name, entry in pending.pop().items():
+                if entry.get('version'):
+                    versions.add((name, entry['version']))
+                pending.append(entry.get('dependencies') or {})
+
+    return sorted(versions)
+
+
+def load_lockfile(path, db=None, ecosystem='npm'):
+    """
+    Charger les dépendances d'un package-lock.json dans le graphe
+
+    Returns:
+        Dict: Compteurs de bulk_load_dependency_edges
+    """
+    db = db or get_db()
+    return db.bulk_load_dependency_edges(parse_package_lock(path), ecosystem=ecosystem)
+
+
+# ========== INSTANCE PARTAGÉE ==========
+
+_shared_graph = None
+_shared_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """Graphe partagé par le processus, construit sur l'instance get_db()"""
+    global _shared_graph
+    if _shared_graph is None:
+        with _shared_graph_lock:
+            if _shared_graph is None:
+                _shared_graph = SupplyChainGraph()
+    return _shared_graph
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Graphe supply-chain")
+    parser.add_argument('--lockfile', help="Charger un package-lock.json npm")
+    parser.add_argument('--impact', help="Packages exposés à ce package")
+    parser.add_argument('--depth', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.lockfile:
+        load_lockfile(args.lockfile)
+    if args.impact:
+        for item in get_graph().impact(args.impact, depth=args.depth):
+            print(f"   {'  ' * (item['depth'] - 1)}• {item['package']} ({item['ecosystem']}, profondeur {item['depth']})")
@@ -0,0 +1,511 @@
+"""
+Tests des collecteurs contre un serveur OSV local (aucun accès réseau)
+Usage: python test_collectors.py
+"""
+
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+
+
+# ========== SERVEUR OSV DE TEST ==========
+
+# Avis par package ; GHSA-shared touche deux packages, lodash est paginé
+STUB_ADVISORIES = {
+    ('npm', 'lodash'): [['GHSA-lodash-0001', 'GHSA-shared'], ['GHSA-lodash-0002']],
+    ('PyPI', 'flask'): [['GHSA-flask-0001', 'GHSA-shared']],
+    ('npm', 'left-pad'): [[]],
+}
+
+
+class StubOSVHandler(BaseHTTPRequestHandler):
+    """API OSV minimale : POST /v1/querybatch et GET /v1/vulns/{id}"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, etag=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        server.record(self)
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if self.path != '/v1/querybatch':
+            return self._send_json(404, {})
+
+        server.batch_sizes.append(len(payload['queries']))
+        results = []
+        for query in payload['queries']:
+            pkg = query['package']
+            pages = STUB_ADVISORIES.get((pkg['ecosystem'], pkg['name']), [[]])
+            page = int(query.get('page_token', 0))
+            result = {'vulns': [{'id': vuln_id, 'modified': server.modified.get(vuln_id, '2025-01-01T00:00:00Z')}
+                                for vuln_id in pages[page]]}
+            if page + 1 < len(pages):
+                result['next_page_token'] = str(page + 1)
+            results.append(result)
+        self._send_json(200, {'results': results})
+
+    def do_GET(self):
+        server = self.server
+        server.record(self)
+        with server.lock:
+            failures = server.failures.get(self.path)
+            status = failures.pop(0) if failures else None
+        if status:
+            self.send_response(status)
+            if status == 429:
+                self.send_header('Retry-After', '0.2')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        match = re.fullmatch(r'/v1/vulns/([\w-]+)', self.path)
+        if not match:
+            return self._send_json(404, {})
+
+        vuln_id = match.group(1)
+        etag = f'"{vuln_id}-{server.modified.get(vuln_id, "v1")}"'
+        if self.headers.get('If-None-Match') == etag:
+            with server.lock:
+                server.not_modified += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        with server.lock:
+            server.fetched.append(vuln_id)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(0.05)
+        with server.lock:
+            server.in_flight -= 1
+
+        affected = [
+            {'package': {'ecosystem': ecosystem, 'name': name},
+             'ranges': [{'type': 'SEMVER', 'events': [{'introduced': '0'}, {'fixed': '9.9.9'}]}]}
+            for (ecosystem, name), pages in STUB_ADVISORIES.items()
+            if any(vuln_id in page for page in pages)
+        ]
+        self._send_json(200, {
+            'id': vuln_id,
+            'summary': f'Prototype pollution in {vuln_id}',
+            'published': '2025-01-01T00:00:00Z',
+            'severity': [{'type': 'CVSS_V3', 'score': 'CVSS:3.1/AV:N'}],
+            'references': [{'url': f'https://osv.dev/vulnerability/{vuln_id}'}],
+            'affected': affected
+        }, etag=etag)
+
+
+class StubOSVServer(ThreadingHTTPServer):
+    """Serveur de test qui enregistre les requêtes et connexions reçues"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubOSVHandler)
+        self.lock = threading.Lock()
+        self.clients = set()
+        self.requests = 0
+        self.batch_sizes = []
+        self.fetched = []
+        self.modified = {}
+        self.not_modified = 0
+        self.failures = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def record(self, handler):
+        with self.lock:
+            self.clients.add(handler.client_address)
+            self.requests += 1
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/v1'
+
+
+def start_stub_server():
+    """Démarrer le serveur OSV de test dans un thread"""
+    server = StubOSVServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ========== TESTS ==========
+
+def test_osv_querybatch():
+    """Tester la collecte OSV par querybatch et détails en parallèle"""
+    print("\n[TEST] Collecte OSV querybatch...")
+
+    server = start_stub_server()
+    workdir = tempfile.mkdtemp()
+    try:
+        from database import VulnerabilityDB
+        from collectors.osv_github_collector import OSVGitHubCollector
+
+        db = VulnerabilityDB(os.path.join(workdir, 'collect.db'))
+        try:
+            collector = OSVGitHubCollector(db=db, packages=list(STUB_ADVISORIES), osv_url=server.url,
+                                           concurrency=4, rate_limit=0, http_cache=False)
+            vulnerabilities = collector._collect_osv()
+
+            # 2 appels querybatch (page 2 de lodash), un GET par avis distinct
+            if server.batch_sizes != [3, 1] or sorted(server.fetched) != sorted(set(server.fetched)):
+                print(f"  ERREUR - Requetes: batch={server.batch_sizes}, details={server.fetched}")
+                return False
+
+            found = sorted((v['package'], v['vuln_id']) for v in vulnerabilities)
+            expected = sorted((name, vuln_id) for (_, name), pages in STUB_ADVISORIES.items()
+                              for page in pages for vuln_id in page)
+            if found != expected:
+                print(f"  ERREUR - Avis collectes: {found}")
+                return False
+
+            if server.max_in_flight < 2 or len(server.clients) > collector.concurrency:
+                print(f"  ERREUR - Pool: {server.max_in_flight} en parallele, {len(server.clients)} connexions")
+                return False
+
+            collector.save_to_database(vulnerabilities)
+            if not db.is_affected('npm', 'lodash', '1.0.0') or collector.error_count:
+                print("  ERREUR - Sauvegarde des avis collectes")
+                return False
+            collector.close()
+        finally:
+            db.close()
+
+        print(f"  OK - {len(vulnerabilities)} avis, {server.requests} requetes sur {len(server.clients)} connexions")
+        return True
+
+    except Exception as e:
+        print(f"  ERREUR - {e}")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_pipeline_runtime():
+    """Tester la collecte en pipeline (run_async) : flux, lots et compteurs"""
+    print("\n[TEST] Collecte en pipeline...")
+
+    server = start_stub_server()
+    workdir = tempfile.mkdtemp()
+    try:
+        import asyncio
+        from database import VulnerabilityDB
+        from collectors.osv_github_collector import OSVGitHubCollector
+
+        db = VulnerabilityDB(os.path.join(workdir, 'pipeline.db'))
+        try:
+            collector = OSVGitHubCollector(db=db, packages=list(STUB_ADVISORIES), osv_url=server.url,
+                                           concurrency=4, rate_limit=0, http_cache=False)
+            collector.GITHUB_KEYWORDS = []
+
+            batches = []
+            write_batch = collector._write_batch
+            collector._write_batch = lambda packages, cves: (batches.append(len(packages) + len(cves)),
+                                                             write_batch(packages, cves))
+
+            stats = asyncio.run(collector.run_async(batch_size=2, queue_size=2))
+            if stats['collected'] != 5 or stats['inserted'] != 5 or stats['errors'] or batches != [2, 2, 1]:
+                print(f"  ERREUR - Statistiques: {stats}, lots: {batches}")
+                return False
+
+            if db.count_vulnerabilities(ecosystem='npm', use_cache=False) != 3:
+                print("  ERREUR - Lignes ecrites")
+                return False
+        finally:
+            db.close()
+
+        print(f"  OK - {stats['inserted']} avis ecrits en {len(batches)} lots")
+        return True
+
+    except Exception as e:
+        print(f"  ERREUR - {e}")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_incremental_collection():
+    """Tester la collecte incrémentale (filigranes collector_state, --full)"""
+    print("\n[TEST] Collecte incrementale...")
+
+    server = start_stub_server()
+    workdir = tempfile.mkdtemp()
+    try:
+        from database import VulnerabilityDB
+        from collectors.osv_github_collector import OSVGitHubCollector
+
+        db = VulnerabilityDB(os.path.join(workdir, 'incremental.db'))
+        try:
+            def collect(full=False):
+                collector = OSVGitHubCollector(db=db, packages=list(STUB_ADVISORIES), osv_url=server.url,
+                                               rate_limit=0, full=full, http_cache=False)
+                collector.GITHUB_KEYWORDS = []
+                collectors.append(collector)
+                del server.fetched[:]
+                collector.run()
+                return sorted(server.fetched)
+
+            collectors = []
+            first = collect()
+            state = db.get_collector_state('OSV+GitHub')
+            if len(first) != 4 or sorted(state['osv:npm/lodash']['seen_ids']) != [
+                    'GHSA-lodash-0001', 'GHSA-lodash-0002', 'GHSA-shared']:
+                print(f"  ERREUR - Premiere collecte: {first}, {state}")
+                return False
+
+            # Rien de nouveau : aucun détail retéléchargé
+            if collect():
+                print("  ERREUR - Avis retelecharges sans modification")
+                return False
+
+            # Un avis modifié depuis le filigrane
+            server.modified['GHSA-shared'] = '2025-06-01T10:00:00.5Z'
+
+            # Échec d'écriture des plages : compté, filigrane conservé
+            def fail_ranges(packages):
+                raise sqlite3.OperationalError('database is locked')
+            db.bulk_replace_affected_ranges = fail_ranges
+            try:
+                failed = collect()
+            finally:
+                del db.bulk_replace_affected_ranges
+            if failed != ['GHSA-shared'] or not collectors[-1].error_count:
+                print(f"  ERREUR - Echec des plages: {failed}, {collectors[-1].error_count} erreur(s)")
+                return False
+
+            if collect() != ['GHSA-shared']:
+                print("  ERREUR - Avis modifie non detecte")
+                return False
+
+            if len(collect(full=True)) != 4:
+                print("  ERREUR - Collecte complete (--full)")
+                return False
+        finally:
+            db.close()
+
+        print("  OK - Seuls les avis nouveaux ou modifies sont telecharges")
+        return True
+
+    except Exception as e:
+        print(f"  ERREUR - {e}")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_http_cache():
+    """Tester le cache HTTP disque (TTL, 304, éviction LRU, compteurs)"""
+    print("\n[TEST] Cache HTTP...")
+
+    server = start_stub_server()
+    workdir = tempfile.mkdtemp()
+    try:
+        from collectors.http_cache import HTTPCache
+        from collectors.osv_github_collector import OSVGitHubCollector
+
+        cache = HTTPCache(os.path.join(workdir, 'http_cache.db'), ttl=60)
+        collector = OSVGitHubCollector(db=object(), osv_url=server.url, rate_limit=0, http_cache=cache)
+
+        # Deuxième lecture servie par le cache, sans requête
+        first = collector._fetch_osv_vuln('GHSA-cache-1')
+        requests_before = server.requests
+        if collector._fetch_osv_vuln('GHSA-cache-1') != first or server.requests != requests_before:
+            print("  ERREUR - Reponse fraiche non servie par le cache")
+            return False
+
+        # Corps différents : clés différentes
+        batch = {"queries": [{"package": {"ecosystem": "npm", "name": "lodash"}}]}
+        collector._request_json('POST', f"{server.url}/querybatch", json=batch)
+        batch["queries"][0]["package"]["name"] = "left-pad"
+        if collector._request_json('POST', f"{server.url}/querybatch", json=batch)["results"][0]["vulns"]:
+            print("  ERREUR - Cle de cache independante du corps")
+            return False
+
+        # Entrée périmée : revalidation par If-None-Match, réponse 304
+        cache.ttl = 0
+        if collector._fetch_osv_vuln('GHSA-cache-1') != first or server.not_modified != 1:
+            print("  ERREUR - Revalidation conditionnelle")
+            return False
+
+        stats = collector._stats()
+        if (stats['cache_hits'], stats['cache_revalidated'], stats['cache_misses']) != (1, 1, 3):
+            print(f"  ERREUR - Compteurs: {stats}")
+            return False
+
+        # Taille bornée : les entrées les moins récemment lues sont évincées
+        cache.max_bytes = 2000
+        for i in range(10):
+            collector._fetch_osv_vuln(f'GHSA-evict-{i}')
+        if cache.stats()['bytes'] > 2000 or not cache.stats()['evictions']:
+            print(f"  ERREUR - Eviction LRU: {cache.stats()}")
+            return False
+        collector.close()
+        cache.close()
+
+        print(f"  OK - {stats['cache_hits']} servie, {stats['cache_revalidated']} revalidee, "
+              f"{cache.evictions} evictions")
+        return True
+
+    except Exception as e:
+        print(f"  ERREUR - {e}")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_retry_backoff():
+    """Tester les réessais (429/5xx, Retry-After) et le seau à jetons adaptatif"""
+    print("\n[TEST] Reessais et quotas...")
+
+    server = start_stub_server()
+    backoff_base = Config.COLLECTOR_BACKOFF_BASE
+    try:
+        import requests
+        from collectors.osv_github_collector import OSVGitHubCollector
+        from collectors.rate_limiter import TokenBucket
+
+        Config.COLLECTOR_BACKOFF_BASE = 0.01
+        collector = OSVGitHubCollector(db=object(), osv_url=server.url, rate_limit=0, http_cache=False)
+
+        # 429 (Retry-After: 0.2) puis 503 : succès au troisième essai
+        server.failures['/v1/vulns/GHSA-retry'] = [429, 503]
+        start = time.monotonic()
+        vuln = collector._fetch_osv_vuln('GHSA-retry')
+        elapsed = time.monotonic() - start
+        if vuln['id'] != 'GHSA-retry' or collector.retry_count != 2 or elapsed < 0.2:
+            print(f"  ERREUR - Reessais: {collector.retry_count} en {elapsed:.3f}s")
+            return False
+
+        # Erreur persistante : abandon après COLLECTOR_RETRIES réessais
+        server.failures['/v1/vulns/GHSA-down'] = [500] * 10
+        try:
+            collector._fetch_osv_vuln('GHSA-down')
+            print("  ERREUR - Erreur 500 persistante ignoree")
+            return False
+        except requests.HTTPError:
+            pass
+        if len(server.failures['/v1/vulns/GHSA-down']) != 10 - (collector.retries + 1):
+            print("  ERREUR - Nombre d'essais")
+            return False
+        collector.close()
+
+        # Quota annoncé : 2 requêtes immédiates puis attente de la remise à zéro
+        bucket = TokenBucket(rate=1)
+        bucket.observe({'X-RateLimit-Remaining': '2', 'X-RateLimit-Reset': str(time.time() + 0.3)})
+        waits = [bucket.acquire() for _ in range(3)]
+        if waits[0] or waits[1] or waits[2] < 0.2:
+            print(f"  ERREUR - Quota: {waits}")
+            return False
+
+        print(f"  OK - {collector.retry_count} reessais, quota respecte ({waits[2]:.2f}s d'attente)")
+        return True
+
+    except Exception as e:
+        print(f"  ERREUR - {e}")
+        return False
+    finally:
+        Config.COLLECTOR_BACKOFF_BASE = backoff_base
+        server.shutdown()
+        server.server_close()
+
+
+def test_rate_limit():
+    """Tester l'espacement des requêtes par hôte"""
+    print("\n[TEST] Debit par hote...")
+
+    server = start_stub_server()
+    try:
+        from collectors.osv_github_collector import OSVGitHubCollector
+
+        collector = OSVGitHubCollector(db=object(), osv_url=server.url, concurrency=4, rate_limit=20,
+                                       http_cache=False)
+        start = time.monotonic()
+        details = collector._map_concurrent(collector._fetch_osv_vuln, ['A-1', 'A-2', 'A-3', 'A-4', 'A-5'])
+        elapsed = time.monotonic() - start
+        collector.close()
+
+        # 5 requêtes à 20/s : au moins 4 intervalles de 50 ms
+        if len(details) != 5 or elapsed < 0.2:
+            print(f"  ERREUR - {len(details)} reponses en {elapsed:.3f}s")
+            return False
+
+        print(f"  OK - 5 requetes espacees en {elapsed:.3f}s")
+        return True
+
+    except Exception as e:
+        print(f"  ERREUR - {e}")
+        return False
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_all_tests():
+    """Exécuter tous les tests des collecteurs"""
+    print("=" * 70)
+    print("TESTS DES COLLECTEURS")
+    print("=" * 70)
+
+    tests = [
+        ("OSV querybatch", test_osv_querybatch),
+        ("Pipeline", test_pipeline_runtime),
+        ("Incremental", test_incremental_collection),
+        ("Cache HTTP", test_http_cache),
+        ("Reessais", test_retry_backoff),
+        ("Debit par hote", test_rate_limit),
+    ]
+
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except Exception as e:
+            print(f"\n[ERREUR CRITIQUE] {test_name}: {e}")
+            results.append((test_name, False))
+
+    print("\n" + "=" * 70)
+    passed = sum(1 for _, result in results if result)
+    for test_name, result in results:
+        symbol = "✓" if result else "✗"
+        print(f"  {symbol} {test_name}: {'OK' if result else 'ERREUR'}")
+    print(f"\nTotal: {passed}/{len(results)} tests reussis")
+
+    return passed == len(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_tests() else 1)
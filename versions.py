@@ -0,0 +1,229 @@
+"""
+Versions de packages : clés triables et plages OSV
+
+version_key() encode une version en chaîne dont l'ordre lexicographique
+suit l'ordre des versions : SQLite compare alors les bornes d'une plage
+avec un simple index B-tree (affected_ranges, voir database.py).
+
+Encodage :
+- chaque nombre est préfixé par sa longueur (2 chiffres) : 9 < 10
+- les zéros finaux de la partie release sont ignorés : 1.0 == 1.0.0
+- les suffixes sont classés dev < pré-version < finale < post-version,
+  tous inférieurs à la composante suivante : 1.0rc1 < 1.0 < 1.0.post1 < 1.0.1
+- un suffixe purement numérique ('1.0-1') est une post-version (PyPI,
+  Maven), sauf dans les écosystèmes semver (npm...) où tout suffixe
+  '-...' est une pré-version ordonnée selon semver : 1.0.0-1 < 1.0.0
+"""
+
+import ast
+import re
+
+
+# Marqueurs de suffixe, tous inférieurs à '.' (séparateur de la partie release)
+DEV_MARK = '!'
+PRE_MARK = '#'
+FINAL_MARK = '$'
+POST_MARK = '%'
+
+# Étiquettes de pré-version (ordre alpha < beta < milestone < rc) et autres suffixes
+PRE_LABELS = {
+    'alpha': '1', 'a': '1',
+    'beta': '2', 'b': '2',
+    'milestone': '3', 'm': '3',
+    'rc': '4', 'cr': '4', 'c': '4', 'pre': '4', 'preview': '4',
+}
+DEV_LABELS = {'dev', 'snapshot'}
+FINAL_LABELS = {'final', 'release', 'ga'}
+POST_LABELS = {'post', 'p', 'patch', 'sp', 'rev', 'r'}
+
+# Écosystèmes (noms normalisés) dont les versions suivent semver
+SEMVER_ECOSYSTEMS = {'npm', 'github', 'docker', 'kubernetes'}
+
+# Fin d'un identifiant de pré-version semver, inférieure à tout caractère d'identifiant
+IDENTIFIER_END = '!'
+
+_VERSION_RE = re.compile(r'^(?:(\d+)!)?([0-9]+(?:\.[0-9]+)*)?(.*)$')
+
+
+def _number(value):
+    """Nombre préfixé par sa longueur : l'ordre texte suit l'ordre numérique"""
+    digits = str(int(value))
+    return f"{len(digits):02d}{digits}"
+
+
+def _semver_prerelease(prerelease):
+    """
+    Clé d'une pré-version semver ('rc.1', '1', 'alpha.beta')
+
+    Identifiants comparés un à un : numériques entre eux par valeur, avant
+    les alphanumériques (ordre ASCII) ; à préfixe égal, la liste la plus
+    longue est la plus récente.
+    """
+    key = PRE_MARK
+    for identifier in prerelease.split('.'):
+        key += ('0' + _number(identifier) if identifier.isdigit() else '1' + identifier) + IDENTIFIER_END
+    return key
+
+
+def version_key(version, ecosystem=None):
+    """
+    Clé triable d'une version (semver, PEP 440, Maven)
+
+    Args:
+        version: Version texte ('4.17.21', 'v1.0.0-rc.1', '2.0b3', '5.3.20.RELEASE')
+        ecosystem: Écosystème normalisé ; dans SEMVER_ECOSYSTEMS, un suffixe
+                   '-...' suit l'ordre des pré-versions semver
+
+    Returns:
+        str: Clé comparable en SQL, ou None pour une version vide
+    """
+    if version is None:
+        return None
+    text = str(version).strip().lower()
+    if text.startswith('v') and text[1:2].isdigit():
+        text = text[1:]
+    # Métadonnées de build / version locale : ignorées dans l'ordre
+    text = text.split('+', 1)[0]
+    if not text:
+        return None
+
+    epoch, release, suffix = _VERSION_RE.match(text).groups()
+    numbers = [int(n) for n in (release or '').split('.') if n]
+    while len(numbers) > 1 and numbers[-1] == 0:
+        numbers.pop()
+
+    key = _number(epoch or 0) + '|' + '.'.join(_number(n) for n in numbers)
+
+    if ecosystem in SEMVER_ECOSYSTEMS and suffix.startswith('-') and len(suffix) > 1:
+        return key + _semver_prerelease(suffix[1:])
+
+    tokens = re.findall(r'[a-z]+|\d+', suffix)
+    if not tokens:
+        return key + FINAL_MARK
+    if tokens[0].isdigit():
+        # '1.0-1' : révision postérieure à la finale (PEP 440, Maven)
+        key += POST_MARK
+
+    for token in tokens:
+        if token.isdigit():
+            key += _number(token)
+        elif token in DEV_LABELS:
+            key += DEV_MARK
+        elif token in PRE_LABELS:
+            key += PRE_MARK + PRE_LABELS[token]
+        elif token in FINAL_LABELS:
+            key += FINAL_MARK
+        elif token in POST_LABELS:
+            key += POST_MARK
+        else:
+            # Étiquette inconnue : pré-version classée avant alpha
+            key += PRE_MARK + '0' + token
+    return key
+
+
+# Noms d'écosystèmes reconnus (en minuscules) -> nom normalisé du schéma
+ECOSYSTEM_ALIASES = {
+    'pip': 'pip', 'pypi': 'pip', 'python': 'pip',
+    'maven': 'maven',
+    'npm': 'npm', 'node': 'npm', 'nodejs': 'npm',
+    'docker': 'docker',
+    'kubernetes': 'kubernetes', 'k8s': 'kubernetes',
+    'github': 'github',
+}
+
+
+def normalize_ecosystem(ecosystem):
+    """Nom normalisé d'un écosystème ('PyPI' -> 'pip'), None s'il est inconnu"""
+    return ECOSYSTEM_ALIASES.get(str(ecosystem or '').strip().lower())
+
+
+def normalize_package_name(ecosystem, name):
+    """Nom canonique d'un package (PyPI : casse et séparateurs ignorés)"""
+    name = str(name or '').strip()
+    if ecosystem == 'pip':
+        return re.sub(r'[-_.]+', '-', name).lower()
+    return name
+
+
+# ========== PLAGES OSV ==========
+
+def osv_ranges(affected):
+    """
+    Intervalles de versions d'une entrée OSV `affected`
+
+    Les événements introduced / fixed / last_affected de chaque plage
+    SEMVER ou ECOSYSTEM sont appariés dans l'ordre ; sans plage
+    exploitable, chaque version de la liste `versions` devient un
+    intervalle ponctuel. Les plages GIT (commits) sont ignorées.
+
+    Returns:
+        List[Dict]: [{'introduced', 'fixed', 'last_affected'}] (None = non borné)
+    """
+    intervals = []
+    for version_range in affected.get('ranges') or []:
+        if version_range.get('type') == 'GIT':
+            continue
+
+        current = None
+        for event in version_range.get('events') or []:
+            if 'introduced' in event:
+                if current:
+                    intervals.append(current)
+                introduced = event['introduced']
+                current = {'introduced': None if introduced == '0' else introduced,
+                           'fixed': None, 'last_affected': None}
+            elif current and ('fixed' in event or 'last_affected' in event):
+                current['fixed'] = event.get('fixed')
+                current['last_affected'] = event.get('last_affected')
+                intervals.append(current)
+                current = None
+        if current:
+            intervals.append(current)
+
+    if not intervals:
+        intervals = [{'introduced': v, 'fixed': None, 'last_affected': v}
+                     for v in affected.get('versions') or []]
+    return intervals
+
+
+def format_ranges(intervals):
+    """Résumé lisible des intervalles : '>=1.0 <1.2.3, >=2.0'"""
+    parts = []
+    for interval in intervals:
+        bounds = [f">={interval.get('introduced') or '0'}"]
+        if interval.get('fixed'):
+            bounds.append(f"<{interval['fixed']}")
+        elif interval.get('last_affected'):
+            bounds.append(f"<={interval['last_affected']}")
+        parts.append(' '.join(bounds))
+    return ', '.join(parts)
+
+
+def latest_fixed(intervals, ecosystem=None):
+    """Version corrigée la plus récente parmi les intervalles ('' si aucune)"""
+    fixed = [i['fixed'] for i in intervals if i.get('fixed')]
+    return max(fixed, key=lambda version: version_key(version, ecosystem)) if fixed else ''
+
+
+def parse_legacy_ranges(text):
+    """
+    Relire l'ancien format texte de affected_versions
+
+    Les anciens collecteurs écrivaient "paquet:[{...plages OSV...}], ..."
+    (repr Python, tronqué à 255 caractères) ; les segments illisibles
+    sont ignorés.
+
+    Returns:
+        List[Tuple]: [(nom du package, intervalles)]
+    """
+    results = []
+    for name, ranges in re.findall(r'([^\s,:][^:]*):(\[.*?\])(?=, [^\s,:][^:]*:\[|$)', text or ''):
+        try:
+            parsed = ast.literal_eval(ranges)
+        except (ValueError, SyntaxError):
+            continue
+        if isinstance(parsed, list):
+            intervals = osv_ranges({'ranges': [r for r in parsed if isinstance(r, dict)]})
+            if intervals:
+                results.append((name.strip(), intervals))
+    return results